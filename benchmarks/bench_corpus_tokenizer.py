@@ -0,0 +1,33 @@
+"""wakachi_corpusのワーカープロセス数ごとのスループット（スケーリング）の計測
+
+Usage:
+    python -m benchmarks.bench_corpus_tokenizer --n-sentences 20000 --backend janome
+"""
+import argparse
+import os
+
+from benchmarks.common import load_sentences, measure
+from src.nlp.corpus_tokenizer import BACKENDS, wakachi_corpus
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n-sentences", type=int, default=20000)
+    parser.add_argument("--backend", choices=BACKENDS, default="janome")
+    parser.add_argument("--chunk-size", type=int, default=256)
+    args = parser.parse_args()
+
+    sentences = load_sentences(args.n_sentences)
+    n_workers_list = sorted({1, 2, 4, 8, 16, os.cpu_count() or 1})
+    base_seconds = None
+    print(f"{'workers':>8}{'seconds':>10}{'sentences/s':>15}{'speedup':>10}")
+    for n_workers in [n for n in n_workers_list if n <= (os.cpu_count() or 1)]:
+        seconds, throughput = measure(
+            lambda: list(wakachi_corpus(sentences, backend=args.backend, chunk_size=args.chunk_size, n_workers=n_workers)),
+            len(sentences), repeat=1)
+        base_seconds = base_seconds or seconds
+        print(f"{n_workers:>8}{seconds:>10.3f}{throughput:>15.1f}{base_seconds / seconds:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
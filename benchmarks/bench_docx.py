@@ -0,0 +1,37 @@
+"""read_docx_textのpython-docx版とXML直接読み込み版の実行時間・ピークメモリの比較
+
+Usage:
+    python -m benchmarks.bench_docx --file-path /app/tests/test_data/test_read.docx
+"""
+import argparse
+import tracemalloc
+
+from benchmarks.common import measure
+from src import file_reader
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--file-path", default="/app/tests/test_data/test_read.docx")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    expected = file_reader.read_docx_text(args.file_path, use_python_docx=True)
+    assert file_reader.read_docx_text(args.file_path) == expected, "python-docx版と結果が一致しません"
+
+    print(f"paragraphs: {len(expected)}")
+    print(f"{'mode':<12}{'seconds':>10}{'peak MB':>10}")
+    for mode, use_python_docx in [("python-docx", True), ("streaming", False)]:
+        def func():
+            return file_reader.read_docx_text(args.file_path, use_python_docx=use_python_docx)
+
+        seconds, _ = measure(func, 1, repeat=args.repeat)
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{mode:<12}{seconds:>10.4f}{peak / 1024 ** 2:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
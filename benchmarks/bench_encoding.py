@@ -0,0 +1,61 @@
+"""detect_encodingの実行時間の比較（UTF-8・Shift_JIS）
+- legacy: 従来の実装（100Byteずつ全体をchardetに渡す）
+- cold: 現在の実装（キャッシュ無し）
+- cached: 現在の実装（同じファイルの2回目以降）
+
+Usage:
+    python -m benchmarks.bench_encoding --size-mb 20
+"""
+import argparse
+import contextlib
+import os
+import tempfile
+
+from chardet.universaldetector import UniversalDetector
+
+from benchmarks.common import load_sentences, measure
+from src import file_reader
+
+
+def legacy_detect_encoding(file_path: str, chunk_size: int = 100) -> dict:
+    with open(file_path, "rb") as f, contextlib.closing(UniversalDetector()) as detector:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            detector.feed(chunk)
+            if detector.done:
+                break
+    return detector.result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=float, default=20)
+    args = parser.parse_args()
+
+    text = "\n".join(load_sentences(5000))
+    text = text * max(1, int(args.size_mb * 1024 ** 2 / len(text.encode("utf-8"))))
+    print(f"{'encoding':<12}{'mode':<8}{'seconds':>10}{'detected':>14}")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for encoding in ["utf-8", "shift_jis"]:
+            path = os.path.join(tmpdir, f"{encoding}.txt")
+            with open(path, "w", encoding=encoding, errors="ignore") as f:
+                f.write(text)
+
+            def cold():
+                file_reader._encoding_cache.clear()
+                return file_reader.detect_encoding(path)
+
+            cases = [
+                ("legacy", lambda: legacy_detect_encoding(path)),
+                ("cold", cold),
+                ("cached", lambda: file_reader.detect_encoding(path)),
+            ]
+            for mode, func in cases:
+                seconds, _ = measure(func, 1, repeat=3)
+                print(f"{encoding:<12}{mode:<8}{seconds:>10.4f}{func()['encoding']:>14}")
+
+
+if __name__ == "__main__":
+    main()
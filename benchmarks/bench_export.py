@@ -0,0 +1,64 @@
+"""TransformerModel（分類モデル）のeager・TorchScript・int8動的量子化TorchScriptのCPUレイテンシ・スループット・ファイルサイズの比較
+
+Usage:
+    python -m benchmarks.bench_export --ntokens 20000 --length 64 --batch-sizes 1 32 --threads 1
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import torch
+
+from src.torch_model.export import _example_inputs, check_parity, export_torchscript, load_torchscript
+from src.torch_model.transformer_model import TransformerModel
+
+
+def latency(func, repeat: int) -> float:
+    func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ntokens", type=int, default=20000)
+    parser.add_argument("--length", type=int, default=64)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 32])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=1)
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.threads)
+    torch.manual_seed(0)
+    model = TransformerModel(args.ntokens, 200, 1, 200, 1, 0.3, is_classifier=True, n_class=21).eval()
+
+    with tempfile.TemporaryDirectory() as directory:
+        eager_path = os.path.join(directory, "eager.model")
+        torch.save(model, eager_path)
+        variants = [("eager", lambda src, lengths: model(src, lengths=lengths), eager_path)]
+        for name, quantize in [("script", False), ("script+int8", True)]:
+            file_path = os.path.join(directory, f"{name}.pt")
+            method = export_torchscript(model, file_path, quantize=quantize)
+            exported = load_torchscript(file_path)
+            parity = check_parity(model, exported, atol=1e-4 if not quantize else 1.0, min_label_agreement=1.0 if not quantize else 0.8)
+            print(f"{name}: exported with torch.jit.{method}, parity {parity}")
+            if not parity["passed"]:
+                raise SystemExit(f"{name}: exported model does not match the eager model")
+            variants.append((name, exported, file_path))
+
+        print(f"{'model':<14}{'size MiB':>10}" + "".join(f"{f'b={b} ms':>12}{f'b={b} /s':>12}" for b in args.batch_sizes))
+        with torch.no_grad():
+            for name, func, file_path in variants:
+                row = f"{name:<14}{os.path.getsize(file_path) / 2 ** 20:>10.2f}"
+                for batch_size in args.batch_sizes:
+                    src, lengths = _example_inputs(args.ntokens, args.length, batch_size)
+                    seconds = latency(lambda: func(src, lengths), args.repeat)
+                    row += f"{seconds * 1000:>12.2f}{batch_size / seconds:>12.1f}"
+                print(row)
+
+
+if __name__ == "__main__":
+    main()
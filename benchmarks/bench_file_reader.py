@@ -0,0 +1,55 @@
+"""read_tsv（全件読み込み）とiter_tsv（ストリーミング）の実行時間・ピークメモリの比較
+
+Usage:
+    python -m benchmarks.bench_file_reader --n-rows 1000000
+"""
+import argparse
+import csv
+import os
+import tempfile
+import tracemalloc
+
+from benchmarks.common import load_sentences, measure
+from src import file_reader
+
+
+def peak_memory_bytes(func) -> int:
+    """funcを実行したときのPythonオブジェクトのピークメモリ（Byte単位）"""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n-rows", type=int, default=1000000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "bench.tsv")
+        with open(path, "w", encoding="utf-8") as f:
+            writer = csv.writer(f, delimiter="\t")
+            writer.writerows([sentence, i % 21] for i, sentence in enumerate(load_sentences(args.n_rows)))
+        print(f"file size: {os.path.getsize(path) / 1024 ** 2:.1f}MB")
+
+        def read_all():
+            return sum(len(row[0]) for row in file_reader.read_tsv(path))
+
+        def iter_rows():
+            return sum(len(row[0]) for row in file_reader.iter_tsv(path))
+
+        def iter_batches():
+            return sum(len(row) for batch in file_reader.iter_tsv(path, batch_size=10000, columns=[0]) for row in batch)
+
+        print(f"{'mode':<15}{'seconds':>10}{'rows/s':>15}{'peak MB':>10}")
+        for mode, func in [("read_tsv", read_all), ("iter_tsv", iter_rows), ("iter_tsv batch", iter_batches)]:
+            seconds, throughput = measure(func, args.n_rows, repeat=1)
+            peak = peak_memory_bytes(func)
+            print(f"{mode:<15}{seconds:>10.3f}{throughput:>15.1f}{peak / 1024 ** 2:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""src.nlp.tokenizerのimport時間と形態素解析器ごとの読み込み時間・メモリ使用量の計測
+
+Usage:
+    python -m benchmarks.bench_import_time
+"""
+import subprocess
+import sys
+import time
+
+WARMUP_SCRIPT = """
+import sys
+from src.nlp import tokenizer
+stats = tokenizer.warmup_tokenizers([sys.argv[1]])[sys.argv[1]]
+print(f"{stats.load_seconds:.3f} {stats.rss_delta_bytes / 1024 ** 2:.1f}")
+"""
+
+
+def measure_import_seconds(module: str, repeat: int = 3) -> float:
+    """新しいPythonプロセスでmoduleをimportするのにかかる時間（最速値）を計測"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", f"import {module}"], check=True)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    baseline = measure_import_seconds("src.utils")
+    print(f"import src.nlp.tokenizer: {measure_import_seconds('src.nlp.tokenizer') - baseline:.3f}s (python起動・src.utils分を除く)")
+    print(f"{'backend':<15}{'load seconds':>15}{'rss delta MB':>15}")
+    for backend in ["sentencepiece", "janome", "ginza"]:
+        output = subprocess.run(
+            [sys.executable, "-c", WARMUP_SCRIPT, backend], check=True, stdout=subprocess.PIPE, universal_newlines=True
+        ).stdout.split()
+        print(f"{backend:<15}{float(output[-2]):>15.3f}{float(output[-1]):>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
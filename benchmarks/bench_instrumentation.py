@@ -0,0 +1,69 @@
+"""log_decoratorのオーバーヘッドの計測（normalize_numbersで比較）
+- legacy: 従来のlog_decorator（呼び出しごとにargs/kwargsを含むf-stringを2回作成）
+- disabled: 現在のlog_decorator（DEBUGログ・計測ともに無効）
+- sampled: 現在のlog_decorator（10回に1回計測）
+- enabled: 現在のlog_decorator（毎回計測）
+- raw: デコレータ無し
+
+Usage:
+    python -m benchmarks.bench_instrumentation --n-calls 100000
+"""
+import argparse
+import sys
+from logging import getLogger
+
+from benchmarks.common import load_sentences, measure
+from src import instrumentation
+from src.nlp import normalizer
+
+logger = getLogger(__name__)
+
+
+def legacy_log_decorator(func):
+    def wrapper(*args, **kwargs):
+        try:
+            logger.debug(f"legacy | {func.__name__} | {args} | {kwargs} | start")
+            result = func(*args, **kwargs)
+            logger.debug(f"legacy | {func.__name__} | {args} | {kwargs} | completed")
+            return result
+        except Exception as e:
+            logger.error(f"legacy | {func.__name__} | {args} | {kwargs} | {e}")
+            sys.exit(1)
+
+    return wrapper
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n-calls", type=int, default=100000)
+    args = parser.parse_args()
+
+    sentences = load_sentences(args.n_calls)
+    raw = normalizer.normalize_numbers.__wrapped__
+    legacy = legacy_log_decorator(raw)
+    current = normalizer.normalize_numbers
+
+    def run(func):
+        return lambda: [func(s) for s in sentences]
+
+    results = {}
+    results["raw"] = measure(run(raw), len(sentences))
+    results["legacy"] = measure(run(legacy), len(sentences))
+    instrumentation.disable_instrumentation()
+    results["disabled"] = measure(run(current), len(sentences))
+    instrumentation.enable_instrumentation(sample_rate=0.1)
+    results["sampled"] = measure(run(current), len(sentences))
+    instrumentation.enable_instrumentation(sample_rate=1.0)
+    results["enabled"] = measure(run(current), len(sentences))
+    instrumentation.disable_instrumentation()
+
+    raw_seconds = results["raw"][0]
+    print(f"{'mode':<10}{'seconds':>10}{'calls/s':>15}{'overhead/call':>16}")
+    for mode, (seconds, throughput) in results.items():
+        overhead_us = (seconds - raw_seconds) / len(sentences) * 1e6
+        print(f"{mode:<10}{seconds:>10.3f}{throughput:>15.1f}{overhead_us:>13.3f} us")
+    print(instrumentation.get_metrics()[f"{normalizer.__name__}.normalize_numbers"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""read_json（全件読み込み）とiter_json_array（ストリーミング）の実行時間・ピークRSSの比較
+- 各方式は別プロセスで実行し、そのプロセスのピークRSSを計測する
+
+Usage:
+    python -m benchmarks.bench_json_stream --size-mb 1024
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+from benchmarks.common import load_sentences
+from src import file_reader
+
+
+def write_synthetic_json(file_path: str, size_mb: float) -> int:
+    """chABSAと同じ構造のsize_mb程度のJSONファイルを作成し、sentencesの件数を返す"""
+    sentences = load_sentences(5000)
+    target_bytes = size_mb * 1024 ** 2
+    n_records = 0
+    with open(file_path, "w", encoding="utf-8") as f:
+        f.write('{"header": {"document_id": "synthetic"}, "sentences": [')
+        while f.tell() < target_bytes:
+            record = {"sentence_id": n_records, "sentence": sentences[n_records % len(sentences)],
+                      "opinions": [{"target": "売上", "category": "sales", "polarity": "positive", "from": 0, "to": 2}]}
+            f.write(("," if n_records else "") + json.dumps(record, ensure_ascii=False))
+            n_records += 1
+        f.write("]}")
+    return n_records
+
+
+def run(mode: str, file_path: str, queue: multiprocessing.Queue) -> None:
+    start = time.perf_counter()
+    if mode == "read_json":
+        n_records = sum(1 for _ in file_reader.read_json(file_path)["sentences"])
+    else:
+        n_records = sum(1 for _ in file_reader.iter_json_array(file_path, key_path="sentences"))
+    seconds = time.perf_counter() - start
+    queue.put((n_records, seconds, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=float, default=100)
+    parser.add_argument("--modes", nargs="+", default=["iter_json_array", "read_json"])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        file_path = os.path.join(tmpdir, "synthetic.json")
+        n_records = write_synthetic_json(file_path, args.size_mb)
+        print(f"file size: {os.path.getsize(file_path) / 1024 ** 2:.1f}MB, records: {n_records}")
+        print(f"{'mode':<17}{'seconds':>10}{'records/s':>12}{'peak RSS MB':>13}")
+        for mode in args.modes:
+            queue = multiprocessing.Queue()
+            process = multiprocessing.Process(target=run, args=(mode, file_path, queue))
+            process.start()
+            count, seconds, peak_mb = queue.get()
+            process.join()
+            assert count == n_records
+            print(f"{mode:<17}{seconds:>10.3f}{count / seconds:>12.1f}{peak_mb:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""MinHash/LSHによる近似重複検出と全ペア比較の処理時間のスケーリング比較
+- 文章数を2倍にしたときに全ペア比較はおよそ4倍、LSHはおよそ2倍になる
+
+Usage:
+    python -m benchmarks.bench_near_duplicate --sizes 1000 2000 4000 8000 --max-pairwise 4000
+"""
+import argparse
+import time
+from itertools import combinations
+
+from benchmarks.common import load_sentences
+from src.nlp import near_duplicate
+
+
+def pairwise_duplicates(sentences, threshold: float, n: int) -> int:
+    hasher = near_duplicate.MinHasher(n=n)
+    shingles = [set(hasher.shingles(s)) for s in sentences]
+    return sum(1 for a, b in combinations(shingles, 2) if (a or b) and len(a & b) / len(a | b) >= threshold)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 2000, 4000, 8000])
+    parser.add_argument("--max-pairwise", type=int, default=4000, help="全ペア比較を行う最大の文章数")
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--n", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'sentences':>10}{'mode':>10}{'seconds':>10}{'kept':>8}")
+    for size in args.sizes:
+        sentences = [f"{s}（{i % 7}）" for i, s in enumerate(load_sentences(size))]
+        start = time.perf_counter()
+        kept = near_duplicate.deduplicate(sentences, threshold=args.threshold, n=args.n)
+        print(f"{size:>10}{'lsh':>10}{time.perf_counter() - start:>10.3f}{len(kept):>8}")
+        if size <= args.max_pairwise:
+            start = time.perf_counter()
+            pairwise_duplicates(sentences, args.threshold, args.n)
+            print(f"{size:>10}{'pairwise':>10}{time.perf_counter() - start:>10.3f}{'-':>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""to_ngramsによる文字列のN-gramとngram_featuresによる配列のN-gramの速度・メモリ比較
+
+Usage:
+    python -m benchmarks.bench_ngram_features --n-sentences 20000 --max-n 3
+"""
+import argparse
+import tracemalloc
+
+from benchmarks.common import load_sentences, measure
+from src.nlp import ngram_features, tokenizer
+
+
+def peak_memory(func) -> int:
+    tracemalloc.start()
+    result = func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n-sentences", type=int, default=20000)
+    parser.add_argument("--max-n", type=int, default=3)
+    parser.add_argument("--n-features", type=int, default=2 ** 20)
+    args = parser.parse_args()
+
+    sentences = load_sentences(args.n_sentences)
+    vocabulary = ngram_features.build_ngram_vocabulary(sentences, max_n=args.max_n)
+
+    cases = [
+        ("to_ngrams", lambda: [tokenizer.to_ngrams(s, args.max_n) for s in sentences]),
+        ("hashing", lambda: ngram_features.extract_ngram_ids(sentences, args.max_n, n_features=args.n_features)),
+        ("vocabulary", lambda: ngram_features.extract_ngram_ids(sentences, args.max_n, vocabulary=vocabulary)),
+        ("batches", lambda: sum(len(ids) for ids, _ in ngram_features.iter_ngram_id_batches(sentences, args.max_n, batch_size=1000))),
+    ]
+    print(f"{'mode':<12}{'seconds':>10}{'sentences/s':>15}{'peak MiB':>12}")
+    for mode, func in cases:
+        seconds, throughput = measure(func, len(sentences))
+        peak = peak_memory(func) / 2 ** 20
+        print(f"{mode:<12}{seconds:>10.3f}{throughput:>15.1f}{peak:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""normalize_numbers→normalize_spacesの関数呼び出しとNormalizerPipelineのスループット比較
+
+Usage:
+    python -m benchmarks.bench_normalizer --n-sentences 200000
+"""
+import argparse
+
+from benchmarks.common import load_sentences, measure
+from src.nlp import normalizer
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n-sentences", type=int, default=200000)
+    args = parser.parse_args()
+
+    sentences = load_sentences(args.n_sentences)
+    print(f"{'replacements':<16}{'mode':<10}{'seconds':>10}{'sentences/s':>15}")
+    for numbers_replacement, spaces_replacement in [("0", ""), ("", "")]:
+        pipeline = normalizer.NormalizerPipeline().add_numbers(replacement=numbers_replacement).add_spaces(replacement=spaces_replacement)
+
+        def functions():
+            return [
+                normalizer.normalize_spaces(normalizer.normalize_numbers(s, replacement=numbers_replacement), replacement=spaces_replacement)
+                for s in sentences
+            ]
+
+        def batch():
+            return list(pipeline.normalize_batch(sentences))
+
+        assert functions() == batch()
+        label = f"{numbers_replacement!r},{spaces_replacement!r}"
+        for mode, func in [("functions", functions), ("pipeline", batch)]:
+            seconds, throughput = measure(func, len(sentences))
+            print(f"{label:<16}{mode:<10}{seconds:>10.3f}{throughput:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
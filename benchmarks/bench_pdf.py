@@ -0,0 +1,32 @@
+"""read_pdf_textのプロセス数ごとの実行時間とページごとの抽出時間の計測
+
+Usage:
+    python -m benchmarks.bench_pdf --file-path /app/data/contract_samples/02-OEM契約書.pdf
+"""
+import argparse
+import os
+
+from benchmarks.common import measure
+from src import file_reader
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--file-path", required=True)
+    parser.add_argument("--slowest", type=int, default=5, help="表示する遅いページの数")
+    args = parser.parse_args()
+
+    pages = list(file_reader.iter_pdf_pages(args.file_path))
+    print(f"pages: {len(pages)}")
+    print(f"{'workers':>8}{'seconds':>10}{'pages/s':>10}")
+    for n_workers in sorted({1, 2, 4, os.cpu_count() or 1}):
+        seconds, throughput = measure(lambda: file_reader.read_pdf_text(args.file_path, n_workers=n_workers), len(pages), repeat=1)
+        print(f"{n_workers:>8}{seconds:>10.3f}{throughput:>10.2f}")
+
+    print("slowest pages:")
+    for page in sorted(pages, key=lambda p: p.seconds, reverse=True)[:args.slowest]:
+        print(f"  page {page.page_number:>4}: {page.seconds:.3f}s ({len(page.text)} chars)")
+
+
+if __name__ == "__main__":
+    main()
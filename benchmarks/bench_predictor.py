@@ -0,0 +1,70 @@
+"""BatchPredictorに複数スレッドから推論リクエストを送り、1件ずつの推論とマイクロバッチのレイテンシ（p50/p99）とスループットを比較
+
+Usage:
+    python -m benchmarks.bench_predictor --n-requests 2000 --concurrency 32 --max-batch-sizes 1 8 32
+    python -m benchmarks.bench_predictor --http  # HTTPエンドポイント経由で計測
+"""
+import argparse
+import json
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import torch
+
+from benchmarks.common import load_sentences
+from src import instrumentation
+from src.torch_model.predictor import BatchPredictor, start_predictor_server
+from src.torch_model.transformer_model import TransformerModel
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n-requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--max-batch-sizes", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--http", action="store_true", help="HTTPエンドポイント経由でリクエストを送る")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    # 文字単位の語彙とランダムな重みの分類モデル（学習済みモデルと同じ大きさ）
+    sentences = load_sentences(args.n_requests)
+    itos = ["<unk>", "<pad>"] + sorted({c for s in sentences for c in s})
+    vocab = SimpleNamespace(stoi={c: i for i, c in enumerate(itos)})
+    torch.manual_seed(0)
+    model = TransformerModel(len(itos), 200, 1, 200, 1, 0.3, is_classifier=True, n_class=21)
+
+    print(f"{'max_batch':>10}{'mean batch':>12}{'p50 ms':>10}{'p99 ms':>10}{'requests/s':>12}")
+    for max_batch_size in args.max_batch_sizes:
+        instrumentation.reset_metrics()
+        predictor = BatchPredictor(model, vocab, tokenize=list, max_batch_size=max_batch_size,
+                                   max_wait_ms=args.max_wait_ms, num_threads=args.threads)
+        if args.http:
+            server = start_predictor_server(predictor, port=args.port)
+            url = f"http://127.0.0.1:{args.port}/predict"
+
+            def request(sentence):
+                body = json.dumps({"text": sentence}).encode("utf-8")
+                with urllib.request.urlopen(urllib.request.Request(url, data=body, method="POST")) as response:
+                    return json.loads(response.read())
+        else:
+            predictor.start()
+            request = predictor.predict
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            list(executor.map(request, sentences))
+        seconds = time.perf_counter() - start
+        stats = predictor.stats()
+        if args.http:
+            server.shutdown()
+        predictor.stop()
+        print(f"{max_batch_size:>10}{stats['mean_batch_size']:>12.1f}{stats['p50_seconds'] * 1000:>10.2f}"
+              f"{stats['p99_seconds'] * 1000:>10.2f}{len(sentences) / seconds:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""BM25Indexの構築・保存・読み込み時間とtop-k検索のレイテンシの計測
+
+Usage:
+    python -m benchmarks.bench_search_index --n-sentences 1000000 --backend janome
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.common import load_sentences
+from src.nlp import tokenizer
+from src.nlp.search_index import BM25Index
+
+TOKENIZERS = {
+    "janome": tokenizer.wakachi_by_janome,
+    "ginza": tokenizer.wakachi_by_ginza,
+    "char": list,
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n-sentences", type=int, default=1000000)
+    parser.add_argument("--backend", choices=sorted(TOKENIZERS), default="janome")
+    parser.add_argument("--n-queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    # 同じ文章は1回だけ分かち書きする（load_sentencesは文章を繰り返すため）
+    wakachi = {}
+    documents = []
+    for sentence in load_sentences(args.n_sentences):
+        if sentence not in wakachi:
+            wakachi[sentence] = TOKENIZERS[args.backend](sentence)
+        documents.append(wakachi[sentence])
+
+    index = BM25Index()
+    start = time.perf_counter()
+    index.add_documents(documents)
+    index.optimize()
+    print(f"build: {time.perf_counter() - start:.2f}s ({len(index)} documents, {index.vocabulary_size} terms)")
+
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = os.path.join(directory, "index.bm25")
+        start = time.perf_counter()
+        index.save(file_path)
+        print(f"save: {time.perf_counter() - start:.2f}s ({os.path.getsize(file_path) / 2 ** 20:.1f} MiB)")
+        start = time.perf_counter()
+        loaded = BM25Index.load(file_path)
+        print(f"load: {time.perf_counter() - start:.3f}s")
+
+        random.seed(0)
+        queries = [random.sample(d, min(len(d), 3)) for d in random.sample(documents, args.n_queries) if d]
+        for name, target in [("in-memory", index), ("memory-mapped", loaded)]:
+            latencies = []
+            for query in queries:
+                start = time.perf_counter()
+                target.search(query, k=args.k)
+                latencies.append(time.perf_counter() - start)
+            latencies.sort()
+            p50, p99 = latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]
+            print(f"{name}: top-{args.k} p50={p50 * 1000:.2f}ms p99={p99 * 1000:.2f}ms")
+        del loaded
+
+
+if __name__ == "__main__":
+    main()
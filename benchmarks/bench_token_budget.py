@@ -0,0 +1,71 @@
+"""固定サイズのバッチとTokenBudgetBatchSamplerのバッチでのTransformerModelの学習スループットとパディング効率の比較
+
+Usage:
+    python -m benchmarks.bench_token_budget --n-sentences 5000 --batch-size 10 --max-tokens 2000
+"""
+import argparse
+import time
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from benchmarks.common import load_sentences
+from src.nlp.torchtext_utils import TokenBudgetBatchSampler
+from src.torch_model.transformer_model import TransformerModel
+
+
+def fixed_size_batches(n_items: int, batch_size: int, seed: int):
+    indices = np.random.RandomState(seed).permutation(n_items)
+    return [indices[i: i + batch_size].tolist() for i in range(0, n_items, batch_size)]
+
+
+def train_epoch(model, sequences, labels, batches, pad_index: int) -> float:
+    optimizer = torch.optim.SGD(model.parameters(), lr=0.01)
+    criterion = nn.CrossEntropyLoss()
+    model.train()
+    start = time.perf_counter()
+    for batch in batches:
+        max_length = max(len(sequences[i]) for i in batch)
+        text = torch.full((max_length, len(batch)), pad_index, dtype=torch.long)
+        for j, i in enumerate(batch):
+            text[: len(sequences[i]), j] = sequences[i]
+        optimizer.zero_grad()
+        loss = criterion(model(text), labels[batch])
+        loss.backward()
+        optimizer.step()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n-sentences", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--max-tokens", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # 文字単位の単語IDで、長さの分布が実際のコーパスと同じ系列を作る
+    sentences = load_sentences(args.n_sentences)
+    itos = ["<unk>", "<pad>"] + sorted({c for s in sentences for c in s})
+    stoi = {c: i for i, c in enumerate(itos)}
+    sequences = [torch.tensor([stoi[c] for c in s], dtype=torch.long) for s in sentences]
+    labels = torch.tensor([i % 21 for i in range(len(sentences))], dtype=torch.long)
+    lengths = np.array([len(s) for s in sequences])
+
+    sampler = TokenBudgetBatchSampler(lengths, args.max_tokens, seed=args.seed)
+    cases = [
+        (f"fixed batch_size={args.batch_size}", fixed_size_batches(len(sequences), args.batch_size, args.seed)),
+        (f"max_tokens={args.max_tokens}", list(sampler)),
+    ]
+    print(f"{'batching':<24}{'batches':>9}{'padding eff.':>14}{'seconds':>10}{'tokens/s':>12}")
+    for name, batches in cases:
+        torch.manual_seed(args.seed)
+        model = TransformerModel(len(itos), 200, 1, 200, 1, 0.3, is_classifier=True, n_class=21)
+        padded = sum(int(lengths[batch].max()) * len(batch) for batch in batches)
+        seconds = train_epoch(model, sequences, labels, batches, pad_index=1)
+        print(f"{name:<24}{len(batches):>9}{lengths.sum() / padded:>14.3f}{seconds:>10.2f}{lengths.sum() / seconds:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""キャッシュ無し・初回（キャッシュ作成）・再実行（ディスクキャッシュから読み込み）の分かち書き時間の比較
+
+Usage:
+    python -m benchmarks.bench_token_cache --n-sentences 5000
+"""
+import argparse
+import os
+import tempfile
+
+from benchmarks.common import load_sentences, measure
+from src.nlp import tokenizer
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n-sentences", type=int, default=5000)
+    parser.add_argument("--backend", choices=["janome", "ginza", "sentencepiece"], default="janome")
+    args = parser.parse_args()
+
+    sentences = load_sentences(args.n_sentences)
+    wakachi_batch = getattr(tokenizer, f"wakachi_by_{args.backend}_batch")
+    tokenizer.warmup_tokenizers([args.backend])
+
+    seconds, throughput = measure(lambda: list(wakachi_batch(sentences)), len(sentences), repeat=1)
+    print(f"no cache      : {seconds:8.3f}s {throughput:12.1f} sentences/s")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "token_cache.sqlite3")
+        tokenizer.enable_token_cache(path=path)
+        seconds, throughput = measure(lambda: list(wakachi_batch(sentences)), len(sentences), repeat=1)
+        print(f"cold cache    : {seconds:8.3f}s {throughput:12.1f} sentences/s")
+        # プロセス再起動を想定して、メモリ上のLRUを空にした状態でディスクキャッシュから読み込む
+        tokenizer.enable_token_cache(path=path)
+        seconds, throughput = measure(lambda: list(wakachi_batch(sentences)), len(sentences), repeat=1)
+        print(f"warm (disk)   : {seconds:8.3f}s {throughput:12.1f} sentences/s")
+        seconds, throughput = measure(lambda: list(wakachi_batch(sentences)), len(sentences), repeat=1)
+        print(f"warm (memory) : {seconds:8.3f}s {throughput:12.1f} sentences/s")
+        print(tokenizer.get_token_cache_stats())
+        tokenizer.disable_token_cache()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""学習再開時の前処理時間の比較（TSVの分かち書き vs 保存済みシャードの読み込み）とDataLoaderのスループット
+
+Usage:
+    python -m benchmarks.bench_token_shards --n-sentences 50000 --num-workers 0 2
+"""
+import argparse
+import os
+import tempfile
+import time
+from functools import partial
+
+from torch.utils.data import DataLoader
+
+from benchmarks.common import load_sentences
+from src.nlp.token_shards import build_token_shards_from_tsv
+from src.torch_model.shard_dataset import ShardDataset, collate_token_batch
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n-sentences", type=int, default=50000)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--num-workers", type=int, nargs="+", default=[0, 2])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        tsv_path = os.path.join(directory, "train.tsv")
+        with open(tsv_path, mode="w", encoding="utf-8") as f:
+            f.writelines(f"{sentence}\t{i % 21}\n" for i, sentence in enumerate(load_sentences(args.n_sentences)))
+        output_dir = os.path.join(directory, "shards")
+
+        for label in ["first build (tokenize)", "restart (reuse shards)"]:
+            start = time.perf_counter()
+            build_token_shards_from_tsv(tsv_path, output_dir)
+            dataset = ShardDataset(output_dir)
+            print(f"{label:<24}{time.perf_counter() - start:>10.3f}s")
+
+        for num_workers in args.num_workers:
+            loader = DataLoader(dataset, batch_size=args.batch_size, shuffle=True, num_workers=num_workers,
+                                collate_fn=partial(collate_token_batch, pad_index=dataset.pad_index))
+            start = time.perf_counter()
+            n_batches = sum(1 for _ in loader)
+            seconds = time.perf_counter() - start
+            print(f"epoch num_workers={num_workers:<3}{seconds:>10.3f}s{n_batches / seconds:>12.1f} batches/s")
+
+
+if __name__ == "__main__":
+    main()
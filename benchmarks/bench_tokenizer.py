@@ -0,0 +1,36 @@
+"""1文ずつの分かち書きとバッチ版の分かち書きのスループット比較
+
+Usage:
+    python -m benchmarks.bench_tokenizer --n-sentences 5000 --batch-size 1000
+"""
+import argparse
+
+from benchmarks.common import load_sentences, measure
+from src.nlp import tokenizer
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n-sentences", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    sentences = load_sentences(args.n_sentences)
+    cases = [
+        ("janome", lambda: [tokenizer.wakachi_by_janome(s) for s in sentences],
+         lambda: list(tokenizer.wakachi_by_janome_batch(sentences, batch_size=args.batch_size))),
+        ("ginza", lambda: [tokenizer.wakachi_by_ginza(s) for s in sentences],
+         lambda: list(tokenizer.wakachi_by_ginza_batch(sentences, batch_size=args.batch_size))),
+        ("sentencepiece", lambda: [tokenizer.wakachi_by_sentencepiece(s) for s in sentences],
+         lambda: list(tokenizer.wakachi_by_sentencepiece_batch(sentences, batch_size=args.batch_size))),
+    ]
+    print(f"{'backend':<15}{'mode':<10}{'seconds':>10}{'sentences/s':>15}")
+    for name, single, batch in cases:
+        for mode, func in [("single", single), ("batch", batch)]:
+            seconds, throughput = measure(func, len(sentences), repeat=args.repeat)
+            print(f"{name:<15}{mode:<10}{seconds:>10.3f}{throughput:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
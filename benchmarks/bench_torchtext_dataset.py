@@ -0,0 +1,51 @@
+"""TabularDataset_From_ListとLazyTabularDataset_From_Listのメモリ使用量と最初のバッチまでの時間の比較
+
+Usage:
+    python -m benchmarks.bench_torchtext_dataset --n-sentences 50000
+"""
+import argparse
+import time
+import tracemalloc
+
+from torchtext import data
+
+from benchmarks.common import load_sentences
+from src.nlp import tokenizer
+from src.nlp.torchtext_utils import LazyTabularDataset_From_List, TabularDataset_From_List
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n-sentences", type=int, default=50000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    rows = [f"{sentence}\t{i % 21}" for i, sentence in enumerate(load_sentences(args.n_sentences))]
+    text_field = data.Field(sequential=True, use_vocab=True, tokenize=tokenizer.wakachi_by_janome)
+    label_field = data.Field(sequential=False, use_vocab=False)
+    fields = [("Text", text_field), ("Label", label_field)]
+    text_field.build_vocab(TabularDataset_From_List(rows[:5000], format="tsv", fields=fields))
+
+    print(f"{'dataset':<12}{'build s':>10}{'first batch s':>15}{'epoch s':>10}{'memory MiB':>12}")
+    for name, dataset_class in [("eager", TabularDataset_From_List), ("lazy", LazyTabularDataset_From_List)]:
+        tracemalloc.start()
+        start = time.perf_counter()
+        dataset = dataset_class(iter(rows), format="tsv", fields=fields)
+        build_seconds = time.perf_counter() - start
+        _, memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        # torchtextのIteratorはshuffle・sortを指定すると全てのExampleを先に作成するため、指定しない
+        iterator = data.Iterator(dataset, batch_size=args.batch_size, shuffle=False, sort=False, repeat=False, device="cpu")
+        start = time.perf_counter()
+        batches = iter(iterator)
+        next(batches)
+        first_batch_seconds = time.perf_counter() - start
+        for _ in batches:
+            pass
+        epoch_seconds = time.perf_counter() - start
+        print(f"{name:<12}{build_seconds:>10.2f}{first_batch_seconds:>15.3f}{epoch_seconds:>10.2f}{memory / 2 ** 20:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
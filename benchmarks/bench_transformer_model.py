@@ -0,0 +1,59 @@
+"""TransformerModel（分類モデル）の従来の計算（毎回のマスク作成・全位置でのdecoder）と、マスクのキャッシュ・プーリング後のdecoderのCPUレイテンシ比較
+
+Usage:
+    python -m benchmarks.bench_transformer_model --batch-sizes 1 8 32 --max-length 128
+"""
+import argparse
+import math
+import time
+
+import torch
+
+from src.torch_model.transformer_model import TransformerModel
+
+
+def legacy_forward(model: TransformerModel, src: torch.Tensor) -> torch.Tensor:
+    # 変更前のforwardと同じ計算（系列長が変わるたびにマスクを作成し、全ての位置でdecoderを通してから合計）
+    mask = model._generate_square_subsequent_mask(len(src)).to(src.device)
+    output = model.pos_encoder(model.encoder(src) * math.sqrt(model.embed_size))
+    output = model.transformer_encoder(output, mask)
+    return torch.sum(model.decoder(output), dim=0)
+
+
+def latency(func, repeat: int) -> float:
+    func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--max-length", type=int, default=128)
+    parser.add_argument("--ntokens", type=int, default=20000)
+    parser.add_argument("--n-class", type=int, default=21)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=1)
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.threads)
+    torch.manual_seed(0)
+    model = TransformerModel(args.ntokens, 200, 1, 200, 1, 0.3, is_classifier=True, n_class=args.n_class).eval()
+
+    print(f"{'batch':>6}{'legacy ms':>12}{'padded ms':>12}{'parity':>10}")
+    with torch.no_grad():
+        for batch_size in args.batch_sizes:
+            lengths = torch.randint(args.max_length // 4, args.max_length + 1, (batch_size,))
+            src = torch.randint(2, args.ntokens, (args.max_length, batch_size))
+            # パディングの無い入力では従来と同じ出力になることを確認
+            parity = torch.allclose(legacy_forward(model, src), model(src), rtol=1e-4, atol=1e-3)
+            src[torch.arange(args.max_length).unsqueeze(1) >= lengths.unsqueeze(0)] = 1
+            legacy_ms = latency(lambda: legacy_forward(model, src), args.repeat) * 1000
+            padded_ms = latency(lambda: model(src, lengths=lengths), args.repeat) * 1000
+            print(f"{batch_size:>6}{legacy_ms:>12.2f}{padded_ms:>12.2f}{str(parity):>10}")
+
+
+if __name__ == "__main__":
+    main()
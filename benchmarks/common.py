@@ -0,0 +1,53 @@
+import csv
+import os
+import time
+from itertools import cycle, islice
+from typing import Callable, List, Tuple
+
+APP_PATH = os.getenv("APP_PATH", "/app")
+ANSWER_EXAMPLE_PATH = os.path.join(APP_PATH, "script/answer_example")
+
+
+def load_sentences(n_sentences: int) -> List[str]:
+    """script/answer_example/*.tsvの文章を繰り返してn_sentences件のベンチマーク用コーパスを作成
+
+    Parameters
+    ----------
+    n_sentences : int
+        作成する文章数
+
+    Returns
+    -------
+    List[str]
+        ベンチマーク用の文章のリスト
+    """
+    sentences = []
+    for name in ["train.tsv", "valid.tsv", "test.tsv"]:
+        with open(os.path.join(ANSWER_EXAMPLE_PATH, name), "r", encoding="utf-8") as f:
+            sentences.extend(row[0] for row in csv.reader(f, delimiter="\t") if row)
+    return list(islice(cycle(sentences), n_sentences))
+
+
+def measure(func: Callable, n_items: int, repeat: int = 3) -> Tuple[float, float]:
+    """funcをrepeat回実行し、最速の実行時間とスループットを計測
+
+    Parameters
+    ----------
+    func : Callable
+        計測したい引数なしの関数
+    n_items : int
+        1回の実行で処理する件数（スループットの計算に使用）
+    repeat : int, optional
+        計測回数, by default 3
+
+    Returns
+    -------
+    Tuple[float, float]
+        (最速の実行時間[秒], スループット[件/秒])
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best, n_items / best if best > 0 else float("inf")
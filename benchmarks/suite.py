@@ -0,0 +1,381 @@
+"""読み込み・正規化・分かち書き・N-gram・モデルの主要な処理をまとめて計測するベンチマークスイート
+- data.zipとscript/answer_example/*.tsvから--scaleに比例した大きさの合成コーパスを作成する
+- 計測ケースごとに別プロセスで実行し、最速の実行時間・スループット・最大RSSをJSONに書き出す
+- --baselineを指定すると保存済みの結果と比較し、--thresholdを超えて遅くなったケースや計測できなくなったケースがあれば終了コード1で終了する
+- --baselineと--scale・--repeatが異なる場合は比較せずに終了コード2で終了する（--allow-settings-mismatchを指定すると比較する）
+
+Usage:
+    python -m benchmarks.suite --scale 1 --output benchmark_results.json
+    python -m benchmarks.suite --scale 1 --output new.json --baseline benchmark_results.json --threshold 0.2
+    python -m benchmarks.suite --cases normalize_numbers to_ngrams  # 一部のケースだけ計測
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from typing import Callable, Dict, List, Tuple
+
+from benchmarks.common import APP_PATH, load_sentences, measure
+
+DATA_ZIP_PATH = os.path.join(APP_PATH, "data.zip")
+SENTENCES_PER_SCALE = 10000
+FILE_COPIES_PER_SCALE = 4
+# baselineと一致しない場合は実行時間を比較しない設定
+COMPARABLE_META_KEYS = ("scale", "repeat")
+
+
+def prepare_corpus(work_dir: str, scale: int) -> Dict[str, List[str]]:
+    """data.zipを展開し、ファイルをscaleに比例した数だけ複製した合成コーパスを作成
+
+    Parameters
+    ----------
+    work_dir : str
+        合成コーパスを作成するディレクトリ
+    scale : int
+        コーパスの大きさの倍率
+
+    Returns
+    -------
+    Dict[str, List[str]]
+        {拡張子: ファイルパスのリスト}
+    """
+    files: Dict[str, List[str]] = {}
+    with zipfile.ZipFile(DATA_ZIP_PATH) as archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            # UTF-8フラグの無いファイル名はcp437として読まれるため、cp932で読み直す
+            name = info.filename if info.flag_bits & 0x800 else info.filename.encode("cp437").decode("cp932")
+            extension = os.path.splitext(name)[1].lstrip(".").lower()
+            data = archive.read(info)
+            for copy in range(scale * FILE_COPIES_PER_SCALE if extension in ("pdf", "docx") else scale):
+                file_path = os.path.join(work_dir, str(copy), name)
+                os.makedirs(os.path.dirname(file_path), exist_ok=True)
+                with open(file_path, mode="wb") as f:
+                    f.write(data)
+                files.setdefault(extension, []).append(file_path)
+    return files
+
+
+class CaseSkipped(Exception):
+    """依存ライブラリやモデルファイルが無いため計測しないケース（run_caseは"skipped"として返す）"""
+
+
+class SettingsMismatch(Exception):
+    """--scale・--repeatが異なるため実行時間を比較できないbaseline"""
+
+
+def _require_modules(*names: str) -> None:
+    # 遅延読み込みする依存ライブラリは、無い場合にsys.exitではなくImportErrorになるように先に読み込む
+    for name in names:
+        importlib.import_module(name)
+
+
+def _case_read_pdf_text(files, scale) -> Tuple[Callable, int]:
+    from src import file_reader
+    return lambda: [file_reader.read_pdf_text(p) for p in files["pdf"]], len(files["pdf"])
+
+
+def _case_read_docx_text(files, scale) -> Tuple[Callable, int]:
+    from src import file_reader
+    return lambda: [file_reader.read_docx_text(p) for p in files["docx"]], len(files["docx"])
+
+
+def _case_read_txt(files, scale) -> Tuple[Callable, int]:
+    from src import file_reader
+    return lambda: [file_reader.read_txt(p) for p in files["txt"]], len(files["txt"])
+
+
+def _case_read_json(files, scale) -> Tuple[Callable, int]:
+    from src import file_reader
+    return lambda: [file_reader.read_json(p) for p in files["json"]], len(files["json"])
+
+
+def _case_detect_encoding(files, scale) -> Tuple[Callable, int]:
+    from src import file_reader
+
+    def run():
+        # キャッシュに当たらないように毎回消す
+        file_reader._encoding_cache.clear()
+        return [file_reader.detect_encoding(p) for p in files["txt"] + files["json"]]
+    return run, len(files["txt"]) + len(files["json"])
+
+
+def _case_normalize_numbers(files, scale) -> Tuple[Callable, int]:
+    from src.nlp import normalizer
+    sentences = load_sentences(SENTENCES_PER_SCALE * scale)
+    return lambda: [normalizer.normalize_numbers(s) for s in sentences], len(sentences)
+
+
+def _case_normalize_spaces(files, scale) -> Tuple[Callable, int]:
+    from src.nlp import normalizer
+    sentences = load_sentences(SENTENCES_PER_SCALE * scale)
+    return lambda: [normalizer.normalize_spaces(s) for s in sentences], len(sentences)
+
+
+def _case_normalizer_pipeline(files, scale) -> Tuple[Callable, int]:
+    from src.nlp import normalizer
+    sentences = load_sentences(SENTENCES_PER_SCALE * scale)
+    pipeline = normalizer.NormalizerPipeline().add_numbers().add_spaces()
+    return lambda: list(pipeline.normalize_batch(sentences)), len(sentences)
+
+
+def _case_wakachi_by_janome(files, scale) -> Tuple[Callable, int]:
+    _require_modules("janome.tokenizer")
+    from src.nlp import tokenizer
+    tokenizer.disable_token_cache()
+    tokenizer.warmup_tokenizers(["janome"])
+    sentences = load_sentences(SENTENCES_PER_SCALE * scale // 10)
+    return lambda: list(tokenizer.wakachi_by_janome_batch(sentences)), len(sentences)
+
+
+def _case_wakachi_by_ginza(files, scale) -> Tuple[Callable, int]:
+    _require_modules("spacy", "ja_ginza")
+    from src.nlp import tokenizer
+    tokenizer.disable_token_cache()
+    tokenizer.warmup_tokenizers(["ginza"])
+    sentences = load_sentences(SENTENCES_PER_SCALE * scale // 10)
+    return lambda: list(tokenizer.wakachi_by_ginza_batch(sentences)), len(sentences)
+
+
+def _case_wakachi_by_sentencepiece(files, scale) -> Tuple[Callable, int]:
+    _require_modules("sentencepiece")
+    from src.constants import SENTENCE_PIECE_MODEL_PATH
+    if not os.path.exists(SENTENCE_PIECE_MODEL_PATH):
+        raise CaseSkipped(f"{SENTENCE_PIECE_MODEL_PATH} is not exist")
+    from src.nlp import tokenizer
+    tokenizer.disable_token_cache()
+    tokenizer.warmup_tokenizers(["sentencepiece"])
+    sentences = load_sentences(SENTENCES_PER_SCALE * scale // 10)
+    return lambda: list(tokenizer.wakachi_by_sentencepiece_batch(sentences)), len(sentences)
+
+
+def _case_split_document(files, scale) -> Tuple[Callable, int]:
+    from src.nlp import document_chunker
+    document = "\n".join(load_sentences(SENTENCES_PER_SCALE * scale))
+    return lambda: list(document_chunker.split_document(document)), len(document)
+
+
+def _case_to_ngrams(files, scale) -> Tuple[Callable, int]:
+    from src.nlp import tokenizer
+    sentences = load_sentences(SENTENCES_PER_SCALE * scale)
+    return lambda: [tokenizer.to_ngrams(s, 3) for s in sentences], len(sentences)
+
+
+def _case_extract_ngram_ids(files, scale) -> Tuple[Callable, int]:
+    from src.nlp import ngram_features
+    sentences = load_sentences(SENTENCES_PER_SCALE * scale)
+    return lambda: ngram_features.extract_ngram_ids(sentences, 3), len(sentences)
+
+
+def _case_transformer_forward(files, scale) -> Tuple[Callable, int]:
+    import torch
+
+    from src.torch_model.transformer_model import TransformerModel
+    torch.manual_seed(0)
+    torch.set_num_threads(1)
+    model = TransformerModel(20000, 200, 1, 200, 1, 0.3, is_classifier=True, n_class=21).eval()
+    batches = [torch.randint(2, 20000, (64, 32)) for _ in range(10 * scale)]
+
+    def run():
+        with torch.no_grad():
+            return [model(src) for src in batches]
+    return run, 32 * len(batches)
+
+
+CASES: Dict[str, Callable[[Dict[str, List[str]], int], Tuple[Callable, int]]] = {
+    "read_pdf_text": _case_read_pdf_text,
+    "read_docx_text": _case_read_docx_text,
+    "read_txt": _case_read_txt,
+    "read_json": _case_read_json,
+    "detect_encoding": _case_detect_encoding,
+    "normalize_numbers": _case_normalize_numbers,
+    "normalize_spaces": _case_normalize_spaces,
+    "normalizer_pipeline": _case_normalizer_pipeline,
+    "wakachi_by_janome": _case_wakachi_by_janome,
+    "wakachi_by_ginza": _case_wakachi_by_ginza,
+    "wakachi_by_sentencepiece": _case_wakachi_by_sentencepiece,
+    "split_document": _case_split_document,
+    "to_ngrams": _case_to_ngrams,
+    "extract_ngram_ids": _case_extract_ngram_ids,
+    "transformer_forward": _case_transformer_forward,
+}
+
+
+def run_case(name: str, manifest_path: str, scale: int, repeat: int) -> Dict[str, float]:
+    """1つのケースをこのプロセスで計測（run_suiteが別プロセスで呼び出す）"""
+    with open(manifest_path, encoding="utf-8") as f:
+        files = json.load(f)
+    rss_before = _max_rss_bytes()
+    try:
+        func, n_items = CASES[name](files, scale)
+        func()  # ウォームアップ（遅延読み込みの依存ライブラリもここで読み込まれる）
+    except (ImportError, CaseSkipped) as e:
+        return {"status": "skipped", "reason": str(e)}
+    seconds, throughput = measure(func, n_items, repeat=repeat)
+    return {
+        "status": "ok",
+        "seconds": seconds,
+        "items": n_items,
+        "throughput": throughput,
+        "peak_rss_bytes": _max_rss_bytes(),
+        "peak_rss_delta_bytes": _max_rss_bytes() - rss_before,
+    }
+
+
+def run_suite(cases: List[str], scale: int, repeat: int, work_dir: str = None) -> Dict[str, dict]:
+    """合成コーパスを作成し、ケースごとに別プロセスで計測
+
+    Parameters
+    ----------
+    cases : List[str]
+        計測するケースの名前
+    scale : int
+        コーパスの大きさの倍率
+    repeat : int
+        計測回数（最速の値を使う）
+    work_dir : str, optional
+        合成コーパスを作成するディレクトリ。Noneの場合は一時ディレクトリ, by default None
+
+    Returns
+    -------
+    Dict[str, dict]
+        {"meta": 実行環境, "results": {ケース名: 計測結果}}
+    """
+    temp_dir = None
+    if work_dir is None:
+        work_dir = temp_dir = tempfile.mkdtemp(prefix="benchmark_corpus_")
+    try:
+        manifest_path = os.path.join(work_dir, "manifest.json")
+        with open(manifest_path, mode="w", encoding="utf-8") as f:
+            json.dump(prepare_corpus(work_dir, scale), f, ensure_ascii=False)
+
+        results = {}
+        for name in cases:
+            command = [sys.executable, "-m", "benchmarks.suite", "--run-case", name,
+                       "--manifest", manifest_path, "--scale", str(scale), "--repeat", str(repeat)]
+            completed = subprocess.run(command, cwd=APP_PATH, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+            if completed.returncode == 0 and completed.stdout.strip():
+                results[name] = json.loads(completed.stdout.strip().splitlines()[-1])
+            else:
+                results[name] = {"status": "error", "reason": completed.stderr.strip()[-2000:]}
+            print(f"{name:<24}{_format_result(results[name])}", file=sys.stderr)
+    finally:
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "scale": scale,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def compare_with_baseline(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float,
+                          allow_settings_mismatch: bool = False) -> List[str]:
+    """baselineより実行時間がthresholdの割合を超えて増えたケースと、baselineでは計測できたが計測できなくなったケースの説明を返す
+
+    Parameters
+    ----------
+    results : Dict[str, dict]
+        run_suiteの結果
+    baseline : Dict[str, dict]
+        保存済みのrun_suiteの結果
+    threshold : float
+        回帰とみなす実行時間の増加の割合
+    allow_settings_mismatch : bool, optional
+        Trueの場合は--scale・--repeatが異なるbaselineとも警告を出して比較する, by default False
+
+    Returns
+    -------
+    List[str]
+        回帰したケースの説明
+    """
+    mismatches = [f"{key}={baseline.get('meta', {}).get(key)} (baseline) != {results['meta'][key]}"
+                  for key in COMPARABLE_META_KEYS if baseline.get("meta", {}).get(key) != results["meta"][key]]
+    if mismatches:
+        if not allow_settings_mismatch:
+            raise SettingsMismatch(f"baseline was measured with different settings: {', '.join(mismatches)}")
+        print(f"WARNING compare with the baseline measured with different settings: {', '.join(mismatches)}", file=sys.stderr)
+
+    regressions = []
+    for name, result in results["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base or base.get("status") != "ok":
+            continue
+        if result.get("status") != "ok":
+            # エラーや依存ライブラリの不足で計測できなくなったことも回帰として扱う
+            regressions.append(f"{name}: ok -> {_format_result(result)}")
+            continue
+        ratio = result["seconds"] / base["seconds"] if base["seconds"] > 0 else 1.0
+        if ratio > 1 + threshold:
+            regressions.append(f"{name}: {base['seconds']:.4f}s -> {result['seconds']:.4f}s (x{ratio:.2f})")
+    return regressions
+
+
+def _max_rss_bytes() -> int:
+    # Linuxのru_maxrssはKiB単位
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _format_result(result: Dict[str, float]) -> str:
+    if result.get("status") != "ok":
+        reason = result.get("reason", "").strip().splitlines()
+        return f"{result.get('status')}: {reason[-1] if reason else ''}"
+    return (f"{result['seconds']:>10.4f}s{result['throughput']:>14.1f}/s"
+            f"{result['peak_rss_bytes'] / 2 ** 20:>10.1f}MiB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=list(CASES))
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="比較する保存済みの結果のJSONファイル")
+    parser.add_argument("--threshold", type=float, default=0.2, help="回帰とみなす実行時間の増加の割合")
+    parser.add_argument("--allow-settings-mismatch", action="store_true", help="--scale・--repeatが異なるbaselineとも比較する")
+    parser.add_argument("--work-dir", help="合成コーパスを作成するディレクトリ（省略時は一時ディレクトリ）")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    parser.add_argument("--manifest", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        print(json.dumps(run_case(args.run_case, args.manifest, args.scale, args.repeat)))
+        return
+
+    results = run_suite(args.cases, args.scale, args.repeat, args.work_dir)
+    with open(args.output, mode="w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"results: {args.output}", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        try:
+            regressions = compare_with_baseline(results, baseline, args.threshold, args.allow_settings_mismatch)
+        except SettingsMismatch as e:
+            print(f"ERROR {e} (use --allow-settings-mismatch to compare anyway)", file=sys.stderr)
+            sys.exit(2)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
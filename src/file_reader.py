@@ -1,17 +1,134 @@
+import bz2
+import codecs
 import contextlib
 import csv
+import fnmatch
+import glob
+import gzip
 import json
-from io import StringIO
-from typing import Dict, List, Union
+import lzma
+import os
+import re
+import threading
+import time
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from functools import partial
+from io import BytesIO, StringIO, TextIOWrapper
+from itertools import islice
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Set, TextIO, Tuple, Union
+from xml.etree import ElementTree
 
 from chardet.universaldetector import UniversalDetector
 from docx import Document
 from pdfminer.converter import TextConverter
 from pdfminer.layout import LAParams
+from pdfminer.pdfdocument import PDFDocument
 from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
 from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfparser import PDFParser
+
+from src.utils import (ARCHIVE_MEMBER_SEPARATOR, check_read_file_decorator, iter_chunks, log_decorator, split_archive_path,
+                       strip_compression_extension)
+
+# 圧縮ファイルの拡張子ごとの展開しながら読み込む関数
+_DECOMPRESSORS: Dict[str, Callable[[BinaryIO], BinaryIO]] = {
+    ".gz": lambda f: gzip.GzipFile(fileobj=f, mode="rb"),
+    ".bz2": lambda f: bz2.BZ2File(f, mode="rb"),
+    ".xz": lambda f: lzma.LZMAFile(f, mode="rb"),
+}
+ZIP_FILE_CACHE_SIZE = 16
+
+# (プロセスID, 絶対パス, ファイルサイズ, 更新時刻)をキーにした開いたままのzipファイルと{ファイル名: ZipInfo}
+# zipファイル内のファイルを読み込むたびに中央ディレクトリを解析し直さないように使い回す
+# （fork後の子プロセスとファイルの読み込み位置を共有しないようにプロセスIDもキーに含める）
+_zip_file_cache: "OrderedDict[Tuple[int, str, int, int], Tuple[zipfile.ZipFile, Dict[str, zipfile.ZipInfo]]]" = OrderedDict()
+_zip_file_cache_lock = threading.Lock()
+
+
+def _zip_member_name(info: zipfile.ZipInfo) -> str:
+    # UTF-8フラグの無いファイル名はcp437としてデコードされるため、Windowsで作成したzipファイルと同じcp932で読み直す
+    if info.flag_bits & 0x800:
+        return info.filename
+    try:
+        return info.filename.encode("cp437").decode("cp932")
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        return info.filename
+
+
+def _get_zip_file(archive_path: str) -> Tuple[zipfile.ZipFile, Dict[str, zipfile.ZipInfo]]:
+    stat = os.stat(archive_path)
+    key = (os.getpid(), os.path.abspath(archive_path), stat.st_size, stat.st_mtime_ns)
+    with _zip_file_cache_lock:
+        cached = _zip_file_cache.get(key)
+        if cached is not None:
+            _zip_file_cache.move_to_end(key)
+            return cached
+        archive = zipfile.ZipFile(archive_path)
+        cached = archive, {_zip_member_name(info): info for info in archive.infolist() if not info.is_dir()}
+        _zip_file_cache[key] = cached
+        while len(_zip_file_cache) > ZIP_FILE_CACHE_SIZE:
+            # 他のスレッドが使用中の可能性があるため明示的には閉じず、参照が無くなった時点で閉じる
+            _zip_file_cache.popitem(last=False)
+        return cached
+
+
+def _get_zip_member_info(archive_path: str, member: str) -> Tuple[zipfile.ZipFile, zipfile.ZipInfo]:
+    archive, infos = _get_zip_file(archive_path)
+    info = infos.get(member)
+    if info is None:
+        raise Exception(f"file_path: {archive_path}{ARCHIVE_MEMBER_SEPARATOR}{member} は存在しません")
+    return archive, info
+
+
+@contextlib.contextmanager
+def _open_binary(file_path: str, seekable: bool = False) -> Iterator[BinaryIO]:
+    # 通常のファイル・zipファイル内のファイル・圧縮ファイルを展開せずにバイナリのストリームとして開く
+    # seekable=Trueの場合、zipファイル内のファイルと圧縮ファイルはメモリに読み込む（PDF・docxの解析はシークが必要なため）
+    archive_path, member = split_archive_path(file_path)
+    with contextlib.ExitStack() as stack:
+        if member is None:
+            f = stack.enter_context(open(archive_path, "rb"))
+        else:
+            archive, info = _get_zip_member_info(archive_path, member)
+            f = stack.enter_context(archive.open(info))
+        compression = strip_compression_extension(file_path)[1]
+        if compression:
+            f = stack.enter_context(_DECOMPRESSORS[compression](f))
+        if seekable and (member is not None or compression):
+            f = BytesIO(f.read())
+        yield f
+
+
+@contextlib.contextmanager
+def _open_text(file_path: str, encoding: str) -> Iterator[TextIO]:
+    with _open_binary(file_path) as f, TextIOWrapper(f, encoding=encoding) as text_file:
+        yield text_file
 
-from src.utils import check_read_file_decorator, log_decorator
+
+@log_decorator
+def iter_archive_members(archive_path: str, pattern: str = None) -> Iterator[str]:
+    """zipファイル内のファイルのパスを返すジェネレータ
+    - 返したパスは各読み込み関数やread_filesにそのまま渡せる（zipファイルは展開しない）
+    - zipファイルは1回だけ開き、以降のzipファイル内のファイルの読み込みでも使い回す
+
+    Parameters
+    ----------
+    archive_path : str
+        zipファイルのパス
+    pattern : str, optional
+        zipファイル内のファイル名のglobパターン（example: 'data/chABSA_dataset/*.json'）。Noneの場合は全て, by default None
+
+    Yields
+    -------
+    Iterator[str]
+        "zipファイルのパス::zipファイル内のファイル名"（zipファイル内の順）
+    """
+    _, infos = _get_zip_file(archive_path)
+    for member in infos:
+        if pattern is None or fnmatch.fnmatchcase(member, pattern):
+            yield f"{archive_path}{ARCHIVE_MEMBER_SEPARATOR}{member}"
 
 
 @check_read_file_decorator("json")
@@ -29,11 +146,180 @@ def read_json(file_path: str) -> dict:
     dict
         Jsonファイルを読み込んだ結果
     """
+    return _read_json(file_path)
+
+
+def _read_json(file_path: str) -> dict:
+    return json.loads(_read_decoded_text(file_path))
+
+
+JSON_STREAM_CHUNK_SIZE = 64 * 1024
+
+
+@check_read_file_decorator()
+@log_decorator
+def iter_json_lines(file_path: str) -> Iterator[Any]:
+    """JSON Lines（1行に1つのJSON）ファイルを1行ずつ読み込むジェネレータ
+    - 空行は読み飛ばす
+
+    Parameters
+    ----------
+    file_path : str
+        ファイルパス
+
+    Yields
+    -------
+    Iterator[Any]
+        各行のJSONを読み込んだ結果
+    """
+    encoding = detect_encoding(file_path=file_path)['encoding']
+    with _open_text(file_path, encoding) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+@check_read_file_decorator("json")
+@log_decorator
+def iter_json_array(file_path: str, key_path: str = None, chunk_size: int = JSON_STREAM_CHUNK_SIZE) -> Iterator[Any]:
+    """JSONファイル内の配列の要素を1つずつ読み込むジェネレータ
+    - ファイル全体を読み込まず、chunk_size文字ずつ読みながら要素を1つずつ取り出す
+    - メモリ使用量はchunk_sizeと最大の要素1つ分程度で、ファイルサイズには依存しない
+
+    Parameters
+    ----------
+    file_path : str
+        ファイルパス
+    key_path : str, optional
+        配列の位置を示すキー。ネストしている場合は'.'区切り（example: 'sentences', 'data.items'）
+        Noneの場合はトップレベルの配列, by default None
+    chunk_size : int, optional
+        1回に読み込む文字数, by default 65536
+
+    Yields
+    -------
+    Iterator[Any]
+        配列の各要素を読み込んだ結果
+    """
     encoding = detect_encoding(file_path=file_path)['encoding']
-    result = None
-    with open(file_path, "r", encoding=encoding) as f:
-        result = json.load(f)
-    return result
+    with _open_text(file_path, encoding) as f:
+        keys = key_path.split(".") if key_path else []
+        yield from _JSONStreamReader(f, chunk_size=chunk_size).iter_array(keys)
+
+
+class _JSONStreamReader:
+    """テキストストリームを少しずつ読みながらJSONを解析するクラス"""
+
+    _NON_WHITESPACE = re.compile(r"\S")
+    _STRUCTURE = re.compile(r'["\[\]{}]')
+    _STRING_SPECIAL = re.compile(r'["\\]')
+
+    def __init__(self, f: TextIO, chunk_size: int = JSON_STREAM_CHUNK_SIZE):
+        self._f = f
+        self._chunk_size = chunk_size
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+    def iter_array(self, keys: List[str]) -> Iterator[Any]:
+        for key in keys:
+            self._expect("{")
+            while True:
+                if self._peek() == "}":
+                    raise KeyError(f"key: {key} が見つかりません")
+                name = self._read_value()
+                self._expect(":")
+                if name == key:
+                    break
+                self._skip_value()
+                if self._peek() == ",":
+                    self._pos += 1
+
+        self._expect("[")
+        if self._peek() == "]":
+            return
+        while True:
+            yield self._read_value()
+            separator = self._peek()
+            self._pos += 1
+            if separator == "]":
+                return
+            if separator != ",":
+                raise ValueError(f"配列の要素の区切りが不正です: {separator!r}")
+
+    def _fill(self) -> bool:
+        # 未処理部分だけを残して読み足す（1つの値が長い場合は読み込み量を倍々に増やす）
+        chunk = self._f.read(max(self._chunk_size, len(self._buffer) - self._pos))
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _peek(self) -> str:
+        while True:
+            match = self._NON_WHITESPACE.search(self._buffer, self._pos)
+            if match:
+                self._pos = match.start()
+                return self._buffer[self._pos]
+            self._pos = len(self._buffer)
+            if not self._fill():
+                raise ValueError("JSONが途中で終わっています")
+
+    def _expect(self, char: str) -> None:
+        found = self._peek()
+        if found != char:
+            raise ValueError(f"{char!r}が必要な位置に{found!r}があります")
+        self._pos += 1
+
+    def _read_value(self) -> Any:
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+                # 数値などはバッファの末尾で途切れている可能性があるため、続きがある場合は読み足して再解析する
+                if end < len(self._buffer) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._fill()
+
+    def _skip_value(self) -> None:
+        # 読み飛ばす値はPythonオブジェクトにせず、括弧の対応だけを追う
+        if self._peek() not in "[{":
+            self._read_value()
+            return
+        depth = 0
+        in_string = False
+        while True:
+            pattern = self._STRING_SPECIAL if in_string else self._STRUCTURE
+            match = pattern.search(self._buffer, self._pos)
+            if match is None:
+                self._pos = len(self._buffer)
+                if not self._fill():
+                    raise ValueError("JSONが途中で終わっています")
+                continue
+            char = match.group()
+            self._pos = match.end()
+            if in_string:
+                if char == "\\":
+                    if self._pos >= len(self._buffer) and not self._fill():
+                        raise ValueError("JSONが途中で終わっています")
+                    self._pos += 1
+                else:
+                    in_string = False
+            elif char == '"':
+                in_string = True
+            elif char in "[{":
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return
 
 
 @log_decorator
@@ -53,12 +339,64 @@ def read_separated_value_file(file_path: str, delimiter: str = ",") -> List[List
         ファイル内のテキストをdelimiterで分割した2次元配列
     """
 
-    encoding = detect_encoding(file_path=file_path)['encoding']
-    with open(file_path, "r", encoding=encoding) as f:
+    return _read_separated_value_file(file_path, delimiter)
+
+
+def _read_separated_value_file(file_path: str, delimiter: str) -> List[List[str]]:
+    encoding = _detect_encoding(file_path)['encoding']
+    with _open_text(file_path, encoding) as f:
         reader = csv.reader(f, delimiter=delimiter)
         return [row for row in reader]
 
 
+@log_decorator
+def iter_separated_value_file(file_path: str, delimiter: str = ",", batch_size: int = None, columns: Sequence[int] = None,
+                              skip_rows: int = 0) -> Iterator[Union[List[str], List[List[str]]]]:
+    """CSVやTSVなど区切り文字で区切られたテキストファイルを1行ずつ（またはbatch_size行ずつ）読み込むジェネレータ
+    - ファイル全体をメモリに読み込まないため、大容量ファイルでもメモリ使用量はファイルサイズに依存しない
+
+    Parameters
+    ----------
+    file_path : str
+        ファイルパス
+    delimiter : str, optional
+        区切り文字, by default ','
+    batch_size : int, optional
+        指定した場合はbatch_size行ずつのリストで返す, by default None
+    columns : Sequence[int], optional
+        指定した場合は各行からcolumnsの列だけをこの順番で取り出す（空行は読み飛ばし、列が足りない行はエラー）, by default None
+    skip_rows : int, optional
+        先頭から読み飛ばす行数（ヘッダー行など）, by default 0
+
+    Yields
+    -------
+    Iterator[Union[List[str], List[List[str]]]]
+        batch_size未指定の場合は1行分の文字列配列、指定した場合はbatch_size行分の2次元配列
+    """
+
+    encoding = detect_encoding(file_path=file_path)['encoding']
+    with _open_text(file_path, encoding) as f:
+        reader = csv.reader(f, delimiter=delimiter)
+        rows = islice(reader, skip_rows, None)
+        if columns is not None:
+            rows = _project_columns(rows, columns, reader, file_path)
+        if batch_size is None:
+            yield from rows
+        else:
+            yield from iter_chunks(rows, batch_size)
+
+
+def _project_columns(rows: Iterable[List[str]], columns: Sequence[int], reader: Any, file_path: str) -> Iterator[List[str]]:
+    # 各行からcolumnsの列を取り出す（空行は読み飛ばし、列が足りない行は行番号を含めてエラーにする）
+    for row in rows:
+        if not row:
+            continue
+        try:
+            yield [row[i] for i in columns]
+        except IndexError:
+            raise Exception(f"{file_path}:{reader.line_num}: columns {list(columns)} are out of range for a row with {len(row)} columns")
+
+
 @check_read_file_decorator("csv")
 @log_decorator
 def read_csv(file_path: str) -> List[List[str]]:
@@ -97,10 +435,78 @@ def read_tsv(file_path: str) -> List[List[str]]:
     return read_separated_value_file(file_path=file_path, delimiter="\t")
 
 
+@check_read_file_decorator("csv")
+@log_decorator
+def iter_csv(file_path: str, batch_size: int = None, columns: Sequence[int] = None, skip_rows: int = 0) -> Iterator[Union[List[str], List[List[str]]]]:
+    """CSVファイルを1行ずつ（またはbatch_size行ずつ）読み込むジェネレータ
+
+    Parameters
+    ----------
+    file_path : str
+        ファイルパス
+    batch_size : int, optional
+        指定した場合はbatch_size行ずつのリストで返す, by default None
+    columns : Sequence[int], optional
+        指定した場合は各行からcolumnsの列だけをこの順番で取り出す（空行は読み飛ばし、列が足りない行はエラー）, by default None
+    skip_rows : int, optional
+        先頭から読み飛ばす行数（ヘッダー行など）, by default 0
+
+    Yields
+    -------
+    Iterator[Union[List[str], List[List[str]]]]
+        batch_size未指定の場合は1行分の文字列配列、指定した場合はbatch_size行分の2次元配列
+    """
+
+    return iter_separated_value_file(file_path=file_path, delimiter=",", batch_size=batch_size, columns=columns, skip_rows=skip_rows)
+
+
+@check_read_file_decorator("tsv")
+@log_decorator
+def iter_tsv(file_path: str, batch_size: int = None, columns: Sequence[int] = None, skip_rows: int = 0) -> Iterator[Union[List[str], List[List[str]]]]:
+    """TSVファイルを1行ずつ（またはbatch_size行ずつ）読み込むジェネレータ
+
+    Parameters
+    ----------
+    file_path : str
+        ファイルパス
+    batch_size : int, optional
+        指定した場合はbatch_size行ずつのリストで返す, by default None
+    columns : Sequence[int], optional
+        指定した場合は各行からcolumnsの列だけをこの順番で取り出す（空行は読み飛ばし、列が足りない行はエラー）, by default None
+    skip_rows : int, optional
+        先頭から読み飛ばす行数（ヘッダー行など）, by default 0
+
+    Yields
+    -------
+    Iterator[Union[List[str], List[List[str]]]]
+        batch_size未指定の場合は1行分の文字列配列、指定した場合はbatch_size行分の2次元配列
+    """
+
+    return iter_separated_value_file(file_path=file_path, delimiter="\t", batch_size=batch_size, columns=columns, skip_rows=skip_rows)
+
+
+class PDFPageText(NamedTuple):
+    """PDFの1ページ分のテキスト抽出結果
+
+    Attributes
+    ----------
+    page_number : int
+        ページ番号（0始まり）
+    text : str
+        抽出したテキスト（ページ末尾の改ページ文字'\\x0c'を含む）
+    seconds : float
+        テキスト抽出にかかった時間（秒）
+    """
+    page_number: int
+    text: str
+    seconds: float
+
+
 @check_read_file_decorator("pdf")
 @log_decorator
-def read_pdf_text(file_path: str, password: str = None) -> List[str]:
+def read_pdf_text(file_path: str, password: str = None, page_numbers: Iterable[int] = None, n_workers: int = 1) -> List[str]:
     """PDFファイルからテキストを読み込む
+    - n_workers > 1の場合はページを連続した範囲に分割して複数プロセスで抽出し、ページ順に結合する
 
     Parameters
     ----------
@@ -108,6 +514,10 @@ def read_pdf_text(file_path: str, password: str = None) -> List[str]:
         ファイルパス
     password : str, optional
         PDFファイルにパスワードがかかっている場合はそのパスワード, by default None
+    page_numbers : Iterable[int], optional
+        抽出するページ番号（0始まり）。Noneの場合は全ページ, by default None
+    n_workers : int, optional
+        テキスト抽出に使うプロセス数, by default 1
 
     Returns
     -------
@@ -115,44 +525,184 @@ def read_pdf_text(file_path: str, password: str = None) -> List[str]:
         抽出したPDFのテキスト情報
     """
 
-    with open(file_path, "rb") as f:
-        rsrcmgr = PDFResourceManager()
-        retstr = StringIO()
-        device = TextConverter(rsrcmgr, retstr, codec="utf-8", laparams=LAParams())
-        interpreter = PDFPageInterpreter(rsrcmgr, device)
-        maxpages = 0
-        caching = True
-        pagenos = set()
+    return _read_pdf_text(file_path, password=password, page_numbers=page_numbers, n_workers=n_workers)
 
-        for page in PDFPage.get_pages(f, pagenos, maxpages=maxpages, password=password, caching=caching, check_extractable=True):
-            interpreter.process_page(page)
 
-        pdf_text = retstr.getvalue()
+def _read_pdf_text(file_path: str, password: str = None, page_numbers: Iterable[int] = None, n_workers: int = 1) -> List[str]:
+    if n_workers <= 1:
+        with _open_binary(file_path, seekable=True) as f:
+            return "".join(page.text for page in _iter_pdf_pages(f, password=password, page_numbers=page_numbers))
+
+    if page_numbers is None:
+        with _open_binary(file_path, seekable=True) as f:
+            page_numbers = range(_count_pdf_pages(f, password=password))
+    page_numbers = sorted(set(page_numbers))
+    n_workers = min(n_workers, len(page_numbers)) or 1
+    ranges = [page_numbers[i * len(page_numbers) // n_workers: (i + 1) * len(page_numbers) // n_workers] for i in range(n_workers)]
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        futures = [executor.submit(_extract_pdf_pages, file_path, password, pages) for pages in ranges]
+        return "".join(page.text for future in futures for page in future.result())
 
+
+@check_read_file_decorator("pdf")
+@log_decorator
+def iter_pdf_pages(file_path: str, password: str = None, page_numbers: Iterable[int] = None) -> Iterator[PDFPageText]:
+    """PDFファイルから1ページずつテキストを抽出するジェネレータ
+    - ページごとの抽出時間も返すため、処理に時間がかかるページの特定に使える
+
+    Parameters
+    ----------
+    file_path : str
+        ファイルパス
+    password : str, optional
+        PDFファイルにパスワードがかかっている場合はそのパスワード, by default None
+    page_numbers : Iterable[int], optional
+        抽出するページ番号（0始まり）。Noneの場合は全ページ, by default None
+
+    Yields
+    -------
+    Iterator[PDFPageText]
+        ページ番号順のページごとのテキスト抽出結果
+    """
+
+    with _open_binary(file_path, seekable=True) as f:
+        yield from _iter_pdf_pages(f, password=password, page_numbers=page_numbers)
+
+
+def _iter_pdf_pages(fp: BinaryIO, password: str = None, page_numbers: Iterable[int] = None) -> Iterator[PDFPageText]:
+    rsrcmgr = PDFResourceManager()
+    retstr = StringIO()
+    device = TextConverter(rsrcmgr, retstr, codec="utf-8", laparams=LAParams())
+    interpreter = PDFPageInterpreter(rsrcmgr, device)
+    pagenos = None if page_numbers is None else set(page_numbers)
+    last_page_number = max(pagenos) if pagenos else -1
+    try:
+        for page_number, page in enumerate(PDFPage.get_pages(fp, password=password, caching=True, check_extractable=True)):
+            if pagenos is not None:
+                if page_number > last_page_number:
+                    break
+                if page_number not in pagenos:
+                    continue
+            start = time.perf_counter()
+            interpreter.process_page(page)
+            text = retstr.getvalue()
+            retstr.seek(0)
+            retstr.truncate(0)
+            yield PDFPageText(page_number, text, time.perf_counter() - start)
+    finally:
         device.close()
         retstr.close()
 
-    return pdf_text
+
+def _count_pdf_pages(fp: BinaryIO, password: str = None) -> int:
+    document = PDFDocument(PDFParser(fp), password=password or "")
+    return sum(1 for _ in PDFPage.create_pages(document))
+
+
+def _extract_pdf_pages(file_path: str, password: str, page_numbers: List[int]) -> List[PDFPageText]:
+    with _open_binary(file_path, seekable=True) as f:
+        return list(_iter_pdf_pages(f, password=password, page_numbers=page_numbers))
+
+
+_W_NAMESPACE = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_RELATIONSHIPS_NAMESPACE = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_OFFICE_DOCUMENT_RELATIONSHIP_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
 
 
 @check_read_file_decorator("docx")
 @log_decorator
-def read_docx_text(file_path: str) -> List[str]:
+def read_docx_text(file_path: str, use_python_docx: bool = False) -> List[str]:
     """docxのWordファイルの読み込み
 
     Parameters
     ----------
     file_path : str
         ファイルパス
+    use_python_docx : bool, optional
+        Trueの場合はpython-docxのDocumentオブジェクトを作成して読み込む
+        Falseの場合はiter_docx_paragraphsと同じ方法で本文のXMLを直接読み込む（結果は同じ）, by default False
 
     Returns
     -------
     List[str]
         docxを段落ごとに分割して読み込んだ結果
     """
-    with open(file_path, "rb") as f:
-        doc = Document(f)
-        return [par.text for par in doc.paragraphs if par.text]
+    return _read_docx_text(file_path, use_python_docx=use_python_docx)
+
+
+def _read_docx_text(file_path: str, use_python_docx: bool = False) -> List[str]:
+    with _open_binary(file_path, seekable=True) as f:
+        if use_python_docx:
+            doc = Document(f)
+            return [par.text for par in doc.paragraphs if par.text]
+        return [text for text in _iter_docx_paragraphs(f) if text]
+
+
+@check_read_file_decorator("docx")
+@log_decorator
+def iter_docx_paragraphs(file_path: str) -> Iterator[str]:
+    """docxのWordファイルから本文の段落のテキストを1段落ずつ読み込むジェネレータ
+    - python-docxのDocumentオブジェクトを作らず、zip内の本文のXMLを先頭から順に解析する
+    - 処理済みの段落は解析結果から削除するため、メモリ使用量は段落1つ分程度で済む
+    - 空の段落も含めて返す（read_docx_textは空の段落を除く）
+
+    Parameters
+    ----------
+    file_path : str
+        ファイルパス
+
+    Yields
+    -------
+    Iterator[str]
+        python-docxのDocument(f).paragraphsの各段落のtextと同じ文字列
+    """
+    with _open_binary(file_path, seekable=True) as f:
+        yield from _iter_docx_paragraphs(f)
+
+
+def _iter_docx_paragraphs(fp: BinaryIO) -> Iterator[str]:
+    with zipfile.ZipFile(fp) as archive, archive.open(_docx_main_part_name(archive)) as xml_file:
+        body = None
+        body_depth = depth = 0
+        for event, element in ElementTree.iterparse(xml_file, events=("start", "end")):
+            if event == "start":
+                depth += 1
+                if body is None and element.tag == f"{_W_NAMESPACE}body":
+                    body, body_depth = element, depth
+                continue
+            if body is not None and depth == body_depth + 1:
+                # python-docxと同じく、本文直下の段落だけを対象にする（表の中の段落などは対象外）
+                if element.tag == f"{_W_NAMESPACE}p":
+                    yield _docx_paragraph_text(element)
+                body.remove(element)
+            depth -= 1
+
+
+def _docx_main_part_name(archive: zipfile.ZipFile) -> str:
+    try:
+        with archive.open("_rels/.rels") as f:
+            for relationship in ElementTree.parse(f).getroot().iter(f"{_RELATIONSHIPS_NAMESPACE}Relationship"):
+                if relationship.get("Type") == _OFFICE_DOCUMENT_RELATIONSHIP_TYPE:
+                    return relationship.get("Target").lstrip("/")
+    except KeyError:
+        pass
+    return "word/document.xml"
+
+
+def _docx_paragraph_text(paragraph: ElementTree.Element) -> str:
+    # python-docxのParagraph.textと同じく、段落直下のw:rのw:t, w:tab, w:br, w:crだけを連結する
+    texts = []
+    for run in paragraph:
+        if run.tag != f"{_W_NAMESPACE}r":
+            continue
+        for child in run:
+            if child.tag == f"{_W_NAMESPACE}t":
+                texts.append(child.text or "")
+            elif child.tag == f"{_W_NAMESPACE}tab":
+                texts.append("\t")
+            elif child.tag in (f"{_W_NAMESPACE}br", f"{_W_NAMESPACE}cr"):
+                texts.append("\n")
+    return "".join(texts)
 
 
 @check_read_file_decorator('txt')
@@ -172,36 +722,273 @@ def read_txt(file_path: str) -> str:
         テキストファイルを読み込んだ結果
     """
 
-    encoding = detect_encoding(file_path=file_path)['encoding']
-    with open(file_path, 'r', encoding=encoding) as f:
-        text = f.read()
-    return text
+    return _read_decoded_text(file_path)
+
+
+# BOMとエンコード方式の対応（UTF-32LEのBOMはUTF-16LEのBOMを含むため先に判定する）
+_BOM_ENCODINGS = [
+    (codecs.BOM_UTF32_LE, "UTF-32"), (codecs.BOM_UTF32_BE, "UTF-32"), (codecs.BOM_UTF8, "UTF-8-SIG"),
+    (codecs.BOM_UTF16_LE, "UTF-16"), (codecs.BOM_UTF16_BE, "UTF-16"),
+]
+DETECT_ENCODING_CHUNK_SIZE = 64 * 1024
+DETECT_ENCODING_MAX_BYTES = 1024 * 1024
+ENCODING_CACHE_SIZE = 1024
+
+# (絶対パス, ファイルサイズ, 更新時刻)をキー（zipファイル内のファイルは(絶対パス::ファイル名, CRC, zipファイルの更新時刻)）にしたエンコード方式の検出結果のキャッシュ
+_encoding_cache: "OrderedDict[Tuple[str, int, int], Dict[str, Union[str, float]]]" = OrderedDict()
+_encoding_cache_lock = threading.Lock()
 
 
 @log_decorator
-def detect_encoding(file_path: str, chunk_size: int = 100) -> Dict[str, Union[str, float]]:
+def detect_encoding(file_path: str, chunk_size: int = DETECT_ENCODING_CHUNK_SIZE,
+                    max_bytes: int = DETECT_ENCODING_MAX_BYTES) -> Dict[str, Union[str, float]]:
     """エンコード方式を自動で検出
-    - 大容量ファイルに対応するため細かくファイルを分割して分析
+    - BOMがある場合はBOMから判定し、次にUTF-8として正しくデコードできるかを確認する
+    - どちらにも該当しない場合のみchardetで分析する
+    - 分析するのは先頭max_bytesまで。結果は(ファイルパス, サイズ, 更新時刻)ごとにキャッシュされる
 
     Parameters
     ----------
     file_path : str
         対象のファイルパス
     chunk_size : int, optional
-        1回の分析の最大容量（Byte単位）, by default 100
+        chardetに1回に渡す最大容量（Byte単位）, by default 65536
+    max_bytes : int, optional
+        分析する最大容量（Byte単位）, by default 1048576
 
     Returns
     -------
     Dict[str, Union[str, float]]
-        {'encoding': 'エンコード内容', 'confidence': '検出の確度'}
+        {'encoding': 'エンコード内容', 'confidence': '検出の確度', 'language': '言語'}
     """
 
-    with open(file_path, "rb") as f, contextlib.closing(UniversalDetector()) as detector:
-        while True:
-            chunk = f.read(chunk_size)
-            if not chunk:
-                break
-            detector.feed(chunk)
+    return _detect_encoding(file_path, chunk_size=chunk_size, max_bytes=max_bytes)
+
+
+def _detect_encoding(file_path: str, chunk_size: int = DETECT_ENCODING_CHUNK_SIZE,
+                     max_bytes: int = DETECT_ENCODING_MAX_BYTES) -> Dict[str, Union[str, float]]:
+    key = _encoding_cache_key(file_path)
+    result = _get_cached_encoding(key)
+    if result is None:
+        with _open_binary(file_path) as f:
+            sample = f.read(max_bytes + 1)
+        result = _detect_encoding_from_bytes(sample[:max_bytes], len(sample) <= max_bytes, chunk_size)
+        _put_cached_encoding(key, result)
+    return dict(result)
+
+
+def _detect_encoding_from_bytes(sample: bytes, is_complete: bool,
+                                chunk_size: int = DETECT_ENCODING_CHUNK_SIZE) -> Dict[str, Union[str, float]]:
+    for bom, encoding in _BOM_ENCODINGS:
+        if sample.startswith(bom):
+            return {"encoding": encoding, "confidence": 1.0, "language": ""}
+
+    try:
+        # 分析範囲の末尾で途切れたマルチバイト文字はエラーにしない
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=is_complete)
+    except UnicodeDecodeError:
+        pass
+    else:
+        if is_complete and sample.isascii():
+            return {"encoding": "ascii", "confidence": 1.0, "language": ""}
+        return {"encoding": "utf-8", "confidence": 0.99, "language": ""}
+
+    with contextlib.closing(UniversalDetector()) as detector:
+        for start in range(0, len(sample), chunk_size):
+            detector.feed(sample[start: start + chunk_size])
             if detector.done:
                 break
     return detector.result
+
+
+def _encoding_cache_key(file_path: str) -> Tuple[str, int, int]:
+    archive_path, member = split_archive_path(file_path)
+    stat = os.stat(archive_path)
+    if member is None:
+        return os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns
+    # zipファイル内のファイルはzipファイルの更新時刻とzipファイル内のファイルのCRCで区別する
+    _, info = _get_zip_member_info(archive_path, member)
+    return f"{os.path.abspath(archive_path)}{ARCHIVE_MEMBER_SEPARATOR}{member}", info.CRC, stat.st_mtime_ns
+
+
+def _get_cached_encoding(key: Tuple[str, int, int]) -> Union[Dict[str, Union[str, float]], None]:
+    with _encoding_cache_lock:
+        result = _encoding_cache.get(key)
+        if result is not None:
+            _encoding_cache.move_to_end(key)
+        return result
+
+
+def _put_cached_encoding(key: Tuple[str, int, int], result: Dict[str, Union[str, float]]) -> None:
+    with _encoding_cache_lock:
+        _encoding_cache[key] = dict(result)
+        while len(_encoding_cache) > ENCODING_CACHE_SIZE:
+            _encoding_cache.popitem(last=False)
+
+
+def _read_decoded_text(file_path: str) -> str:
+    # ファイルを1回だけ読み込み、同じバイト列でエンコード方式の検出とデコードを行う
+    key = _encoding_cache_key(file_path)
+    with _open_binary(file_path) as f:
+        data = f.read()
+    result = _get_cached_encoding(key)
+    if result is None:
+        result = _detect_encoding_from_bytes(data[:DETECT_ENCODING_MAX_BYTES], len(data) <= DETECT_ENCODING_MAX_BYTES)
+        _put_cached_encoding(key, result)
+    # open()のテキストモードと同じく改行コードを'\n'に統一する
+    with TextIOWrapper(BytesIO(data), encoding=result["encoding"]) as f:
+        return f.read()
+
+
+class ReadResult(NamedTuple):
+    """iter_read_filesの1ファイル分の読み込み結果
+
+    Attributes
+    ----------
+    file_path : str
+        読み込んだファイルパス
+    data : Any
+        読み込み結果（失敗した場合はNone）
+    error : Optional[BaseException]
+        読み込みに失敗した場合の例外（成功した場合はNone）
+    seconds : float
+        読み込みにかかった時間（秒）
+    """
+    file_path: str
+    data: Any
+    error: Optional[BaseException]
+    seconds: float
+
+
+# 拡張子ごとの読み込み関数
+READERS_BY_EXTENSION: Dict[str, Callable[[str], Any]] = {
+    ".json": read_json,
+    ".csv": read_csv,
+    ".tsv": read_tsv,
+    ".txt": read_txt,
+    ".pdf": read_pdf_text,
+    ".docx": read_docx_text,
+}
+
+# iter_read_filesで使う、log_decoratorの付いていない読み込み関数（失敗してもsys.exitせず、例外をファイルごとに返す）
+_UNDECORATED_READERS_BY_EXTENSION: Dict[str, Callable[[str], Any]] = {
+    ".json": _read_json,
+    ".csv": partial(_read_separated_value_file, delimiter=","),
+    ".tsv": partial(_read_separated_value_file, delimiter="\t"),
+    ".txt": _read_decoded_text,
+    ".pdf": _read_pdf_text,
+    ".docx": _read_docx_text,
+}
+
+
+@log_decorator
+def iter_read_files(sources: Union[str, Iterable[str]], n_workers: int = 4, use_processes: bool = False,
+                    max_pending: int = None) -> Iterator[ReadResult]:
+    """複数ファイルを拡張子に応じた読み込み関数で並列に読み込み、読み込みが終わった順に返すジェネレータ
+    - zipファイル内のファイルは展開せずに読み込む（スレッドで並列化する場合は1つのzipファイルを全スレッドで共有する）
+    - .gz, .bz2, .xzの圧縮ファイルは圧縮ファイルの拡張子を除いた拡張子で読み込み関数を選ぶ
+    - 読み込みに失敗したファイルがあっても停止せず、ReadResult.errorに例外を格納して処理を続ける
+
+    Parameters
+    ----------
+    sources : Union[str, Iterable[str]]
+        ディレクトリ（配下の対応する拡張子のファイルすべて）、globパターン、ファイルパス、またはそれらのイテラブル
+        zipファイル（内部の対応する拡張子のファイルすべて）、"zipファイルのパス::ディレクトリ/"、"zipファイルのパス::globパターン"も可
+    n_workers : int, optional
+        同時に読み込むファイル数, by default 4
+    use_processes : bool, optional
+        Trueの場合はスレッドではなくプロセスで並列化する（PDFなどCPU負荷が高い場合向け）, by default False
+    max_pending : int, optional
+        読み込み待ちにするファイル数の上限。Noneの場合はn_workersの2倍, by default None
+
+    Yields
+    -------
+    Iterator[ReadResult]
+        読み込みが終わった順の読み込み結果
+    """
+    max_pending = max_pending or n_workers * 2
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    with executor_class(max_workers=n_workers) as executor:
+        pending: Set[Future] = set()
+        try:
+            for file_path in _resolve_file_paths(sources):
+                if len(pending) >= max_pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    yield from (future.result() for future in done)
+                pending.add(executor.submit(_read_file, file_path))
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                yield from (future.result() for future in done)
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+@log_decorator
+def read_files(sources: Union[str, Iterable[str]], n_workers: int = 4,
+               use_processes: bool = False) -> Tuple[Dict[str, Any], Dict[str, BaseException]]:
+    """複数ファイルを並列に読み込み、成功した結果と失敗したファイルの例外をまとめて返す
+
+    Parameters
+    ----------
+    sources : Union[str, Iterable[str]]
+        ディレクトリ、globパターン、ファイルパス、zipファイル、またはそれらのイテラブル
+    n_workers : int, optional
+        同時に読み込むファイル数, by default 4
+    use_processes : bool, optional
+        Trueの場合はスレッドではなくプロセスで並列化する, by default False
+
+    Returns
+    -------
+    Tuple[Dict[str, Any], Dict[str, BaseException]]
+        ({ファイルパス: 読み込み結果}, {ファイルパス: 読み込み時の例外})
+    """
+    results, errors = {}, {}
+    for result in iter_read_files(sources, n_workers=n_workers, use_processes=use_processes):
+        if result.error is None:
+            results[result.file_path] = result.data
+        else:
+            errors[result.file_path] = result.error
+    return results, errors
+
+
+def _reader_extension(file_path: str) -> str:
+    # 圧縮ファイルは圧縮ファイルの拡張子を除いた拡張子で読み込み関数を選ぶ（example: data.json.gz -> .json）
+    return os.path.splitext(strip_compression_extension(file_path)[0])[1].lower()
+
+
+def _resolve_file_paths(sources: Union[str, Iterable[str]]) -> Iterator[str]:
+    for source in [sources] if isinstance(sources, str) else sources:
+        archive_path, member = split_archive_path(source)
+        if member is not None and (not member or member.endswith("/") or glob.has_magic(member)):
+            # zipファイル内のディレクトリ・globパターン
+            pattern = member + "*" if not member or member.endswith("/") else member
+            for file_path in iter_archive_members(archive_path, pattern):
+                if _reader_extension(file_path) in READERS_BY_EXTENSION:
+                    yield file_path
+        elif member is None and source.lower().endswith(".zip") and os.path.isfile(source):
+            for file_path in iter_archive_members(source):
+                if _reader_extension(file_path) in READERS_BY_EXTENSION:
+                    yield file_path
+        elif os.path.isdir(source):
+            for root, dirs, files in os.walk(source):
+                dirs.sort()
+                for name in sorted(files):
+                    if _reader_extension(name) in READERS_BY_EXTENSION:
+                        yield os.path.join(root, name)
+        elif glob.has_magic(source):
+            yield from sorted(path for path in glob.iglob(source, recursive=True) if os.path.isfile(path))
+        else:
+            yield source
+
+
+def _read_file(file_path: str) -> ReadResult:
+    start = time.perf_counter()
+    try:
+        extension = _reader_extension(file_path)
+        if extension not in READERS_BY_EXTENSION:
+            raise Exception(f"file_path: {file_path} の拡張子に対応する読み込み関数がありません（対応: {list(READERS_BY_EXTENSION)}）")
+        data = _UNDECORATED_READERS_BY_EXTENSION[extension](file_path)
+    except Exception as e:
+        return ReadResult(file_path, None, e, time.perf_counter() - start)
+    return ReadResult(file_path, data, None, time.perf_counter() - start)
@@ -1,25 +1,362 @@
 import csv
+import gzip
+import io
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from logging import getLogger
-from typing import List
+from typing import Iterable, List, Sequence
 
-from src.utils import log_decorator
+from src.utils import log_decorator, strip_compression_extension
 
 logger = getLogger()
 
+WRITE_BUFFER_SIZE = 1024 * 1024
+GZIP_COMPRESS_LEVEL = 6
+
+
+def _default_file_mode() -> int:
+    # mkstempで作成したファイルは0600になるため、open()で作成した場合と同じ権限に戻す
+    # umaskはプロセス全体の設定で、一時的に変更すると他のスレッドが作成するファイルの権限が変わるため、import時に1回だけ取得する
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("Umask:"):
+                    return 0o666 & ~int(line.split()[1], 8)
+    except OSError:
+        pass
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+DEFAULT_FILE_MODE = _default_file_mode()
+
+
+class SeparatedValueWriter:
+    """区切り文字で区切られたCSV、TSVなどのファイルを1行ずつ書き込むクラス
+    - 同じディレクトリの一時ファイルに書き込み、close()で書き込み先のファイルに置き換える（途中で失敗しても書き込み先は壊れない）
+    - 行はbuffer_sizeごとにまとめて書き込むため、全ての行をメモリに持たずに大容量のファイルを書き込める
+    - with文で使用した場合、with内で例外が発生すると一時ファイルを削除して書き込みを取り消す
+    - 1つのインスタンスに複数のスレッドから同時に書き込むことはできない（並列に書き込む場合はShardedSeparatedValueWriterを使う）
+
+    Parameters
+    ----------
+    file_path : str
+        書き込み先のファイルパス
+    delimiter : str, optional
+        区切り文字, by default ","
+    compress : bool, optional
+        gzipで圧縮する場合はTrue。Noneの場合はfile_pathの拡張子が.gzのときに圧縮する, by default None
+    buffer_size : int, optional
+        書き込みバッファの大きさ（Byte単位）, by default 1048576
+    encoding : str, optional
+        文字コード。Noneの場合はopen()と同じく環境の既定の文字コード, by default None
+    """
+
+    def __init__(self, file_path: str, delimiter: str = ",", compress: bool = None, buffer_size: int = WRITE_BUFFER_SIZE,
+                 encoding: str = None):
+        self.file_path = file_path
+        self.compress = strip_compression_extension(file_path)[1] == ".gz" if compress is None else compress
+        self.rows_written = 0
+        self.closed = False
+        directory, name = os.path.split(os.path.abspath(file_path))
+        fd, self._temp_path = tempfile.mkstemp(prefix=f".{name}.", suffix=".tmp", dir=directory)
+        self._raw = os.fdopen(fd, "wb", buffering=buffer_size)
+        binary = self._raw
+        if self.compress:
+            # gzipには1行ずつではなくbuffer_sizeごとにまとめて渡す
+            binary = io.BufferedWriter(gzip.GzipFile(filename="", mode="wb", fileobj=self._raw, compresslevel=GZIP_COMPRESS_LEVEL, mtime=0),
+                                       buffer_size=buffer_size)
+        # open(file_path, "w")と同じ改行コードの扱い・csv.writerの設定で書き込む
+        self._f = io.TextIOWrapper(binary, encoding=encoding)
+        self._writer = csv.writer(self._f, delimiter=delimiter)
+
+    def writerow(self, row: Sequence[str]) -> None:
+        """1行を書き込む"""
+        self._writer.writerow(row)
+        self.rows_written += 1
+
+    def writerows(self, rows: Iterable[Sequence[str]]) -> int:
+        """複数行を順に書き込む（ジェネレータも可）
+
+        Parameters
+        ----------
+        rows : Iterable[Sequence[str]]
+            ファイルに書き込む行のイテラブル
+
+        Returns
+        -------
+        int
+            書き込んだ行数
+        """
+        n_rows = 0
+        writerow = self._writer.writerow
+        for row in rows:
+            writerow(row)
+            n_rows += 1
+        self.rows_written += n_rows
+        return n_rows
+
+    def close(self) -> None:
+        """書き込みを完了し、一時ファイルを書き込み先のファイルに置き換える"""
+        if self.closed:
+            return
+        try:
+            self._finish()
+            self._commit()
+        except BaseException:
+            self.abort()
+            raise
+
+    def _finish(self) -> None:
+        # 一時ファイルへの書き込みを完了してディスクに書き出す（置き換えはしない）
+        if self._raw.closed:
+            return
+        self._f.flush()
+        if self.compress:
+            # gzipの末尾を書き込む（GzipFileはfileobjに渡したself._rawを閉じない）
+            self._f.close()
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+        self._f.close()
+        self._raw.close()
+
+    def _commit(self) -> None:
+        # 書き込み済みの一時ファイルを書き込み先のファイルに置き換える
+        os.chmod(self._temp_path, DEFAULT_FILE_MODE)
+        os.replace(self._temp_path, self.file_path)
+        self.closed = True
+
+    def abort(self) -> None:
+        """書き込みを取り消し、一時ファイルを削除する（書き込み先のファイルは変更しない）"""
+        if self.closed:
+            return
+        self.closed = True
+        for f in (self._f, self._raw):
+            try:
+                f.close()
+            except (OSError, ValueError):
+                pass
+        if os.path.exists(self._temp_path):
+            os.remove(self._temp_path)
+
+    def __enter__(self) -> "SeparatedValueWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def _backup_file(file_path: str) -> str:
+    # file_pathが存在する場合は同じディレクトリに退避したファイルのパスを返す（file_path自体はそのまま残す）
+    if not os.path.exists(file_path):
+        return None
+    directory, name = os.path.split(os.path.abspath(file_path))
+    fd, backup_path = tempfile.mkstemp(prefix=f".{name}.", suffix=".bak", dir=directory)
+    os.close(fd)
+    os.remove(backup_path)
+    try:
+        os.link(file_path, backup_path)
+    except OSError:
+        # ハードリンクを作成できないファイルシステムではコピーする
+        shutil.copy2(file_path, backup_path)
+    return backup_path
+
+
+def _restore_file(file_path: str, backup_path: str) -> None:
+    # _backup_fileで退避したファイルに戻す（退避したファイルが無い場合は削除する）
+    if backup_path is None:
+        os.remove(file_path)
+    else:
+        os.replace(backup_path, file_path)
+
+
+def shard_file_path(file_path: str, index: int, n_shards: int) -> str:
+    """シャードのファイルパスを作成（example: out.csv.gz -> out-00001-of-00004.csv.gz）
+
+    Parameters
+    ----------
+    file_path : str
+        分割前の書き込み先のファイルパス
+    index : int
+        シャードの番号（0始まり）
+    n_shards : int
+        シャード数
+
+    Returns
+    -------
+    str
+        シャードのファイルパス
+    """
+    root, compression = strip_compression_extension(file_path)
+    root, ext = os.path.splitext(root)
+    return f"{root}-{index:05d}-of-{n_shards:05d}{ext}{compression}"
+
+
+class ShardedSeparatedValueWriter:
+    """区切り文字で区切られたファイルをn_shards個のファイルに分割して書き込むクラス
+    - シャードごとにSeparatedValueWriterを持つため、シャードごとに別のスレッドから並列に書き込める
+    - close()では全てのシャードの書き込みが成功した場合のみ、全てのシャードを書き込み先のファイルに置き換える
+      （置き換えの途中で失敗した場合は、置き換え済みのシャードを元のファイルに戻す）
+    - with文で使用した場合、with内で例外が発生すると全てのシャードの書き込みを取り消す
+
+    Parameters
+    ----------
+    file_path : str
+        分割前の書き込み先のファイルパス（シャードのファイルパスはshard_file_pathで作成）
+    n_shards : int
+        シャード数
+    kwargs : dict
+        delimiter, compress, buffer_size, encodingなどSeparatedValueWriterの引数
+    """
+
+    def __init__(self, file_path: str, n_shards: int, **kwargs):
+        if n_shards < 1:
+            raise Exception(f"n_shards > 0 (but n_shards={n_shards})")
+        self.file_paths = [shard_file_path(file_path, i, n_shards) for i in range(n_shards)]
+        self.shards: List[SeparatedValueWriter] = []
+        try:
+            for path in self.file_paths:
+                self.shards.append(SeparatedValueWriter(path, **kwargs))
+        except BaseException:
+            self.abort()
+            raise
+
+    def __len__(self) -> int:
+        return len(self.shards)
+
+    def __getitem__(self, index: int) -> SeparatedValueWriter:
+        return self.shards[index]
+
+    @property
+    def rows_written(self) -> int:
+        return sum(shard.rows_written for shard in self.shards)
+
+    def close(self) -> None:
+        """全てのシャードの書き込みを完了し、書き込み先のファイルに置き換える"""
+        # 全てのシャードの一時ファイルを書き終えてから置き換える
+        try:
+            for shard in self.shards:
+                shard._finish()
+        except BaseException:
+            self.abort()
+            raise
+
+        # 置き換える前の書き込み先のファイルを退避しておき、途中で失敗した場合は置き換え済みのシャードを元に戻す
+        committed = []
+        try:
+            for shard in self.shards:
+                backup_path = _backup_file(shard.file_path)
+                committed.append((shard, backup_path))
+                shard._commit()
+        except BaseException:
+            for shard, backup_path in committed:
+                if shard.closed:
+                    _restore_file(shard.file_path, backup_path)
+                elif backup_path is not None:
+                    os.remove(backup_path)
+            self.abort()
+            raise
+        for _, backup_path in committed:
+            if backup_path is not None:
+                os.remove(backup_path)
+
+    def abort(self) -> None:
+        """全てのシャードの書き込みを取り消す"""
+        for shard in self.shards:
+            shard.abort()
+
+    def __enter__(self) -> "ShardedSeparatedValueWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+@log_decorator
+def write_rows(file_path: str, rows: Iterable[Sequence[str]], delimiter: str = ",", compress: bool = None,
+               buffer_size: int = WRITE_BUFFER_SIZE) -> int:
+    """行のイテラブル（ジェネレータも可）を区切り文字で区切られたファイルに書き込む
+    - 一時ファイルに書き込んでから置き換えるため、途中で失敗しても書き込み先のファイルは壊れない
+
+    Parameters
+    ----------
+    file_path : str
+        ファイルパス
+    rows : Iterable[Sequence[str]]
+        ファイルに書き込む行のイテラブル
+    delimiter : str, optional
+        区切り文字, by default ","
+    compress : bool, optional
+        gzipで圧縮する場合はTrue。Noneの場合はfile_pathの拡張子が.gzのときに圧縮する, by default None
+    buffer_size : int, optional
+        書き込みバッファの大きさ（Byte単位）, by default 1048576
+
+    Returns
+    -------
+    int
+        書き込んだ行数
+    """
+    with SeparatedValueWriter(file_path, delimiter=delimiter, compress=compress, buffer_size=buffer_size) as writer:
+        return writer.writerows(rows)
+
+
+@log_decorator
+def write_sharded_rows(file_path: str, producers: Sequence[Iterable[Sequence[str]]], delimiter: str = ",", compress: bool = None,
+                       buffer_size: int = WRITE_BUFFER_SIZE, n_workers: int = None) -> List[str]:
+    """複数の行のイテラブルをそれぞれ別のシャードに並列に書き込む
+    - producers[i]の行はshard_file_path(file_path, i, len(producers))に書き込む
+    - 1つでも失敗した場合は全てのシャードの書き込みを取り消す
+
+    Parameters
+    ----------
+    file_path : str
+        分割前の書き込み先のファイルパス
+    producers : Sequence[Iterable[Sequence[str]]]
+        シャードごとの行のイテラブル（ジェネレータも可）
+    delimiter : str, optional
+        区切り文字, by default ","
+    compress : bool, optional
+        gzipで圧縮する場合はTrue。Noneの場合はfile_pathの拡張子が.gzのときに圧縮する, by default None
+    buffer_size : int, optional
+        シャードごとの書き込みバッファの大きさ（Byte単位）, by default 1048576
+    n_workers : int, optional
+        同時に書き込むシャード数。Noneの場合はシャード数, by default None
+
+    Returns
+    -------
+    List[str]
+        書き込んだシャードのファイルパス
+    """
+    with ShardedSeparatedValueWriter(file_path, len(producers), delimiter=delimiter, compress=compress, buffer_size=buffer_size) as writer:
+        with ThreadPoolExecutor(max_workers=n_workers or len(producers)) as executor:
+            futures = [executor.submit(shard.writerows, rows) for shard, rows in zip(writer.shards, producers)]
+            for future in futures:
+                future.result()
+        return writer.file_paths
+
 
 @log_decorator
-def write_in_separated_value_file(file_path: str, rows_list: List[List[str]], delimiter=",") -> None:
+def write_in_separated_value_file(file_path: str, rows_list: Iterable[List[str]], delimiter=",") -> None:
     """区切り文字で区切られたCSV、TSVなどのファイル書き込み
+    - 一時ファイルに書き込んでから置き換えるため、途中で失敗しても書き込み先のファイルは壊れない
 
     Parameters
     ----------
     file_path : str
         ファイルパス
-    rows_list : List[List[str]]
-        ファイルに書き込む文字列を行ごとに格納した配列
+    rows_list : Iterable[List[str]]
+        ファイルに書き込む文字列を行ごとに格納した配列（ジェネレータも可）
     delimiter : str, optional
         区切り文字, by default ","
     """
-    with open(file_path, "w") as f:
-        writer = csv.writer(f, delimiter=delimiter)
+    with SeparatedValueWriter(file_path, delimiter=delimiter, compress=False) as writer:
         writer.writerows(rows_list)
@@ -0,0 +1,244 @@
+import json
+import math
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+# ヒストグラムのバケット: 1μs から 2**(1/4) 倍ずつ約134秒まで
+_BUCKET_MIN_SECONDS = 1e-6
+_BUCKETS_PER_OCTAVE = 4
+_N_BUCKETS = 27 * _BUCKETS_PER_OCTAVE + 2
+BUCKET_UPPER_BOUNDS: List[float] = [
+    _BUCKET_MIN_SECONDS * 2 ** (i / _BUCKETS_PER_OCTAVE) for i in range(_N_BUCKETS - 1)
+] + [float("inf")]
+
+
+class InstrumentationState:
+    """計測の有効・無効とサンプリング間隔
+
+    Attributes
+    ----------
+    enabled : bool
+        計測が有効かどうか（無効の場合はlog_decoratorはほぼ何もしない）
+    sample_every : int
+        何回の呼び出しにつき1回処理時間を計測するか（呼び出し回数は毎回数える）
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.sample_every = 1
+
+
+STATE = InstrumentationState()
+
+
+class LatencyHistogram:
+    """対数間隔の固定バケットによる処理時間のヒストグラム"""
+
+    def __init__(self):
+        self.counts = [0] * _N_BUCKETS
+        self.count = 0
+        self.total_seconds = 0.0
+
+    def record(self, seconds: float) -> None:
+        if seconds <= _BUCKET_MIN_SECONDS:
+            index = 0
+        else:
+            index = min(math.ceil(math.log2(seconds / _BUCKET_MIN_SECONDS) * _BUCKETS_PER_OCTAVE), _N_BUCKETS - 1)
+        self.counts[index] += 1
+        self.count += 1
+        self.total_seconds += seconds
+
+    def percentile(self, q: float) -> float:
+        """q（0 < q <= 1）分位点を含むバケットの上限値を返す（計測値が無い場合は0）"""
+        if self.count == 0:
+            return 0.0
+        threshold = q * self.count
+        cumulative = 0
+        for upper_bound, count in zip(BUCKET_UPPER_BOUNDS, self.counts):
+            cumulative += count
+            if cumulative >= threshold:
+                return upper_bound
+        return BUCKET_UPPER_BOUNDS[-1]
+
+
+class CallStats:
+    """関数ごとの呼び出し回数と処理時間のヒストグラム"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.errors = 0
+        self.histogram = LatencyHistogram()
+        self._lock = threading.Lock()
+
+    def should_sample(self) -> bool:
+        """呼び出し回数を数え、今回の呼び出しの処理時間を計測すべきかを返す（複数のスレッドから呼び出しても回数がずれない）"""
+        with self._lock:
+            self.calls += 1
+            return self.calls % STATE.sample_every == 0
+
+    def record_error(self) -> None:
+        """エラー回数を数える"""
+        with self._lock:
+            self.errors += 1
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self.histogram.record(seconds)
+
+    def record_call(self, seconds: float = None, error: bool = False) -> None:
+        """log_decoratorを通さない処理（推論リクエストなど）の1回分の呼び出しを記録
+
+        Parameters
+        ----------
+        seconds : float, optional
+            処理時間（Noneの場合は呼び出し回数・エラー回数だけを数える）, by default None
+        error : bool, optional
+            処理に失敗した場合はTrue, by default False
+        """
+        with self._lock:
+            self.calls += 1
+            if error:
+                self.errors += 1
+            if seconds is not None:
+                self.histogram.record(seconds)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.calls = 0
+            self.errors = 0
+            self.histogram = LatencyHistogram()
+
+    def to_dict(self) -> Dict[str, float]:
+        histogram = self.histogram
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "sampled": histogram.count,
+            "mean_seconds": histogram.total_seconds / histogram.count if histogram.count else 0.0,
+            "p50_seconds": histogram.percentile(0.50),
+            "p95_seconds": histogram.percentile(0.95),
+            "p99_seconds": histogram.percentile(0.99),
+        }
+
+
+_call_stats: Dict[str, CallStats] = {}
+_call_stats_lock = threading.Lock()
+
+
+def get_call_stats(name: str) -> CallStats:
+    """nameのCallStatsを取得（存在しない場合は作成）"""
+    with _call_stats_lock:
+        if name not in _call_stats:
+            _call_stats[name] = CallStats(name)
+        return _call_stats[name]
+
+
+def enable_instrumentation(sample_rate: float = 1.0) -> None:
+    """log_decoratorを付けた関数の計測を有効にする
+
+    Parameters
+    ----------
+    sample_rate : float, optional
+        処理時間を計測する呼び出しの割合（0 < sample_rate <= 1）, by default 1.0
+    """
+    if not 0 < sample_rate <= 1:
+        raise Exception(f"0 < sample_rate <= 1 (but sample_rate={sample_rate})")
+    STATE.sample_every = max(1, round(1 / sample_rate))
+    STATE.enabled = True
+
+
+def disable_instrumentation() -> None:
+    """log_decoratorを付けた関数の計測を無効にする（計測済みの値は残る）"""
+    STATE.enabled = False
+
+
+def reset_metrics() -> None:
+    """計測済みの値をすべて0に戻す"""
+    with _call_stats_lock:
+        for stats in _call_stats.values():
+            stats.reset()
+
+
+def get_metrics() -> Dict[str, Dict[str, float]]:
+    """1回以上呼び出された関数の呼び出し回数・エラー回数・処理時間のパーセンタイル（p50/p95/p99）を取得
+
+    Returns
+    -------
+    Dict[str, Dict[str, float]]
+        {'モジュール名.関数名': {'calls': 呼び出し回数, 'errors': エラー回数, 'sampled': 計測回数,
+        'mean_seconds': 平均, 'p50_seconds': p50, 'p95_seconds': p95, 'p99_seconds': p99}}
+    """
+    with _call_stats_lock:
+        return {name: stats.to_dict() for name, stats in sorted(_call_stats.items()) if stats.calls}
+
+
+def dump_metrics(file_path: str) -> None:
+    """計測結果をJSONファイルに書き出す
+
+    Parameters
+    ----------
+    file_path : str
+        書き出し先のファイルパス
+    """
+    with open(file_path, "w", encoding="utf-8") as f:
+        json.dump(get_metrics(), f, ensure_ascii=False, indent=2)
+
+
+def format_prometheus() -> str:
+    """計測結果をPrometheusのテキスト形式で取得"""
+    lines = [
+        "# TYPE function_calls_total counter",
+        "# TYPE function_errors_total counter",
+        "# TYPE function_latency_seconds summary",
+    ]
+    for name, metrics in get_metrics().items():
+        label = f'function="{name}"'
+        lines.append(f"function_calls_total{{{label}}} {metrics['calls']}")
+        lines.append(f"function_errors_total{{{label}}} {metrics['errors']}")
+        for quantile, key in [("0.5", "p50_seconds"), ("0.95", "p95_seconds"), ("0.99", "p99_seconds")]:
+            lines.append(f'function_latency_seconds{{{label},quantile="{quantile}"}} {metrics[key]}')
+        lines.append(f"function_latency_seconds_count{{{label}}} {metrics['sampled']}")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = format_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port: int = 9100, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """計測結果をPrometheusのテキスト形式で返すHTTPサーバーをバックグラウンドで起動
+
+    Parameters
+    ----------
+    port : int, optional
+        待ち受けるポート番号, by default 9100
+    host : str, optional
+        待ち受けるホスト, by default "127.0.0.1"
+
+    Returns
+    -------
+    ThreadingHTTPServer
+        起動したサーバー（停止する場合はshutdown()を呼ぶ）
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if os.getenv("INSTRUMENTATION_SAMPLE_RATE"):
+    enable_instrumentation(float(os.getenv("INSTRUMENTATION_SAMPLE_RATE")))
@@ -0,0 +1,82 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List
+
+from src.nlp import tokenizer
+from src.utils import iter_chunks, log_decorator
+
+BACKENDS = ("janome", "ginza", "sentencepiece")
+
+
+def _init_worker(backend: str, cache_path: str, cache_maxsize: int) -> None:
+    # fork元のSQLite接続は子プロセスで使えないため、キャッシュは開き直す
+    tokenizer._token_cache = None
+    if cache_maxsize:
+        tokenizer.enable_token_cache(path=cache_path, maxsize=cache_maxsize)
+    tokenizer.warmup_tokenizers([backend])
+
+
+def _wakachi_chunk(backend: str, chunk: List[str], is_midashi: bool) -> List[List[str]]:
+    wakachi_batch = getattr(tokenizer, f"wakachi_by_{backend}_batch")
+    options = {} if backend == "sentencepiece" else {"is_midashi": is_midashi}
+    results = list(wakachi_batch(chunk, batch_size=len(chunk), **options))
+    if tokenizer._token_cache is not None:
+        # ワーカープロセスの終了時にはatexitが呼ばれないため、チャンクごとに書き込む
+        tokenizer._token_cache.flush()
+    return results
+
+
+@log_decorator
+def wakachi_corpus(documents: Iterable[str], backend: str = "janome", is_midashi: bool = True, chunk_size: int = 256,
+                   n_workers: int = None, max_pending_chunks: int = None) -> Iterator[List[str]]:
+    """複数プロセスを用いたコーパス全体の分かち書き
+    - documentsをchunk_size件ずつのチャンクに分割してワーカープロセスに渡し、結果を入力と同じ順番で返す
+    - 各ワーカープロセスは起動時に1回だけ形態素解析器を読み込む
+    - 処理待ちのチャンクはmax_pending_chunks個までに制限されるため、documentsが巨大なジェネレータでもメモリ使用量は一定
+
+    Parameters
+    ----------
+    documents : Iterable[str]
+        分かち書きしたい文章のイテラブル（ジェネレータも可）
+    backend : str, optional
+        形態素解析器（"janome", "ginza", "sentencepiece"）, by default "janome"
+    is_midashi : bool, optional
+        見出し語で分かち書きをする場合はTrue（sentencepieceでは無視）, by default True
+    chunk_size : int, optional
+        1回にワーカープロセスに渡す文章数, by default 256
+    n_workers : int, optional
+        ワーカープロセス数。Noneの場合はCPUコア数, by default None
+    max_pending_chunks : int, optional
+        同時に処理待ちにするチャンク数の上限。Noneの場合はn_workersの2倍, by default None
+
+    Yields
+    -------
+    Iterator[List[str]]
+        documentsの順番通りの分かち書き結果
+    """
+    if backend not in BACKENDS:
+        raise Exception(f"backend: {backend} は{BACKENDS}のいずれかで指定してください")
+    n_workers = n_workers or os.cpu_count() or 1
+    max_pending_chunks = max_pending_chunks or n_workers * 2
+    if n_workers == 1:
+        for chunk in iter_chunks(documents, chunk_size):
+            yield from _wakachi_chunk(backend, chunk, is_midashi)
+        return
+
+    cache = tokenizer._token_cache
+    initargs = (backend, cache.path, cache.maxsize) if cache is not None else (backend, None, 0)
+    if cache is not None:
+        cache.flush()
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=initargs) as executor:
+        pending = deque()
+        try:
+            for chunk in iter_chunks(documents, chunk_size):
+                if len(pending) >= max_pending_chunks:
+                    yield from pending.popleft().result()
+                pending.append(executor.submit(_wakachi_chunk, backend, chunk, is_midashi))
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
@@ -0,0 +1,100 @@
+import re
+from typing import Iterable, Iterator, NamedTuple, Union
+
+from src.utils import log_decorator
+
+DEFAULT_MAX_CHARS = 2000
+
+# 区切りの候補（優先度の高い順）と、区切りの後ろを先読みする最大文字数。いずれも区切り文字の直後で分割する
+_BOUNDARY_PATTERNS = [
+    # 条文の見出し（行頭の「第N条」）の直前（見出しがチャンクの末尾をまたいでも見つけられるように先読みする）
+    (re.compile(r"[\n\x0c](?=[ \t　]*第[0-9０-９一二三四五六七八九十百千]+条)"), 32),
+    # 改行・改ページ
+    (re.compile(r"[\n\x0c]+"), 0),
+    # 文末（閉じ括弧は前の文に含める）
+    (re.compile(r"[。．！？!?]+[」』）)]*"), 0),
+    # 読点などの節の区切り
+    (re.compile(r"[、，,；;]"), 0),
+]
+_MAX_LOOKAHEAD = max(lookahead for _, lookahead in _BOUNDARY_PATTERNS)
+
+
+class DocumentChunk(NamedTuple):
+    """split_documentで分割した文章の一部
+
+    Attributes
+    ----------
+    text : str
+        分割した文章
+    start : int
+        文章全体の中でのtextの開始位置（文字単位）
+    """
+    text: str
+    start: int
+
+
+@log_decorator
+def split_document(document: Union[str, Iterable[str]], max_chars: int = DEFAULT_MAX_CHARS) -> Iterator[DocumentChunk]:
+    """長い文章を形態素解析しやすいmax_chars文字以下のチャンクに分割する
+    - 行頭の「第N条」の直前、改行、「。」などの文末、「、」などの節の区切りの順に優先して区切る
+    - チャンクがmax_charsの半分未満になる区切りしか無い場合は優先度の低い区切りを使い、どの区切りも無い場合はmax_chars文字で区切る
+    - 文字列を途中で読み替えないため、全てのチャンクのtextを連結すると元の文章に一致する
+    - documentに文字列のイテラブル（iter_pdf_pagesのページ、ファイルの行など）を渡した場合、読み込み済みの未分割部分だけを保持する
+
+    Parameters
+    ----------
+    document : Union[str, Iterable[str]]
+        分割したい文章、または文章を先頭から順に分けた文字列のイテラブル（ジェネレータも可）
+    max_chars : int, optional
+        1チャンクの最大文字数, by default 2000
+
+    Returns
+    -------
+    Iterator[DocumentChunk]
+        文章の先頭から順のチャンクを返すイテレータ（空のチャンクは返さない）
+    """
+    # ジェネレータ関数にすると引数の確認が最初のnext()まで遅れるため、確認してからジェネレータを返す
+    if max_chars < 1:
+        raise Exception(f"max_chars > 0 (but max_chars={max_chars})")
+    return _split_document(document, max_chars)
+
+
+def _split_document(document: Union[str, Iterable[str]], max_chars: int) -> Iterator[DocumentChunk]:
+    pieces = [document] if isinstance(document, str) else document
+    buffer = ""
+    pos = 0  # bufferの未分割部分の開始位置
+    offset = 0  # bufferの先頭の文章全体の中での位置
+    for piece in pieces:
+        if not piece:
+            continue
+        # 分割済みの部分を捨ててから読み足す（巨大な1つの文字列の場合はコピーせずにposを進める）
+        if pos:
+            offset += pos
+            buffer, pos = buffer[pos:], 0
+        buffer = buffer + piece if buffer else piece
+        # 続きを読み込む前は、区切りの先読みに必要な文字数を残して分割する（文字列1つで渡した場合と同じ位置で区切る）
+        while len(buffer) - pos > max_chars + _MAX_LOOKAHEAD:
+            end = _find_boundary(buffer, pos, max_chars)
+            yield DocumentChunk(buffer[pos:end], offset + pos)
+            pos = end
+    while len(buffer) - pos > max_chars:
+        end = _find_boundary(buffer, pos, max_chars)
+        yield DocumentChunk(buffer[pos:end], offset + pos)
+        pos = end
+    if len(buffer) > pos:
+        yield DocumentChunk(buffer[pos:], offset + pos)
+
+
+def _find_boundary(text: str, pos: int, max_chars: int) -> int:
+    # text[pos: pos + max_chars]の中で最も優先度の高い区切りのうち、最も後ろの位置を返す
+    end = pos + max_chars
+    min_end = pos + max(max_chars // 2, 1)
+    for pattern, lookahead in _BOUNDARY_PATTERNS:
+        boundary = -1
+        # 区切りの位置はend以下に限るが、先読みする部分はendより後ろも検索範囲に含める
+        for match in pattern.finditer(text, min_end - 1, end + lookahead):
+            if min_end <= match.end() <= end:
+                boundary = match.end()
+        if boundary > 0:
+            return boundary
+    return end
@@ -0,0 +1,115 @@
+import threading
+import time
+from logging import getLogger
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple
+
+from src.utils import get_rss_bytes
+
+logger = getLogger(__name__)
+
+
+class ModelLoadStats(NamedTuple):
+    """モデル読み込み時の計測結果
+
+    Attributes
+    ----------
+    name : str
+        モデル名
+    load_seconds : float
+        読み込みにかかった時間（秒）
+    rss_delta_bytes : int
+        読み込み前後のRSSの増加量（Byte単位、他スレッドの処理分も含む概算値）
+    rss_after_bytes : int
+        読み込み直後のRSS（Byte単位）
+    """
+    name: str
+    load_seconds: float
+    rss_delta_bytes: int
+    rss_after_bytes: int
+
+
+class ModelRegistry:
+    """形態素解析器などの重いモデルを初回利用時に読み込むためのレジストリ
+    - register()で読み込み関数だけを登録しておき、get()が初めて呼ばれたときに読み込む
+    - 読み込みはモデルごとにロックされるため、複数スレッドから同時に呼ばれても1回しか読み込まない
+    """
+
+    def __init__(self):
+        self._loaders: Dict[str, Callable[[], Any]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._models: Dict[str, Any] = {}
+        self._stats: Dict[str, ModelLoadStats] = {}
+
+    def register(self, name: str, loader: Callable[[], Any]) -> None:
+        """モデルの読み込み関数を登録
+
+        Parameters
+        ----------
+        name : str
+            モデル名
+        loader : Callable[[], Any]
+            引数なしでモデルを読み込んで返す関数
+        """
+        if name in self._loaders:
+            raise Exception(f"name: {name} は既に登録されています")
+        self._loaders[name] = loader
+        self._locks[name] = threading.Lock()
+
+    @property
+    def names(self) -> List[str]:
+        """登録済みのモデル名の一覧"""
+        return list(self._loaders)
+
+    def is_loaded(self, name: str) -> bool:
+        """モデルが読み込み済みかどうか"""
+        return name in self._models
+
+    def get(self, name: str) -> Any:
+        """モデルを取得（未読み込みの場合はここで読み込む）
+
+        Parameters
+        ----------
+        name : str
+            モデル名
+
+        Returns
+        -------
+        Any
+            読み込み済みのモデル
+        """
+        if name in self._models:
+            return self._models[name]
+        if name not in self._loaders:
+            raise Exception(f"name: {name} は登録されていません（登録済み: {self.names}）")
+        with self._locks[name]:
+            if name not in self._models:
+                rss_before = get_rss_bytes()
+                start = time.perf_counter()
+                self._models[name] = self._loaders[name]()
+                load_seconds = time.perf_counter() - start
+                rss_after = get_rss_bytes()
+                self._stats[name] = ModelLoadStats(name, load_seconds, rss_after - rss_before, rss_after)
+                logger.info(f"{name} loaded | {load_seconds:.3f}s | rss +{(rss_after - rss_before) / 1024 ** 2:.1f}MB")
+        return self._models[name]
+
+    def warmup(self, names: Iterable[str] = None) -> Dict[str, ModelLoadStats]:
+        """指定したモデルを事前に読み込む
+
+        Parameters
+        ----------
+        names : Iterable[str], optional
+            読み込むモデル名。Noneの場合は登録済みの全モデル, by default None
+
+        Returns
+        -------
+        Dict[str, ModelLoadStats]
+            読み込んだモデルの計測結果
+        """
+        names = self.names if names is None else list(names)
+        for name in names:
+            self.get(name)
+        return {name: self._stats[name] for name in names}
+
+    def stats(self) -> Dict[str, ModelLoadStats]:
+        """読み込み済みの全モデルの計測結果を取得"""
+        return dict(self._stats)
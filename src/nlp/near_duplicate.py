@@ -0,0 +1,241 @@
+import zlib
+from typing import Dict, Hashable, Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+from src.nlp.tokenizer import to_ngram
+from src.utils import iter_chunks, log_decorator
+
+# crc32（32bit）より大きい素数。a, b < 2 ** 32なので (a * x + b) はuint64で桁あふれしない
+_PRIME = np.uint64(4294967311)
+# signatureで一度に計算するシングルの数（一時配列の大きさはnum_perm × SIGNATURE_BLOCK_SIZE × 8 Byte）
+SIGNATURE_BLOCK_SIZE = 4096
+
+
+class MinHasher:
+    """to_ngramの文字N-gram（シングル）の集合からMinHashシグネチャを作成する
+
+    Parameters
+    ----------
+    num_perm : int, optional
+        ハッシュ関数（シグネチャの次元）の数, by default 128
+    n : int, optional
+        シングルにする文字N-gramのN, by default 5
+    seed : int, optional
+        ハッシュ関数の係数を決める乱数のシード, by default 1
+    """
+
+    def __init__(self, num_perm: int = 128, n: int = 5, seed: int = 1):
+        if num_perm < 1:
+            raise Exception(f"num_perm > 0 (but num_perm={num_perm})")
+        self.num_perm = num_perm
+        self.n = n
+        self.seed = seed
+        random_state = np.random.RandomState(seed)
+        self._a = random_state.randint(1, 2 ** 32 - 1, size=num_perm, dtype=np.uint64).reshape(-1, 1)
+        self._b = random_state.randint(0, 2 ** 32 - 1, size=num_perm, dtype=np.uint64).reshape(-1, 1)
+
+    def shingles(self, text: str) -> np.ndarray:
+        """textの文字N-gramの重複なしのハッシュ値（nより短い文章は文章全体を1つのシングルとする）"""
+        ngrams = to_ngram(text, self.n) if len(text) >= self.n else [text] if text else []
+        return np.unique(np.fromiter((zlib.crc32(ngram.encode("utf-8")) for ngram in ngrams), dtype=np.uint64, count=len(ngrams)))
+
+    def signature(self, text: str) -> np.ndarray:
+        """textのMinHashシグネチャ
+
+        Parameters
+        ----------
+        text : str
+            シグネチャを作成したい文章
+
+        Returns
+        -------
+        np.ndarray
+            長さnum_permのシグネチャ（dtype=np.uint64、空文字列は全て_PRIME）
+        """
+        hashes = self.shingles(text)
+        signature = np.full(self.num_perm, _PRIME, dtype=np.uint64)
+        # 長い文章でも一時配列が大きくならないように、シングルをSIGNATURE_BLOCK_SIZE個ずつ処理して最小値を更新する
+        for start in range(0, len(hashes), SIGNATURE_BLOCK_SIZE):
+            block = hashes[start: start + SIGNATURE_BLOCK_SIZE]
+            np.minimum(signature, ((self._a * block + self._b) % _PRIME).min(axis=1), out=signature)
+        return signature
+
+    def signatures(self, texts: Iterable[str]) -> np.ndarray:
+        """複数の文章のシグネチャを(文章数, num_perm)の配列にまとめて返す"""
+        signatures = [self.signature(text) for text in texts]
+        return np.vstack(signatures) if signatures else np.empty((0, self.num_perm), dtype=np.uint64)
+
+
+def estimate_jaccard(signature: np.ndarray, other: np.ndarray) -> float:
+    """2つのMinHashシグネチャから文字N-gram集合のJaccard係数を推定"""
+    return float(np.mean(signature == other))
+
+
+def optimal_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """LSHの候補になる確率が0.5になるJaccard係数 (1 / bands) ** (1 / rows) がthresholdに最も近い(bands, rows)"""
+    candidates = [(bands, num_perm // bands) for bands in range(1, num_perm + 1)]
+    return min(candidates, key=lambda br: abs((1 / br[0]) ** (1 / br[1]) - threshold))
+
+
+class MinHashLSH:
+    """MinHashシグネチャをbands個の帯に分け、帯ごとのバケットで近似重複の候補を探すインデックス
+    - 文書の追加（insert）と検索（query）は何度でも交互に行える
+    - 候補はシグネチャから推定したJaccard係数がthreshold以上のものだけを返す
+
+    Parameters
+    ----------
+    threshold : float, optional
+        近似重複とみなす文字N-gramのJaccard係数, by default 0.8
+    num_perm : int, optional
+        MinHashのハッシュ関数の数, by default 128
+    n : int, optional
+        シングルにする文字N-gramのN, by default 5
+    seed : int, optional
+        ハッシュ関数の係数を決める乱数のシード, by default 1
+
+    Examples
+    --------
+    >>> lsh = MinHashLSH(threshold=0.8)
+    >>> lsh.insert("doc-1", "甲は乙に対し、本契約に基づく債務を負う。")
+    >>> lsh.query("甲は乙に対し、本契約に基づく債務を負う")
+    ['doc-1']
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128, n: int = 5, seed: int = 1):
+        if not 0 < threshold <= 1:
+            raise Exception(f"0 < threshold <= 1 (but threshold={threshold})")
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm=num_perm, n=n, seed=seed)
+        self.bands, self.rows = optimal_bands(threshold, num_perm)
+        self._buckets: List[Dict[bytes, List[Hashable]]] = [{} for _ in range(self.bands)]
+        self._signatures: Dict[Hashable, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._signatures
+
+    def insert(self, key: Hashable, text: str = None, signature: np.ndarray = None):
+        """文書をインデックスに追加
+
+        Parameters
+        ----------
+        key : Hashable
+            文書を識別するキー
+        text : str, optional
+            文書の本文（signatureを指定しない場合は必須）, by default None
+        signature : np.ndarray, optional
+            作成済みのMinHashシグネチャ, by default None
+        """
+        if key in self._signatures:
+            raise Exception(f"{key} is already inserted")
+        signature = self._get_signature(text, signature)
+        self._signatures[key] = signature
+        for buckets, band in zip(self._buckets, self._bands(signature)):
+            buckets.setdefault(band, []).append(key)
+
+    def query(self, text: str = None, signature: np.ndarray = None) -> List[Hashable]:
+        """近似重複の文書のキーを推定Jaccard係数の降順で取得
+
+        Parameters
+        ----------
+        text : str, optional
+            検索したい文章（signatureを指定しない場合は必須）, by default None
+        signature : np.ndarray, optional
+            作成済みのMinHashシグネチャ, by default None
+
+        Returns
+        -------
+        List[Hashable]
+            推定Jaccard係数がthreshold以上の文書のキー
+        """
+        return [key for key, _ in self.query_with_scores(text, signature)]
+
+    def query_with_scores(self, text: str = None, signature: np.ndarray = None) -> List[Tuple[Hashable, float]]:
+        """queryと同じ検索を行い、(キー, 推定Jaccard係数)を返す"""
+        signature = self._get_signature(text, signature)
+        candidates = {key for buckets, band in zip(self._buckets, self._bands(signature)) for key in buckets.get(band, ())}
+        scores = [(key, estimate_jaccard(signature, self._signatures[key])) for key in candidates]
+        return sorted([(key, score) for key, score in scores if score >= self.threshold], key=lambda ks: -ks[1])
+
+    def _get_signature(self, text: str = None, signature: np.ndarray = None) -> np.ndarray:
+        if signature is not None:
+            return signature
+        if text is None:
+            raise Exception("text or signature is required")
+        return self.hasher.signature(text)
+
+    def _bands(self, signature: np.ndarray) -> Iterator[bytes]:
+        for i in range(self.bands):
+            yield signature[i * self.rows: (i + 1) * self.rows].tobytes()
+
+
+@log_decorator
+def find_near_duplicates(texts: Iterable[str], threshold: float = 0.8, num_perm: int = 128, n: int = 5,
+                         batch_size: int = 1000) -> Iterator[Tuple[int, int, float]]:
+    """textsの中の近似重複のペアを順番に返すジェネレータ
+    - 各文章はそれより前の文章だけと比較する（全ペアの比較はしない）
+
+    Parameters
+    ----------
+    texts : Iterable[str]
+        文章のイテラブル（ジェネレータも可）
+    threshold : float, optional
+        近似重複とみなす文字N-gramのJaccard係数, by default 0.8
+    num_perm : int, optional
+        MinHashのハッシュ関数の数, by default 128
+    n : int, optional
+        シングルにする文字N-gramのN, by default 5
+    batch_size : int, optional
+        まとめてシグネチャを作成する文章数, by default 1000
+
+    Yields
+    -------
+    Iterator[Tuple[int, int, float]]
+        (文章の番号, それより前にある近似重複の文章の番号, 推定Jaccard係数)
+    """
+    lsh = MinHashLSH(threshold=threshold, num_perm=num_perm, n=n)
+    index = 0
+    for batch in iter_chunks(texts, batch_size):
+        for signature in lsh.hasher.signatures(batch):
+            for duplicate_index, score in lsh.query_with_scores(signature=signature):
+                yield index, duplicate_index, score
+            lsh.insert(index, signature=signature)
+            index += 1
+
+
+@log_decorator
+def deduplicate(texts: Iterable[str], threshold: float = 0.8, num_perm: int = 128, n: int = 5,
+                batch_size: int = 1000) -> List[int]:
+    """近似重複を除いた文章の番号を取得（近似重複の中では最初に出現した文章を残す）
+
+    Parameters
+    ----------
+    texts : Iterable[str]
+        文章のイテラブル（ジェネレータも可）
+    threshold : float, optional
+        近似重複とみなす文字N-gramのJaccard係数, by default 0.8
+    num_perm : int, optional
+        MinHashのハッシュ関数の数, by default 128
+    n : int, optional
+        シングルにする文字N-gramのN, by default 5
+    batch_size : int, optional
+        まとめてシグネチャを作成する文章数, by default 1000
+
+    Returns
+    -------
+    List[int]
+        残す文章の番号（昇順）
+    """
+    lsh = MinHashLSH(threshold=threshold, num_perm=num_perm, n=n)
+    kept = []
+    index = 0
+    for batch in iter_chunks(texts, batch_size):
+        for signature in lsh.hasher.signatures(batch):
+            if not lsh.query(signature=signature):
+                lsh.insert(index, signature=signature)
+                kept.append(index)
+            index += 1
+    return kept
@@ -0,0 +1,192 @@
+import zlib
+from typing import Iterable, Iterator, List, Tuple, Union
+
+import numpy as np
+
+from src.utils import iter_chunks, log_decorator
+
+# N-gramのハッシュ値の計算に使う定数（いずれも64bitの奇数）
+_ROLLING_MULTIPLIER = np.uint64(0x100000001B3)
+_ORDER_MULTIPLIER = 0x9E3779B97F4A7C15
+_MIX_MULTIPLIER_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_MULTIPLIER_2 = np.uint64(0x94D049BB133111EB)
+
+
+def ngram_keys(item: Union[str, List[str]], max_n: int) -> np.ndarray:
+    """itemの1〜max_n-gramを64bitのハッシュ値の配列に変換
+    - 並び順はto_ngrams(item, max_n)を平坦化した順番と同じ
+
+    Parameters
+    ----------
+    item : Union[str, List[str]]
+        N-gramに変換したい文字列、または分かち書きのリスト
+    max_n : int > 0
+        N-gramのNの最大値
+
+    Returns
+    -------
+    np.ndarray
+        N-gramごとの64bitのハッシュ値（dtype=np.uint64）
+    """
+    keys, _ = _batch_ngram_keys([item], max_n)
+    return keys
+
+
+@log_decorator
+def extract_ngram_ids(items: Iterable[Union[str, List[str]]], max_n: int, n_features: int = 2 ** 20,
+                      vocabulary: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray]:
+    """複数の文書の1〜max_n-gramを整数の特徴量IDに変換し、1つの配列にまとめる
+    - i番目の文書の特徴量IDはids[offsets[i]:offsets[i + 1]]
+
+    Parameters
+    ----------
+    items : Iterable[Union[str, List[str]]]
+        文字列、または分かち書きのリストのイテラブル（ジェネレータも可）
+    max_n : int > 0
+        N-gramのNの最大値
+    n_features : int, optional
+        ハッシュ値を特徴量IDに変換するときの特徴量の数（vocabularyを指定した場合は無視）, by default 2 ** 20
+    vocabulary : np.ndarray, optional
+        build_ngram_vocabularyで作成した語彙。指定した場合は語彙内の位置を特徴量IDとし、語彙に無いN-gramは除く, by default None
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray]
+        (特徴量IDの配列, 文書ごとの開始位置の配列（長さは文書数 + 1）)
+    """
+    items = list(items)
+    keys, documents = _batch_ngram_keys(items, max_n)
+    if vocabulary is None:
+        ids = keys % np.uint64(n_features)
+    else:
+        ids, found = _lookup_vocabulary(keys, vocabulary)
+        documents = documents[found]
+    offsets = np.zeros(len(items) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(documents, minlength=len(items)), out=offsets[1:])
+    return ids.astype(_ids_dtype(n_features, vocabulary)), offsets
+
+
+@log_decorator
+def iter_ngram_id_batches(items: Iterable[Union[str, List[str]]], max_n: int, n_features: int = 2 ** 20,
+                          vocabulary: np.ndarray = None, batch_size: int = 10000) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """extract_ngram_idsをbatch_size件の文書ごとに実行して返すジェネレータ（大規模コーパス向け）
+
+    Parameters
+    ----------
+    items : Iterable[Union[str, List[str]]]
+        文字列、または分かち書きのリストのイテラブル（ジェネレータも可）
+    max_n : int > 0
+        N-gramのNの最大値
+    n_features : int, optional
+        ハッシュ値を特徴量IDに変換するときの特徴量の数, by default 2 ** 20
+    vocabulary : np.ndarray, optional
+        build_ngram_vocabularyで作成した語彙, by default None
+    batch_size : int, optional
+        1回に変換する文書数, by default 10000
+
+    Yields
+    -------
+    Iterator[Tuple[np.ndarray, np.ndarray]]
+        batch_size件ごとの(特徴量IDの配列, 文書ごとの開始位置の配列)
+    """
+    for batch in iter_chunks(items, batch_size):
+        yield extract_ngram_ids(batch, max_n, n_features=n_features, vocabulary=vocabulary)
+
+
+@log_decorator
+def build_ngram_vocabulary(items: Iterable[Union[str, List[str]]], max_n: int, min_freq: int = 1,
+                           batch_size: int = 10000) -> np.ndarray:
+    """min_freq回以上出現するN-gramのハッシュ値を語彙として作成
+
+    Parameters
+    ----------
+    items : Iterable[Union[str, List[str]]]
+        文字列、または分かち書きのリストのイテラブル（ジェネレータも可）
+    max_n : int > 0
+        N-gramのNの最大値
+    min_freq : int, optional
+        語彙に含める最小の出現回数, by default 1
+    batch_size : int, optional
+        1回に集計する文書数, by default 10000
+
+    Returns
+    -------
+    np.ndarray
+        昇順に並んだN-gramのハッシュ値（dtype=np.uint64、位置が特徴量IDになる）
+    """
+    unique_keys = np.empty(0, dtype=np.uint64)
+    counts = np.empty(0, dtype=np.int64)
+    for batch in iter_chunks(items, batch_size):
+        batch_keys, batch_counts = np.unique(_batch_ngram_keys(batch, max_n)[0], return_counts=True)
+        merged_keys, inverse = np.unique(np.concatenate([unique_keys, batch_keys]), return_inverse=True)
+        merged_counts = np.zeros(len(merged_keys), dtype=np.int64)
+        np.add.at(merged_counts, inverse, np.concatenate([counts, batch_counts]))
+        unique_keys, counts = merged_keys, merged_counts
+    return unique_keys[counts >= min_freq]
+
+
+def _batch_ngram_keys(items: List[Union[str, List[str]]], max_n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """複数の文書の1〜max_n-gramのハッシュ値を、文書を連結した1つのコード配列からまとめて計算
+    - nごとのハッシュ値はn-1の結果を再利用して計算し、文書の境界をまたぐN-gramは除く
+    - 並び順は文書ごとにto_ngramsを平坦化した順番と同じ
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray]
+        (N-gramごとのハッシュ値, N-gramごとの文書番号)
+    """
+    if max_n < 1:
+        raise Exception(f"max_n > 0 (but max_n={max_n})")
+    if all(isinstance(item, str) for item in items):
+        codes = np.frombuffer("".join(items).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    else:
+        codes = np.fromiter(
+            (zlib.crc32(token.encode("utf-8")) for item in items for token in item),
+            dtype=np.uint64,
+            count=sum(len(item) for item in items),
+        )
+    codes += np.uint64(1)
+    lengths = np.fromiter((len(item) for item in items), dtype=np.int64, count=len(items))
+    documents = np.repeat(np.arange(len(items), dtype=np.int64), lengths)
+    # 各位置から文書の末尾までの長さ（これがn以上の位置からN-gramを作れる）
+    remaining = np.repeat(np.cumsum(lengths), lengths) - np.arange(len(codes), dtype=np.int64)
+
+    keys_list, documents_list = [], []
+    rolling = codes
+    for n in range(1, max_n + 1):
+        if n > 1:
+            rolling = rolling[:-1] * _ROLLING_MULTIPLIER + codes[n - 1:]
+        if len(rolling) == 0:
+            break
+        valid = remaining[: len(rolling)] >= n
+        keys_list.append(_mix(rolling[valid] + np.uint64((n * _ORDER_MULTIPLIER) & 0xFFFFFFFFFFFFFFFF)))
+        documents_list.append(documents[: len(rolling)][valid])
+    if not keys_list:
+        return np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int64)
+    keys, documents = np.concatenate(keys_list), np.concatenate(documents_list)
+    # n→位置の順で並んでいるので、文書番号で安定ソートして文書→n→位置の順にする
+    order = np.argsort(documents, kind="stable")
+    return keys[order], documents[order]
+
+
+def _mix(values: np.ndarray) -> np.ndarray:
+    # splitmix64の最終化処理（ハッシュ値の偏りを無くす）
+    values = values ^ (values >> np.uint64(30))
+    values = values * _MIX_MULTIPLIER_1
+    values = values ^ (values >> np.uint64(27))
+    values = values * _MIX_MULTIPLIER_2
+    return values ^ (values >> np.uint64(31))
+
+
+def _lookup_vocabulary(keys: np.ndarray, vocabulary: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # 昇順の語彙を二分探索し、(見つかったキーの位置, 見つかったかどうかのマスク)を返す
+    if len(vocabulary) == 0:
+        return np.empty(0, dtype=np.int64), np.zeros(len(keys), dtype=bool)
+    positions = np.searchsorted(vocabulary, keys)
+    found = vocabulary[np.minimum(positions, len(vocabulary) - 1)] == keys
+    return positions[found], found
+
+
+def _ids_dtype(n_features: int, vocabulary: np.ndarray = None) -> np.dtype:
+    size = n_features if vocabulary is None else len(vocabulary)
+    return np.dtype(np.int32) if size <= np.iinfo(np.int32).max else np.dtype(np.int64)
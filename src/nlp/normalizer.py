@@ -1,4 +1,6 @@
 import re
+from functools import partial
+from typing import Callable, Iterable, Iterator, List
 
 import mojimoji
 
@@ -61,3 +63,147 @@ def normalize_spaces(sentence: str, replacement: str = "", pattern: str = None,
     if do_strip:
         proc_sentence = proc_sentence.strip()
     return re.sub(pattern, replacement, proc_sentence)
+
+
+_zenkaku_digit_pattern = re.compile(r"[０-９]")
+# 融合できる置換文字列に含まれてはいけない文字（空白・数字・カンマ・re.subのエスケープ）
+_unfusable_replacement_pattern = re.compile(r"[\s\d,，\\]")
+
+
+class NormalizerPipeline:
+    """normalize_numbers, normalize_spacesなどの正規化処理を連続して適用するパイプライン
+    - 正規表現は最初の1回だけコンパイルし、各文章にはコンパイル済みの処理だけを適用する
+    - デフォルトパターンの数字の正規化の直後に空白の正規化があり、置換文字列が同じ場合は1回の置換にまとめる
+    - 結果は追加した順に各関数を適用した場合と完全に一致する
+
+    Examples
+    --------
+    >>> pipeline = NormalizerPipeline().add_numbers(replacement="0").add_spaces(replacement="")
+    >>> pipeline.normalize(" ３,０００ 円 ")
+    '0円'
+    """
+
+    def __init__(self):
+        self._steps = []
+        self._operations = None
+
+    def add_numbers(self, replacement: str = "0", pattern: str = None) -> "NormalizerPipeline":
+        """normalize_numbersと同じ処理を追加
+
+        Parameters
+        ----------
+        replacement : str, optional
+            処理後の置換文字列, by default "0"
+        pattern : str, optional
+            処理したい正規表現のパターン
+            Noneの場合はデフォルトパターン"(\\d+[,，]*)+"で処理, by default None
+
+        Returns
+        -------
+        NormalizerPipeline
+            処理を追加したパイプライン自身
+        """
+        self._steps.append(("numbers", replacement, pattern or normalize_numbers_default_pattern, False))
+        self._operations = None
+        return self
+
+    def add_spaces(self, replacement: str = "", pattern: str = None, do_strip: bool = True) -> "NormalizerPipeline":
+        """normalize_spacesと同じ処理を追加
+
+        Parameters
+        ----------
+        replacement : str, optional
+            処理後の置換文字列, by default ""
+        pattern : str, optional
+            処理したい正規表現のパターン
+            Noneの場合はデフォルトパターン'\\s+'で処理, by default None
+        do_strip : bool, optional
+            sentence前後の空白文字を自動で除去するかどうか, by default True
+
+        Returns
+        -------
+        NormalizerPipeline
+            処理を追加したパイプライン自身
+        """
+        self._steps.append(("spaces", replacement, pattern or normalize_spaces_default_pattern, do_strip))
+        self._operations = None
+        return self
+
+    def normalize(self, sentence: str) -> str:
+        """1つの文章を正規化
+
+        Parameters
+        ----------
+        sentence : str
+            処理したい文章
+
+        Returns
+        -------
+        str
+            正規化後の文字列
+        """
+        for operation in self._operations or self._compile():
+            sentence = operation(sentence)
+        return sentence
+
+    __call__ = normalize
+
+    def normalize_batch(self, sentences: Iterable[str]) -> Iterator[str]:
+        """複数の文章を正規化して1つずつ返す
+
+        Parameters
+        ----------
+        sentences : Iterable[str]
+            処理したい文章のイテラブル（ジェネレータも可）
+
+        Yields
+        -------
+        Iterator[str]
+            sentencesの順番通りの正規化後の文字列
+        """
+        operations = self._operations or self._compile()
+        for sentence in sentences:
+            for operation in operations:
+                sentence = operation(sentence)
+            yield sentence
+
+    def _compile(self) -> List[Callable[[str], str]]:
+        operations = []
+        steps = list(self._steps)
+        while steps:
+            step = steps.pop(0)
+            if steps and self._is_fusable(step, steps[0]):
+                next_step = steps.pop(0)
+                fused_pattern = re.compile(f"(?:{step[2].pattern})|(?:{next_step[2].pattern})")
+                operations.append(_zen_to_han_digits)
+                if next_step[3]:
+                    operations.append(str.strip)
+                operations.append(partial(fused_pattern.sub, step[1]))
+                continue
+
+            kind, replacement, pattern, do_strip = step
+            if kind == "numbers":
+                operations.append(_zen_to_han_digits)
+            if do_strip:
+                operations.append(str.strip)
+            operations.append(partial(re.compile(pattern).sub, replacement))
+        self._operations = operations
+        return operations
+
+    @staticmethod
+    def _is_fusable(step: tuple, next_step: tuple) -> bool:
+        # 数字→空白の順のデフォルトパターン同士（数字と空白は重ならない）で、置換結果が他方のパターンに影響しない場合のみ融合する
+        # 空白→数字の順では空白の除去で数字とカンマがつながるため融合できない
+        return (
+            step[0] == "numbers" and next_step[0] == "spaces"
+            and step[2] is normalize_numbers_default_pattern and next_step[2] is normalize_spaces_default_pattern
+            and step[1] == next_step[1]
+            and not _unfusable_replacement_pattern.search(step[1])
+        )
+
+
+def _zen_to_han_digits(sentence: str) -> str:
+    # 全角数字が無い場合はmojimojiを呼ばない
+    if _zenkaku_digit_pattern.search(sentence) is None:
+        return sentence
+    return mojimoji.zen_to_han(sentence, kana=False, digit=True, ascii=False)
@@ -0,0 +1,389 @@
+import json
+import math
+import os
+import struct
+from array import array
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from src.utils import log_decorator
+
+_MAGIC = b"BM25IDX1"
+_ALIGNMENT = 64
+# ポスティングリストをスキップしながら読むためのブロックの大きさ
+BLOCK_SIZE = 128
+_SEGMENT_ARRAYS = ("offsets", "doc_deltas", "tfs", "block_offsets", "block_last_docs", "doc_lengths")
+
+
+class BM25Index:
+    """分かち書き済みの文書に対するBM25の転置インデックス
+    - ポスティングリストは単語ごとに文書番号の差分（array('I')）と出現回数で保持し、BLOCK_SIZE件ごとに最後の文書番号を記録する
+    - 文書は何度でも追加でき、文書番号は追加した順番（0始まり）
+    - save/loadでは1つのファイルに保存し、load後の配列はメモリマップで参照する（load後に追加した文書はメモリ上に保持）
+    - 検索は単語ごとにスコアを加算し、残りの単語でtop-kに入れない文書の計算を省略する（MaxScore）
+
+    Parameters
+    ----------
+    k1 : float, optional
+        BM25の出現回数の飽和を調整するパラメータ, by default 1.2
+    b : float, optional
+        BM25の文書長による正規化の強さ, by default 0.75
+    tokenizer : Callable[[str], List[str]], optional
+        文字列の文書や検索クエリを分かち書きする関数（tokenizer.wakachi_by_janomeなど）, by default None
+
+    Examples
+    --------
+    >>> index = BM25Index(tokenizer=tokenizer.wakachi_by_janome)
+    >>> index.add_documents(tokenizer.wakachi_by_janome_batch(sentences))
+    >>> index.search("契約 解除", k=10)
+    [(12, 7.83), (3, 6.21), ...]
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, tokenizer: Callable[[str], List[str]] = None):
+        self.k1 = k1
+        self.b = b
+        self.tokenizer = tokenizer
+        self._terms: List[str] = []
+        self._term_ids: Dict[str, int] = {}
+        self._total_length = 0
+        self._base = _empty_segment()
+        self._base_terms = 0
+        self._tail_deltas: Dict[int, array] = {}
+        self._tail_tfs: Dict[int, array] = {}
+        self._tail_bases: Dict[int, int] = {}
+        self._last_docs: Dict[int, int] = {}
+        self._tail_lengths = array("I")
+        self._norms: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self._base["doc_lengths"]) + len(self._tail_lengths)
+
+    @property
+    def vocabulary_size(self) -> int:
+        return len(self._terms)
+
+    def add_documents(self, documents: Iterable[Union[str, List[str]]]) -> range:
+        """文書を追加
+
+        Parameters
+        ----------
+        documents : Iterable[Union[str, List[str]]]
+            分かち書きのリスト、または文字列（tokenizerで分かち書きする）のイテラブル（ジェネレータも可）
+
+        Returns
+        -------
+        range
+            追加した文書の文書番号
+        """
+        start = doc_id = len(self)
+        for document in documents:
+            tokens = self._tokenize(document)
+            for term, tf in Counter(tokens).items():
+                term_id = self._term_ids.get(term)
+                if term_id is None:
+                    term_id = self._term_ids[term] = len(self._terms)
+                    self._terms.append(term)
+                last_doc = self._last_doc(term_id)
+                if term_id not in self._tail_deltas:
+                    self._tail_deltas[term_id] = array("I")
+                    self._tail_tfs[term_id] = array("I")
+                    self._tail_bases[term_id] = max(last_doc, 0)
+                self._tail_deltas[term_id].append(doc_id - max(last_doc, 0))
+                self._tail_tfs[term_id].append(tf)
+                self._last_docs[term_id] = doc_id
+            self._tail_lengths.append(len(tokens))
+            self._total_length += len(tokens)
+            doc_id += 1
+        self._norms = None
+        return range(start, doc_id)
+
+    def search(self, query: Union[str, List[str]], k: int = 10) -> List[Tuple[int, float]]:
+        """BM25のスコアが高い順にk件の文書を検索
+
+        Parameters
+        ----------
+        query : Union[str, List[str]]
+            検索クエリの分かち書きのリスト、または文字列（tokenizerで分かち書きする）
+        k : int, optional
+            取得する文書数, by default 10
+
+        Returns
+        -------
+        List[Tuple[int, float]]
+            (文書番号, スコア)のスコアの降順のリスト（クエリの単語を含む文書だけを返す）
+        """
+        if k < 1:
+            raise Exception(f"k > 0 (but k={k})")
+        n_docs = len(self)
+        query_terms = [
+            (term_id, qtf) for term_id, qtf in (
+                (self._term_ids.get(term), qtf) for term, qtf in Counter(self._tokenize(query)).items()
+            ) if term_id is not None
+        ]
+        if not query_terms or n_docs == 0:
+            return []
+
+        norms = self._get_norms()
+        # 文書頻度の小さい（スコアの上限が大きい）単語から処理する
+        weighted_terms = []
+        for term_id, qtf in query_terms:
+            df = self._document_frequency(term_id)
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            weighted_terms.append((idf * qtf, term_id))
+        weighted_terms.sort(key=lambda wt: -wt[0])
+        upper_bounds = [weight * (self.k1 + 1) for weight, _ in weighted_terms]
+
+        scores = np.zeros(n_docs, dtype=np.float32)
+        remaining = sum(upper_bounds)
+        processed = 0.0
+        candidates = candidate_mask = None
+        for (weight, term_id), upper_bound in zip(weighted_terms, upper_bounds):
+            docs, tfs = self._postings(term_id, candidates, candidate_mask)
+            scores[docs] += weight * tfs * (self.k1 + 1) / (tfs + norms[docs])
+            remaining -= upper_bound
+            processed += upper_bound
+            if candidates is None and remaining >= processed:
+                # これまでの単語のスコアの合計がremainingを超えられないため、未出現の文書もtop-kに入りうる
+                continue
+            touched = np.flatnonzero(scores > 0) if candidates is None else candidates
+            if len(touched) < k:
+                continue
+            threshold = np.partition(scores[touched], len(touched) - k)[len(touched) - k]
+            if candidates is not None or remaining < threshold:
+                # 残りの単語を全て含んでもthresholdに届かない文書は以降の計算を省略する
+                candidates = touched[scores[touched] + remaining >= threshold]
+                candidate_mask = np.zeros(n_docs, dtype=bool)
+                candidate_mask[candidates] = True
+
+        touched = np.flatnonzero(scores > 0) if candidates is None else candidates
+        top = touched
+        if len(touched) > k:
+            # 同点の文書は文書番号の小さい順に残す
+            touched_scores = scores[touched]
+            kth_score = -np.partition(-touched_scores, k - 1)[k - 1]
+            top = np.concatenate([touched[touched_scores > kth_score], touched[touched_scores == kth_score]])[:k]
+        top = top[np.lexsort((top, -scores[top]))]
+        return [(int(doc_id), float(scores[doc_id])) for doc_id in top]
+
+    def optimize(self):
+        """メモリ上に追加した文書をブロック単位のポスティングリストに統合（以降の検索で読み飛ばしが効くようになる）"""
+        if not self._tail_lengths:
+            return
+        base = self._base
+        offsets = base["offsets"]
+        pieces_deltas, pieces_tfs = [], []
+        lengths = np.zeros(len(self._terms), dtype=np.int64)
+        for term_id in range(len(self._terms)):
+            if term_id < self._base_terms:
+                start, end = offsets[term_id], offsets[term_id + 1]
+                pieces_deltas.append(base["doc_deltas"][start:end])
+                pieces_tfs.append(base["tfs"][start:end])
+                lengths[term_id] += end - start
+            if term_id in self._tail_deltas:
+                pieces_deltas.append(_as_uint32(self._tail_deltas[term_id]))
+                pieces_tfs.append(_as_uint32(self._tail_tfs[term_id]))
+                lengths[term_id] += len(self._tail_deltas[term_id])
+        doc_lengths = np.concatenate([base["doc_lengths"], _as_uint32(self._tail_lengths)])
+        if pieces_deltas:
+            doc_deltas, tfs = np.concatenate(pieces_deltas), np.concatenate(pieces_tfs)
+        else:
+            doc_deltas, tfs = np.empty(0, dtype=np.uint32), np.empty(0, dtype=np.uint32)
+        self._base = _build_segment(lengths, doc_deltas, tfs, doc_lengths)
+        self._base_terms = len(self._terms)
+        self._tail_deltas, self._tail_tfs, self._tail_bases = {}, {}, {}
+        self._tail_lengths = array("I")
+
+    @log_decorator
+    def save(self, file_path: str):
+        """インデックスを1つのファイルに保存（JSONのヘッダーと配列のバイト列）
+
+        Parameters
+        ----------
+        file_path : str
+            保存先のファイルパス
+        """
+        self.optimize()
+        header = {
+            "k1": self.k1,
+            "b": self.b,
+            "block_size": BLOCK_SIZE,
+            "total_length": self._total_length,
+            "terms": self._terms,
+            "arrays": {},
+        }
+        position = 0
+        for name in _SEGMENT_ARRAYS:
+            values = self._base[name]
+            header["arrays"][name] = {"dtype": values.dtype.str, "offset": position, "shape": len(values)}
+            position = _align(position + values.nbytes)
+        header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+        data_start = _align(len(_MAGIC) + 8 + len(header_bytes))
+
+        temp_path = f"{file_path}.tmp"
+        with open(temp_path, mode="wb") as f:
+            f.write(_MAGIC)
+            f.write(struct.pack("<Q", len(header_bytes)))
+            f.write(header_bytes)
+            for name in _SEGMENT_ARRAYS:
+                f.seek(data_start + header["arrays"][name]["offset"])
+                f.write(np.ascontiguousarray(self._base[name]).tobytes())
+            f.truncate(data_start + position)
+        os.replace(temp_path, file_path)
+
+    @classmethod
+    @log_decorator
+    def load(cls, file_path: str, tokenizer: Callable[[str], List[str]] = None) -> "BM25Index":
+        """saveで保存したインデックスを読み込み（ポスティングリストはメモリマップで参照）
+
+        Parameters
+        ----------
+        file_path : str
+            saveで保存したファイルパス
+        tokenizer : Callable[[str], List[str]], optional
+            文字列の文書や検索クエリを分かち書きする関数, by default None
+
+        Returns
+        -------
+        BM25Index
+            読み込んだインデックス
+        """
+        with open(file_path, mode="rb") as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise Exception(f"{file_path} is not a BM25 index file")
+            header_length, = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(header_length).decode("utf-8"))
+        if header["block_size"] != BLOCK_SIZE:
+            raise Exception(f"block_size={header['block_size']} is not supported (expected {BLOCK_SIZE})")
+
+        index = cls(k1=header["k1"], b=header["b"], tokenizer=tokenizer)
+        index._terms = header["terms"]
+        index._term_ids = {term: term_id for term_id, term in enumerate(index._terms)}
+        index._base_terms = len(index._terms)
+        index._total_length = header["total_length"]
+        data_start = _align(len(_MAGIC) + 8 + header_length)
+        index._base = {
+            name: np.memmap(file_path, dtype=np.dtype(spec["dtype"]), mode="r", offset=data_start + spec["offset"], shape=(spec["shape"],))
+            if spec["shape"] else np.empty(0, dtype=np.dtype(spec["dtype"]))
+            for name, spec in header["arrays"].items()
+        }
+        return index
+
+    def _tokenize(self, document: Union[str, List[str]]) -> List[str]:
+        if not isinstance(document, str):
+            return document
+        if self.tokenizer is None:
+            raise Exception("tokenizer is required to add or search str documents")
+        return self.tokenizer(document)
+
+    def _last_doc(self, term_id: int) -> int:
+        last_doc = self._last_docs.get(term_id)
+        if last_doc is None:
+            if term_id < self._base_terms:
+                base = self._base
+                return int(base["block_last_docs"][base["block_offsets"][term_id + 1] - 1])
+            return -1
+        return last_doc
+
+    def _document_frequency(self, term_id: int) -> int:
+        df = len(self._tail_deltas.get(term_id, ()))
+        if term_id < self._base_terms:
+            df += int(self._base["offsets"][term_id + 1] - self._base["offsets"][term_id])
+        return df
+
+    def _get_norms(self) -> np.ndarray:
+        if self._norms is None:
+            doc_lengths = np.concatenate([self._base["doc_lengths"], _as_uint32(self._tail_lengths)])
+            average_length = max(self._total_length / max(len(doc_lengths), 1), 1e-9)
+            self._norms = (self.k1 * (1 - self.b + self.b * doc_lengths / average_length)).astype(np.float32)
+        return self._norms
+
+    def _postings(self, term_id: int, candidates: np.ndarray = None, candidate_mask: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray]:
+        # (文書番号, 出現回数)を返す。candidatesを指定した場合はcandidatesを含むブロックだけを復元し、candidate_maskで絞り込む
+        docs_list, tfs_list = [], []
+        if term_id < self._base_terms:
+            docs, tfs = _decode_base_postings(self._base, term_id, candidates)
+            docs_list.append(docs)
+            tfs_list.append(tfs)
+        if term_id in self._tail_deltas:
+            deltas = _as_uint32(self._tail_deltas[term_id]).astype(np.int64)
+            docs_list.append(self._tail_bases[term_id] + np.cumsum(deltas))
+            tfs_list.append(_as_uint32(self._tail_tfs[term_id]))
+        docs = np.concatenate(docs_list) if len(docs_list) > 1 else docs_list[0]
+        tfs = (np.concatenate(tfs_list) if len(tfs_list) > 1 else tfs_list[0]).astype(np.float32)
+        if candidate_mask is not None:
+            mask = candidate_mask[docs]
+            docs, tfs = docs[mask], tfs[mask]
+        return docs, tfs
+
+
+def _empty_segment() -> Dict[str, np.ndarray]:
+    return {
+        "offsets": np.zeros(1, dtype=np.int64),
+        "doc_deltas": np.empty(0, dtype=np.uint32),
+        "tfs": np.empty(0, dtype=np.uint32),
+        "block_offsets": np.zeros(1, dtype=np.int64),
+        "block_last_docs": np.empty(0, dtype=np.uint32),
+        "doc_lengths": np.empty(0, dtype=np.uint32),
+    }
+
+
+def _build_segment(lengths: np.ndarray, doc_deltas: np.ndarray, tfs: np.ndarray, doc_lengths: np.ndarray) -> Dict[str, np.ndarray]:
+    # 単語ごとに連結した差分から、単語ごとの開始位置とBLOCK_SIZE件ごとの最後の文書番号を計算する
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    cumulative = np.cumsum(doc_deltas, dtype=np.int64)
+    term_starts = np.where(offsets[:-1] > 0, cumulative[np.maximum(offsets[:-1] - 1, 0)], 0) if len(cumulative) else offsets[:-1]
+    n_blocks = (lengths + BLOCK_SIZE - 1) // BLOCK_SIZE
+    block_offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(n_blocks, out=block_offsets[1:])
+    block_terms = np.repeat(np.arange(len(lengths)), n_blocks)
+    block_in_term = np.arange(block_offsets[-1]) - block_offsets[:-1][block_terms]
+    block_ends = offsets[:-1][block_terms] + np.minimum((block_in_term + 1) * BLOCK_SIZE, lengths[block_terms]) - 1
+    block_last_docs = (cumulative[block_ends] - term_starts[block_terms]).astype(np.uint32)
+    return {
+        "offsets": offsets,
+        "doc_deltas": doc_deltas.astype(np.uint32, copy=False),
+        "tfs": tfs.astype(np.uint32, copy=False),
+        "block_offsets": block_offsets,
+        "block_last_docs": block_last_docs,
+        "doc_lengths": doc_lengths.astype(np.uint32, copy=False),
+    }
+
+
+def _decode_base_postings(base: Dict[str, np.ndarray], term_id: int, candidates: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray]:
+    start, end = int(base["offsets"][term_id]), int(base["offsets"][term_id + 1])
+    block_start, block_end = int(base["block_offsets"][term_id]), int(base["block_offsets"][term_id + 1])
+    block_last_docs = base["block_last_docs"][block_start:block_end].astype(np.int64)
+    if candidates is None:
+        blocks = np.arange(block_end - block_start)
+    else:
+        # ブロックの範囲 (直前のブロックの最後の文書番号, 最後の文書番号] にcandidatesを含むブロックだけを使う
+        counts = np.searchsorted(candidates, block_last_docs, side="right")
+        blocks = np.flatnonzero(np.diff(counts, prepend=0) > 0)
+    if len(blocks) == len(block_last_docs):
+        docs = np.cumsum(base["doc_deltas"][start:end], dtype=np.int64)
+        return docs, base["tfs"][start:end]
+    if len(blocks) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.uint32)
+
+    # 必要なブロックの位置だけを集め、ブロックごとに直前のブロックの最後の文書番号から差分を復元する
+    block_starts = start + blocks * BLOCK_SIZE
+    block_lengths = np.minimum(block_starts + BLOCK_SIZE, end) - block_starts
+    first_positions = np.zeros(len(blocks), dtype=np.int64)
+    np.cumsum(block_lengths[:-1], out=first_positions[1:])
+    positions = np.repeat(block_starts - first_positions, block_lengths) + np.arange(block_lengths.sum())
+    cumulative = np.cumsum(base["doc_deltas"][positions], dtype=np.int64)
+    previous_last_docs = np.where(blocks > 0, block_last_docs[np.maximum(blocks - 1, 0)], 0)
+    offsets = previous_last_docs - np.where(first_positions > 0, cumulative[np.maximum(first_positions - 1, 0)], 0)
+    return cumulative + np.repeat(offsets, block_lengths), base["tfs"][positions]
+
+
+def _as_uint32(values: array) -> np.ndarray:
+    # array('I')をコピーせずにNumPyの配列として参照する
+    return np.frombuffer(values, dtype=np.uint32) if len(values) else np.empty(0, dtype=np.uint32)
+
+
+def _align(position: int) -> int:
+    return (position + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
@@ -0,0 +1,181 @@
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+class TokenCache:
+    """分かち書き結果のキャッシュ
+    - 1段目: プロセス内のLRU（最大maxsize件）
+    - 2段目: pathを指定した場合のみSQLiteによるディスク上の永続キャッシュ（プロセス再起動後も有効）
+    - 分かち書き結果はタプルで保持し、取得のたびに新しいリストを返す（呼び出し元が結果を変更してもキャッシュは変わらない）
+
+    Parameters
+    ----------
+    maxsize : int, optional
+        プロセス内LRUに保持する最大件数, by default 100000
+    path : str, optional
+        永続キャッシュのSQLiteファイルパス。Noneの場合はメモリ上のLRUのみ, by default None
+    commit_interval : int, optional
+        永続キャッシュへの書き込みをまとめてコミットする件数, by default 1000
+    """
+
+    def __init__(self, maxsize: int = 100000, path: str = None, commit_interval: int = 1000):
+        if maxsize < 1:
+            raise Exception(f"maxsize > 0 (but maxsize={maxsize})")
+        self.maxsize = maxsize
+        self.path = path
+        self.commit_interval = commit_interval
+        self._memory: "OrderedDict[str, Tuple[str, ...]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._pending_writes = 0
+        self._counters = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        self._db = None
+        if path:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS tokens (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self._db.commit()
+            atexit.register(self.close)
+
+    @staticmethod
+    def make_key(backend: str, model_version: str, text: str, **options) -> str:
+        """キャッシュのキーを作成
+
+        Parameters
+        ----------
+        backend : str
+            形態素解析器の名前
+        model_version : str
+            形態素解析器・辞書・モデルのバージョン
+        text : str
+            分かち書きする文章
+        options : dict
+            is_midashiなど結果に影響するオプション
+
+        Returns
+        -------
+        str
+            backend, model_version, options, textのハッシュ値
+        """
+        header = json.dumps([backend, model_version, sorted(options.items())], ensure_ascii=False)
+        return hashlib.sha1(f"{header}\0{text}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[List[str]]:
+        """キャッシュから分かち書き結果を取得（存在しない場合はNone）"""
+        return self.get_many([key])[0]
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[List[str]]]:
+        """複数のキーをまとめてキャッシュから取得
+
+        Parameters
+        ----------
+        keys : Sequence[str]
+            キャッシュのキー
+
+        Returns
+        -------
+        List[Optional[List[str]]]
+            keysの順番通りの分かち書き結果（存在しないものはNone）
+        """
+        results: List[Optional[List[str]]] = [None] * len(keys)
+        with self._lock:
+            missing = {}
+            for i, key in enumerate(keys):
+                tokens = self._memory.get(key)
+                if tokens is None:
+                    missing.setdefault(key, []).append(i)
+                    continue
+                self._memory.move_to_end(key)
+                self._counters["hits"] += 1
+                results[i] = list(tokens)
+
+            if missing and self._db is not None:
+                for key, value in self._select(list(missing)):
+                    tokens = tuple(json.loads(value))
+                    self._remember(key, tokens)
+                    for i in missing.pop(key):
+                        results[i] = list(tokens)
+                        self._counters["disk_hits"] += 1
+            self._counters["misses"] += sum(len(indexes) for indexes in missing.values())
+        return results
+
+    def put(self, key: str, tokens: List[str]) -> None:
+        """分かち書き結果をキャッシュに保存"""
+        self.put_many([(key, tokens)])
+
+    def put_many(self, items: Iterable) -> None:
+        """複数の分かち書き結果をまとめてキャッシュに保存
+
+        Parameters
+        ----------
+        items : Iterable[Tuple[str, List[str]]]
+            (キー, 分かち書き結果)のイテラブル
+        """
+        items = list(items)
+        with self._lock:
+            for key, tokens in items:
+                self._remember(key, tuple(tokens))
+            if self._db is not None and items:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO tokens (key, value) VALUES (?, ?)",
+                    [(key, json.dumps(tokens, ensure_ascii=False)) for key, tokens in items])
+                self._pending_writes += len(items)
+                if self._pending_writes >= self.commit_interval:
+                    self.flush()
+
+    def flush(self) -> None:
+        """永続キャッシュへの未コミットの書き込みをコミット"""
+        with self._lock:
+            if self._db is not None and self._pending_writes:
+                self._db.commit()
+                self._pending_writes = 0
+
+    def clear(self) -> None:
+        """メモリ上・ディスク上のキャッシュと計測値をすべて削除"""
+        with self._lock:
+            self._memory.clear()
+            for name in self._counters:
+                self._counters[name] = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM tokens")
+                self._db.commit()
+                self._pending_writes = 0
+
+    def close(self) -> None:
+        """未コミットの書き込みをコミットしてSQLiteの接続を閉じる"""
+        with self._lock:
+            if self._db is not None:
+                self.flush()
+                self._db.close()
+                self._db = None
+
+    def stats(self) -> Dict[str, int]:
+        """キャッシュの計測値を取得
+
+        Returns
+        -------
+        Dict[str, int]
+            hits（メモリ上のヒット数）, disk_hits（ディスク上のヒット数）, misses, evictions, size（メモリ上の件数）
+        """
+        with self._lock:
+            return dict(self._counters, size=len(self._memory))
+
+    def _remember(self, key: str, tokens: Tuple[str, ...]) -> None:
+        self._memory[key] = tokens
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def _select(self, keys: List[str], chunk_size: int = 500) -> Iterable:
+        for start in range(0, len(keys), chunk_size):
+            chunk = keys[start: start + chunk_size]
+            placeholders = ",".join("?" * len(chunk))
+            yield from self._db.execute(f"SELECT key, value FROM tokens WHERE key IN ({placeholders})", chunk).fetchall()
@@ -0,0 +1,280 @@
+import functools
+import hashlib
+import inspect
+import json
+import os
+import uuid
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+from src.file_reader import iter_tsv
+from src.utils import iter_chunks, log_decorator
+
+META_FILE_NAME = "meta.json"
+SHARD_FORMAT_VERSION = 1
+DEFAULT_SPECIALS = ("<unk>", "<pad>")
+TOKENIZE_BATCH_SIZE = 10000
+
+
+@log_decorator
+def source_fingerprint(file_paths: Sequence[str], **options) -> str:
+    """元ファイルと前処理の設定から、シャードを作り直す必要があるかを判定するためのハッシュ値を作成
+
+    Parameters
+    ----------
+    file_paths : Sequence[str]
+        元ファイルのパス
+    options : dict
+        分かち書きの方法など、シャードの内容に影響する設定（JSONに変換できる値）
+
+    Returns
+    -------
+    str
+        ファイルパス・サイズ・更新日時とoptionsのハッシュ値
+    """
+    sources = []
+    for file_path in file_paths:
+        stat = os.stat(file_path)
+        sources.append([os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns])
+    header = json.dumps([SHARD_FORMAT_VERSION, sources, sorted(options.items())], ensure_ascii=False, default=str)
+    return hashlib.sha1(header.encode("utf-8")).hexdigest()
+
+
+@log_decorator
+def build_token_shards(examples: Iterable[Tuple[List[str], int]], output_dir: str, itos: List[str] = None,
+                       shard_size: int = 100000, fingerprint: str = None) -> Dict[str, Any]:
+    """分かち書き済みの(単語のリスト, ラベル)を単語IDに変換し、シャードとしてoutput_dirに保存
+    - シャードごとに単語IDを連結したint32の配列（tokens）、各文の開始位置のint64の配列（offsets）、ラベルのint64の配列（labels）を.npyで保存
+    - 語彙やシャードの一覧はmeta.jsonに保存（最後に書き込むため、途中で失敗したシャードは読み込まれない）
+    - シャードは作成ごとに別の名前で保存し、meta.jsonを置き換えてから以前のシャードを削除する（読み込み中のTokenShardsは以前のシャードを読み続ける）
+
+    Parameters
+    ----------
+    examples : Iterable[Tuple[List[str], int]]
+        (単語のリスト, ラベル)のイテラブル（ジェネレータも可）
+    output_dir : str
+        保存先のディレクトリ
+    itos : List[str], optional
+        単語IDの順番に並んだ語彙（torchtextのField.vocab.itosなど）
+        Noneの場合は"<unk>", "<pad>"に続けて出現順に単語IDを割り当てる, by default None
+    shard_size : int, optional
+        1つのシャードに保存する文の数, by default 100000
+    fingerprint : str, optional
+        meta.jsonに記録する元データのハッシュ値（source_fingerprintで作成）, by default None
+
+    Returns
+    -------
+    Dict[str, Any]
+        meta.jsonの内容
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    grow_vocab = itos is None
+    itos = list(DEFAULT_SPECIALS) if itos is None else list(itos)
+    stoi = {token: i for i, token in enumerate(itos)}
+    unk_index = stoi.get("<unk>", 0)
+
+    # シャードは作成ごとに別の名前で書き込み、meta.jsonの置き換えで切り替える
+    # （作り直しが途中で失敗しても以前のmeta.jsonとシャードはそのまま読め、開いているメモリマップのファイルも書き換えない）
+    generation = uuid.uuid4().hex[:12]
+    shards, written = [], []
+    try:
+        for shard_index, chunk in enumerate(iter_chunks(examples, shard_size)):
+            token_ids, offsets, labels = [], [0], []
+            for tokens, label in chunk:
+                for token in tokens:
+                    token_id = stoi.get(token)
+                    if token_id is None:
+                        if grow_vocab:
+                            token_id = stoi[token] = len(itos)
+                            itos.append(token)
+                        else:
+                            token_id = unk_index
+                    token_ids.append(token_id)
+                offsets.append(len(token_ids))
+                labels.append(label)
+            name = f"shard-{generation}-{shard_index:05d}"
+            for kind, array in [("tokens", np.asarray(token_ids, dtype=np.int32)), ("offsets", np.asarray(offsets, dtype=np.int64)),
+                                ("labels", np.asarray(labels, dtype=np.int64))]:
+                written.append(os.path.join(output_dir, f"{name}.{kind}.npy"))
+                np.save(written[-1], array)
+            shards.append({"name": name, "n_examples": len(labels), "n_tokens": len(token_ids)})
+
+        meta = {
+            "version": SHARD_FORMAT_VERSION,
+            "fingerprint": fingerprint,
+            "n_examples": sum(shard["n_examples"] for shard in shards),
+            "unk_index": unk_index,
+            "pad_index": stoi.get("<pad>", unk_index),
+            "itos": itos,
+            "shards": shards,
+        }
+        temp_path = os.path.join(output_dir, f"{META_FILE_NAME}.{generation}.tmp")
+        written.append(temp_path)
+        with open(temp_path, mode="w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(temp_path, os.path.join(output_dir, META_FILE_NAME))
+    except BaseException:
+        for file_path in written:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        raise
+
+    # 切り替えた後で以前のシャードを削除する（メモリマップで開いているプロセスは削除後も読み続けられる）
+    _remove_stale_shards(output_dir, {shard["name"] for shard in shards})
+    return meta
+
+
+def _remove_stale_shards(output_dir: str, names: Iterable[str]) -> None:
+    # output_dirのシャードのうち、namesに含まれないものを削除する
+    keep = {f"{name}.{kind}.npy" for name in names for kind in ("tokens", "offsets", "labels")}
+    for file_name in os.listdir(output_dir):
+        if file_name.startswith("shard-") and file_name.endswith(".npy") and file_name not in keep:
+            os.remove(os.path.join(output_dir, file_name))
+
+
+def _callable_id(func: Callable) -> str:
+    # 分かち書きの関数を識別する文字列（functools.partialは元の関数と引数、lambdaなどは関数の中身も含める）
+    if isinstance(func, functools.partial):
+        return f"{_callable_id(func.func)}(*{func.args!r}, **{sorted(func.keywords.items())!r})"
+    func = inspect.unwrap(func)
+    name = f"{getattr(func, '__module__', '')}.{getattr(func, '__qualname__', repr(func))}"
+    code = getattr(func, "__code__", None)
+    if code is not None and "<" in name:
+        # lambdaや関数内で定義した関数は名前だけでは区別できないため、バイトコードと定数のハッシュ値を含める
+        name += ":" + _code_digest(code)
+    return name
+
+
+def _code_digest(code: Any) -> str:
+    # 内側のlambdaやジェネレータ式のコードオブジェクトはreprにメモリ上の位置を含むため、再帰的にハッシュ値にする
+    consts = [_code_digest(const) if inspect.iscode(const) else repr(const) for const in code.co_consts]
+    return hashlib.sha1(code.co_code + "\n".join(consts).encode("utf-8") + repr(code.co_names).encode("utf-8")).hexdigest()
+
+
+@log_decorator
+def build_token_shards_from_tsv(file_path: str, output_dir: str, tokenize_batch: Callable[[Iterable[str]], Iterator[List[str]]] = None,
+                                itos: List[str] = None, text_column: int = 0, label_column: int = 1,
+                                shard_size: int = 100000, force: bool = False, tokenizer_id: str = None) -> Dict[str, Any]:
+    """train.tsvなどの(文章, ラベル)のTSVファイルを分かち書きしてシャードを作成
+    - 元ファイルと設定が前回と同じ場合は分かち書きを行わず、保存済みのmeta.jsonを返す
+
+    Parameters
+    ----------
+    file_path : str
+        TSVファイルのパス
+    output_dir : str
+        保存先のディレクトリ
+    tokenize_batch : Callable[[Iterable[str]], Iterator[List[str]]], optional
+        複数の文章を分かち書きする関数。Noneの場合はtokenizer.wakachi_by_janome_batch, by default None
+    itos : List[str], optional
+        単語IDの順番に並んだ語彙, by default None
+    text_column : int, optional
+        文章の列, by default 0
+    label_column : int, optional
+        ラベルの列, by default 1
+    shard_size : int, optional
+        1つのシャードに保存する文の数, by default 100000
+    force : bool, optional
+        Trueの場合は元ファイルが変わっていなくてもシャードを作り直す, by default False
+    tokenizer_id : str, optional
+        シャードを作り直すかの判定に使う分かち書きの方法の識別子, by default None
+        Noneの場合はtokenize_batchの関数名（functools.partialは引数も、lambdaなどは関数の中身も含める）
+
+    Returns
+    -------
+    Dict[str, Any]
+        meta.jsonの内容
+    """
+    if tokenize_batch is None:
+        from src.nlp.tokenizer import wakachi_by_janome_batch as tokenize_batch
+    fingerprint = source_fingerprint(
+        [file_path], tokenize_batch=tokenizer_id or _callable_id(tokenize_batch),
+        itos=hashlib.sha1("\n".join(itos).encode("utf-8")).hexdigest() if itos else None,
+        text_column=text_column, label_column=label_column, shard_size=shard_size)
+    if not force:
+        meta = read_shards_meta(output_dir)
+        if meta is not None and meta["fingerprint"] == fingerprint:
+            return meta
+
+    def examples() -> Iterator[Tuple[List[str], int]]:
+        # TSVをTOKENIZE_BATCH_SIZE行ずつ分かち書きし、文章とラベルの対応を保ったまま全体をメモリに読み込まずに処理する
+        for rows in iter_tsv(file_path, batch_size=TOKENIZE_BATCH_SIZE, columns=[text_column, label_column]):
+            for wakachi, (_, label) in zip(tokenize_batch([text for text, _ in rows]), rows):
+                yield wakachi, int(label)
+
+    return build_token_shards(examples(), output_dir, itos=itos, shard_size=shard_size, fingerprint=fingerprint)
+
+
+def read_shards_meta(output_dir: str) -> Dict[str, Any]:
+    """output_dirのmeta.jsonを読み込み（存在しない場合はNone）"""
+    meta_path = os.path.join(output_dir, META_FILE_NAME)
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, mode="r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class TokenShards:
+    """build_token_shardsで保存したシャードをメモリマップで読み込み、文ごとの単語IDとラベルを返す
+    - 配列は最初にアクセスしたときにプロセスごとに開くため、DataLoaderのワーカープロセス間でもページキャッシュを共有できる
+
+    Parameters
+    ----------
+    output_dir : str
+        build_token_shardsの保存先のディレクトリ
+    mmap_mode : str, optional
+        np.loadのmmap_mode。"c"の場合は書き込み可能な配列（書き込むまではコピーされない）, by default "r"
+    """
+
+    def __init__(self, output_dir: str, mmap_mode: str = "r"):
+        meta = read_shards_meta(output_dir)
+        if meta is None:
+            raise Exception(f"{os.path.join(output_dir, META_FILE_NAME)} is not exist")
+        self.output_dir = output_dir
+        self.mmap_mode = mmap_mode
+        self.meta = meta
+        self.itos: List[str] = meta["itos"]
+        self.pad_index: int = meta["pad_index"]
+        self.unk_index: int = meta["unk_index"]
+        self._starts = np.cumsum([0] + [shard["n_examples"] for shard in meta["shards"]])
+        self._arrays = None
+
+    def __len__(self) -> int:
+        return int(self._starts[-1])
+
+    def __getitem__(self, i: int) -> Tuple[np.ndarray, int]:
+        """i番目の文の(単語IDの配列（シャードの配列のビュー）, ラベル)"""
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(f"index {i} is out of range")
+        shard_index = int(np.searchsorted(self._starts, i, side="right")) - 1
+        tokens, offsets, labels = self._get_arrays()[shard_index]
+        j = i - int(self._starts[shard_index])
+        return tokens[offsets[j]: offsets[j + 1]], int(labels[j])
+
+    def __getstate__(self) -> dict:
+        # メモリマップはプロセス間で受け渡さず、受け取ったプロセスで開き直す
+        state = self.__dict__.copy()
+        state["_arrays"] = None
+        return state
+
+    def lengths(self) -> np.ndarray:
+        """全ての文の単語数"""
+        return np.concatenate([np.diff(offsets) for _, offsets, _ in self._get_arrays()]) if len(self) else np.empty(0, dtype=np.int64)
+
+    def labels(self) -> np.ndarray:
+        """全ての文のラベル"""
+        return np.concatenate([labels for _, _, labels in self._get_arrays()]) if len(self) else np.empty(0, dtype=np.int64)
+
+    def _get_arrays(self) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        if self._arrays is None:
+            self._arrays = [
+                tuple(
+                    np.load(os.path.join(self.output_dir, f"{shard['name']}.{kind}.npy"), mmap_mode=self.mmap_mode)
+                    for kind in ("tokens", "offsets", "labels")
+                )
+                for shard in self.meta["shards"]
+            ]
+        return self._arrays
@@ -1,18 +1,166 @@
-from typing import List, Union
-
-import janome
-import spacy
-from janome.tokenizer import Tokenizer as JanomeTokenizer
-from torchtext.data.functional import load_sp_model, sentencepiece_tokenizer
+import os
+from collections import deque
+from functools import lru_cache, partial
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Union
 
 from src.constants import SENTENCE_PIECE_MODEL_PATH
-from src.utils import log_decorator
+from src.nlp.document_chunker import DEFAULT_MAX_CHARS, DocumentChunk, split_document
+from src.nlp.model_registry import ModelLoadStats, ModelRegistry
+from src.nlp.token_cache import TokenCache
+from src.utils import iter_chunks, log_decorator
+
+if TYPE_CHECKING:
+    import janome.tokenizer
+    import spacy
+
+
+def _load_janome() -> "janome.tokenizer.Tokenizer":
+    from janome.tokenizer import Tokenizer as JanomeTokenizer
+
+    return JanomeTokenizer()
+
+
+def _load_ginza() -> "spacy.language.Language":
+    import spacy
+
+    return spacy.load("ja_ginza")
+
+
+def _load_sentencepiece() -> Any:
+    import sentencepiece
+
+    sp_model = sentencepiece.SentencePieceProcessor()
+    sp_model.Load(SENTENCE_PIECE_MODEL_PATH)
+    return sp_model
+
+
+# 各形態素解析器は初回利用時に読み込む（import時には読み込まない）
+model_registry = ModelRegistry()
+model_registry.register("janome", _load_janome)
+model_registry.register("ginza", _load_ginza)
+model_registry.register("sentencepiece", _load_sentencepiece)
+
+# 以前のモジュール変数名との互換性のための対応表
+_LEGACY_MODEL_ATTRIBUTES = {"janome_tokenizer": "janome", "ginza_tokenizer": "ginza", "sp_model": "sentencepiece"}
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LEGACY_MODEL_ATTRIBUTES:
+        return model_registry.get(_LEGACY_MODEL_ATTRIBUTES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def sp_tokens_generator(sentences: Iterable[str]) -> Iterator[List[str]]:
+    """SentencePieceで文章を1文ずつ分かち書きするジェネレータ
+
+    Parameters
+    ----------
+    sentences : Iterable[str]
+        分かち書きしたい文章のイテラブル
+
+    Yields
+    -------
+    Iterator[List[str]]
+        分かち書き結果
+    """
+    sp_model = model_registry.get("sentencepiece")
+    for sentence in sentences:
+        yield sp_model.EncodeAsPieces(sentence)
+
+
+def warmup_tokenizers(backends: Iterable[str] = None) -> Dict[str, ModelLoadStats]:
+    """指定した形態素解析器を事前に読み込む
+
+    Parameters
+    ----------
+    backends : Iterable[str], optional
+        読み込む形態素解析器（"janome", "ginza", "sentencepiece"）
+        Noneの場合はすべて読み込む, by default None
+
+    Returns
+    -------
+    Dict[str, ModelLoadStats]
+        形態素解析器ごとの読み込み時間とRSSの増加量
+    """
+    return model_registry.warmup(backends)
+
+
+def get_tokenizer_load_stats() -> Dict[str, ModelLoadStats]:
+    """読み込み済みの形態素解析器の読み込み時間とRSSの増加量を取得"""
+    return model_registry.stats()
+
+
+# 分かち書き結果のキャッシュ（enable_token_cache()を呼んだ場合のみ有効）
+_token_cache: Optional[TokenCache] = None
+
 
-janome_tokenizer = JanomeTokenizer()
-ginza_tokenizer = spacy.load("ja_ginza")
+def enable_token_cache(path: str = None, maxsize: int = 100000) -> TokenCache:
+    """wakachi_by_*の結果のキャッシュを有効にする
 
-sp_model = load_sp_model(SENTENCE_PIECE_MODEL_PATH)
-sp_tokens_generator = sentencepiece_tokenizer(sp_model)
+    Parameters
+    ----------
+    path : str, optional
+        永続キャッシュのSQLiteファイルパス。Noneの場合はプロセス内のLRUのみ, by default None
+    maxsize : int, optional
+        プロセス内LRUに保持する最大件数, by default 100000
+
+    Returns
+    -------
+    TokenCache
+        有効にしたキャッシュ
+    """
+    global _token_cache
+    disable_token_cache()
+    _token_cache = TokenCache(maxsize=maxsize, path=path)
+    return _token_cache
+
+
+def disable_token_cache() -> None:
+    """wakachi_by_*の結果のキャッシュを無効にする（永続キャッシュの内容は削除しない）"""
+    global _token_cache
+    if _token_cache is not None:
+        _token_cache.close()
+    _token_cache = None
+
+
+def get_token_cache_stats() -> Dict[str, int]:
+    """キャッシュのヒット数・ミス数・追い出し数を取得（キャッシュが無効の場合は空のdict）"""
+    return {} if _token_cache is None else _token_cache.stats()
+
+
+@lru_cache(maxsize=None)
+def _model_version(backend: str) -> str:
+    if backend == "sentencepiece":
+        stat = os.stat(SENTENCE_PIECE_MODEL_PATH)
+        return f"{os.path.abspath(SENTENCE_PIECE_MODEL_PATH)}:{stat.st_size}:{stat.st_mtime_ns}"
+    try:
+        from importlib.metadata import version
+    except ImportError:
+        from importlib_metadata import version
+    distributions = {"janome": ["Janome"], "ginza": ["ginza", "ja-ginza", "spacy"]}[backend]
+    versions = []
+    for distribution in distributions:
+        try:
+            versions.append(f"{distribution}=={version(distribution)}")
+        except Exception:
+            versions.append(f"{distribution}==unknown")
+    return ",".join(versions)
+
+
+def _with_token_cache(backend: str, sentences: List[str], compute: Callable[[List[str]], Iterable[List[str]]], **options) -> List[List[str]]:
+    cache = _token_cache
+    if cache is None:
+        return list(compute(sentences))
+
+    model_version = _model_version(backend)
+    keys = [TokenCache.make_key(backend, model_version, sentence, **options) for sentence in sentences]
+    results = cache.get_many(keys)
+    missing = [i for i, tokens in enumerate(results) if tokens is None]
+    if missing:
+        for i, tokens in zip(missing, compute([sentences[i] for i in missing])):
+            results[i] = tokens
+        cache.put_many((keys[i], results[i]) for i in missing)
+    return results
 
 
 @log_decorator
@@ -29,11 +177,32 @@ def wakachi_by_sentencepiece(sentence: str) -> List[str]:
     List[str]
         分かち書き結果
     """
-    return list(sp_tokens_generator([sentence]))[0]
+    return _with_token_cache("sentencepiece", [sentence], sp_tokens_generator)[0]
 
 
 @log_decorator
-def tokenize_by_ginza(sentence: str) -> spacy.tokens.doc.Doc:
+def wakachi_by_sentencepiece_batch(sentences: Iterable[str], batch_size: int = 1000) -> Iterator[List[str]]:
+    """SentencePieceを用いた複数文の分かち書き
+    - batch_size件ずつまとめてsp_tokens_generatorに渡し、結果を1文ずつ遅延評価で返す
+
+    Parameters
+    ----------
+    sentences : Iterable[str]
+        分かち書きしたい文章のイテラブル（ジェネレータも可）
+    batch_size : int, optional
+        1回にまとめて処理する文章数, by default 1000
+
+    Yields
+    -------
+    Iterator[List[str]]
+        sentencesの順番通りの分かち書き結果
+    """
+    for batch in iter_chunks(sentences, batch_size):
+        yield from _with_token_cache("sentencepiece", batch, sp_tokens_generator)
+
+
+@log_decorator
+def tokenize_by_ginza(sentence: str) -> "spacy.tokens.doc.Doc":
     """Ginzaを用いた形態素解析
 
     Parameters
@@ -46,10 +215,32 @@ def tokenize_by_ginza(sentence: str) -> spacy.tokens.doc.Doc:
     spacy.tokens.doc.Doc
         spacyのDocコンテナオブジェクト(https://spacy.io/api)
     """
-    tokens = ginza_tokenizer(sentence)
+    tokens = model_registry.get("ginza")(sentence)
     return tokens
 
 
+@log_decorator
+def tokenize_by_ginza_batch(sentences: Iterable[str], batch_size: int = 1000) -> Iterator["spacy.tokens.doc.Doc"]:
+    """Ginzaを用いた複数文の形態素解析
+    - spaCyのnlp.pipeでbatch_size件ずつまとめて解析し、結果を1文ずつ遅延評価で返す
+
+    Parameters
+    ----------
+    sentences : Iterable[str]
+        形態素解析したい文章のイテラブル（ジェネレータも可）
+    batch_size : int, optional
+        nlp.pipeに渡すバッチサイズ, by default 1000
+
+    Yields
+    -------
+    Iterator[spacy.tokens.doc.Doc]
+        sentencesの順番通りのspacyのDocコンテナオブジェクト
+    """
+    if batch_size < 1:
+        raise Exception(f"batch_size > 0 (but batch_size={batch_size})")
+    yield from model_registry.get("ginza").pipe(sentences, batch_size=batch_size)
+
+
 @log_decorator
 def wakachi_by_ginza(sentence: str, is_midashi: bool = True) -> List[str]:
     """Ginzaを用いた分かち書き
@@ -66,14 +257,45 @@ def wakachi_by_ginza(sentence: str, is_midashi: bool = True) -> List[str]:
     List[str]
         分かち書き結果
     """
-    tokens = tokenize_by_ginza(sentence)
-    if is_midashi:
-        return [token.orth_ for token in tokens]
-    return [token.lemma_ for token in tokens]
+    compute = partial(_wakachi_by_ginza, is_midashi=is_midashi)
+    return _with_token_cache("ginza", [sentence], compute, is_midashi=is_midashi)[0]
+
+
+@log_decorator
+def wakachi_by_ginza_batch(sentences: Iterable[str], batch_size: int = 1000, is_midashi: bool = True) -> Iterator[List[str]]:
+    """Ginzaを用いた複数文の分かち書き
+
+    Parameters
+    ----------
+    sentences : Iterable[str]
+        分かち書きしたい文章のイテラブル（ジェネレータも可）
+    batch_size : int, optional
+        nlp.pipeに渡すバッチサイズ, by default 1000
+    is_midashi : bool, optional
+        見出し語で分かち書きをする場合はTrue, by default True
+
+    Yields
+    -------
+    Iterator[List[str]]
+        sentencesの順番通りの分かち書き結果
+    """
+    compute = partial(_wakachi_by_ginza, is_midashi=is_midashi, batch_size=batch_size)
+    for batch in iter_chunks(sentences, batch_size):
+        yield from _with_token_cache("ginza", batch, compute, is_midashi=is_midashi)
+
+
+def _wakachi_by_ginza(sentences: List[str], is_midashi: bool, batch_size: int = 1) -> Iterator[List[str]]:
+    ginza_tokenizer = model_registry.get("ginza")
+    docs = map(ginza_tokenizer, sentences) if len(sentences) == 1 else ginza_tokenizer.pipe(sentences, batch_size=batch_size)
+    for tokens in docs:
+        if is_midashi:
+            yield [token.orth_ for token in tokens]
+        else:
+            yield [token.lemma_ for token in tokens]
 
 
 @log_decorator
-def tokenize_by_janome(sentence: str) -> List[janome.tokenizer.Token]:
+def tokenize_by_janome(sentence: str) -> List["janome.tokenizer.Token"]:
     """Janomeを用いた形態素解析
 
     Parameters
@@ -86,7 +308,29 @@ def tokenize_by_janome(sentence: str) -> List[janome.tokenizer.Token]:
     List[janome.tokenizer.Token]
         形態素解析結果
     """
-    return janome_tokenizer.tokenize(sentence)
+    return model_registry.get("janome").tokenize(sentence)
+
+
+@log_decorator
+def tokenize_by_janome_batch(sentences: Iterable[str], batch_size: int = 1000) -> Iterator[List["janome.tokenizer.Token"]]:
+    """Janomeを用いた複数文の形態素解析
+
+    Parameters
+    ----------
+    sentences : Iterable[str]
+        解析したい文章のイテラブル（ジェネレータも可）
+    batch_size : int, optional
+        1回にまとめて取り出す文章数, by default 1000
+
+    Yields
+    -------
+    Iterator[List[janome.tokenizer.Token]]
+        sentencesの順番通りの形態素解析結果
+    """
+    janome_tokenizer = model_registry.get("janome")
+    for batch in iter_chunks(sentences, batch_size):
+        for sentence in batch:
+            yield list(janome_tokenizer.tokenize(sentence))
 
 
 @log_decorator
@@ -105,11 +349,138 @@ def wakachi_by_janome(sentence: str, is_midashi: bool = True) -> List[str]:
     List[str]
         分かち書き結果
     """
-    if is_midashi:
-        return list(janome_tokenizer.tokenize(sentence, wakati=True))
+    compute = partial(_wakachi_by_janome, is_midashi=is_midashi)
+    return _with_token_cache("janome", [sentence], compute, is_midashi=is_midashi)[0]
+
+
+@log_decorator
+def wakachi_by_janome_batch(sentences: Iterable[str], batch_size: int = 1000, is_midashi: bool = True) -> Iterator[List[str]]:
+    """Janomeを用いた複数文の分かち書き
+
+    Parameters
+    ----------
+    sentences : Iterable[str]
+        分かち書きしたい文章のイテラブル（ジェネレータも可）
+    batch_size : int, optional
+        1回にまとめて取り出す文章数, by default 1000
+    is_midashi : bool, optional
+        見出し語で分かち書きをする場合はTrue, by default True
+
+    Yields
+    -------
+    Iterator[List[str]]
+        sentencesの順番通りの分かち書き結果
+    """
+    compute = partial(_wakachi_by_janome, is_midashi=is_midashi)
+    for batch in iter_chunks(sentences, batch_size):
+        yield from _with_token_cache("janome", batch, compute, is_midashi=is_midashi)
+
+
+def _wakachi_by_janome(sentences: List[str], is_midashi: bool) -> Iterator[List[str]]:
+    janome_tokenizer = model_registry.get("janome")
+    for sentence in sentences:
+        if is_midashi:
+            yield list(janome_tokenizer.tokenize(sentence, wakati=True))
+        else:
+            yield [t.base_form for t in janome_tokenizer.tokenize(sentence)]
+
+
+class DocumentToken(NamedTuple):
+    """tokenize_document_by_janome・tokenize_document_by_ginzaの1単語分の解析結果
+
+    Attributes
+    ----------
+    surface : str
+        表層形
+    base_form : str
+        見出し語（Janomeはbase_form、Ginzaはlemma_）
+    start : int
+        文章全体の中での開始位置（文字単位）
+    end : int
+        文章全体の中での終了位置（文字単位）
+    """
+    surface: str
+    base_form: str
+    start: int
+    end: int
+
+
+@log_decorator
+def tokenize_document_by_janome(document: Union[str, Iterable[str]], max_chars: int = DEFAULT_MAX_CHARS) -> Iterator[DocumentToken]:
+    """長い文章をsplit_documentでmax_chars文字以下に分割しながらJanomeで形態素解析する
+    - 一度に解析するのは1チャンクだけなので、メモリ使用量は文章の長さに依存しない
+    - 引数の確認とJanomeの読み込みは呼び出し時に行い、解析は結果を取り出すときに行う
+
+    Parameters
+    ----------
+    document : Union[str, Iterable[str]]
+        解析したい文章、または文章を先頭から順に分けた文字列のイテラブル（read_pdf_text・iter_pdf_pagesの結果など）
+    max_chars : int, optional
+        1回に解析する最大文字数, by default 2000
 
-    tokens = tokenize_by_janome(sentence)
-    return [t.base_form for t in tokens]
+    Returns
+    -------
+    Iterator[DocumentToken]
+        文章の先頭から順の単語と文章全体の中での位置を返すイテレータ
+    """
+    chunks = split_document(document, max_chars=max_chars)
+    return _tokenize_document_by_janome(model_registry.get("janome"), chunks)
+
+
+def _tokenize_document_by_janome(janome_tokenizer: "janome.tokenizer.Tokenizer", chunks: Iterator[DocumentChunk]) -> Iterator[DocumentToken]:
+    for chunk in chunks:
+        # Janomeのトークンは位置を持たないため、表層形をチャンク内で先頭から順に探す
+        cursor = 0
+        for token in janome_tokenizer.tokenize(chunk.text):
+            start = chunk.text.find(token.surface, cursor)
+            if start < 0:
+                raise Exception(f"surface {token.surface!r} is not found in the document after position {chunk.start + cursor}")
+            cursor = start + len(token.surface)
+            yield DocumentToken(token.surface, token.base_form, chunk.start + start, chunk.start + cursor)
+
+
+@log_decorator
+def tokenize_document_by_ginza(document: Union[str, Iterable[str]], max_chars: int = DEFAULT_MAX_CHARS,
+                               batch_size: int = 16) -> Iterator[DocumentToken]:
+    """長い文章をsplit_documentでmax_chars文字以下に分割しながらGinzaで形態素解析する
+    - チャンクをbatch_size件ずつnlp.pipeで解析するため、spaCyの最大文字数を超える文章も解析できる
+    - 一度に保持するのはbatch_size件のチャンクの解析結果だけなので、メモリ使用量は文章の長さに依存しない
+    - 引数の確認とGinzaの読み込みは呼び出し時に行い、解析は結果を取り出すときに行う
+
+    Parameters
+    ----------
+    document : Union[str, Iterable[str]]
+        解析したい文章、または文章を先頭から順に分けた文字列のイテラブル
+    max_chars : int, optional
+        1チャンクの最大文字数, by default 2000
+    batch_size : int, optional
+        nlp.pipeに渡すバッチサイズ, by default 16
+
+    Returns
+    -------
+    Iterator[DocumentToken]
+        文章の先頭から順の単語と文章全体の中での位置を返すイテレータ
+    """
+    if batch_size < 1:
+        raise Exception(f"batch_size > 0 (but batch_size={batch_size})")
+    chunks = split_document(document, max_chars=max_chars)
+    return _tokenize_document_by_ginza(model_registry.get("ginza"), chunks, batch_size)
+
+
+def _tokenize_document_by_ginza(nlp: "spacy.language.Language", chunks: Iterator[DocumentChunk], batch_size: int) -> Iterator[DocumentToken]:
+    starts: "deque[int]" = deque()
+
+    def texts() -> Iterator[str]:
+        for chunk in chunks:
+            starts.append(chunk.start)
+            yield chunk.text
+
+    # nlp.pipeはチャンクを順に読み進めて同じ順番で返すため、チャンクの開始位置を先入れ先出しで対応付ける
+    for doc in nlp.pipe(texts(), batch_size=batch_size):
+        chunk_start = starts.popleft()
+        for token in doc:
+            start = chunk_start + token.idx
+            yield DocumentToken(token.orth_, token.lemma_, start, start + len(token.orth_))
 
 
 @log_decorator
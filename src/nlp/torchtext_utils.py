@@ -1,25 +1,40 @@
+from logging import getLogger
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Sequence
+
+import numpy as np
+from torch.utils.data import Sampler
 from torchtext import data
 from torchtext.data import Example
 
+logger = getLogger(__name__)
+
+MAKE_EXAMPLE_FUNCTIONS = {
+    'json': Example.fromJSON, 'dict': Example.fromdict,
+    'tsv': Example.fromTSV, 'csv': Example.fromCSV}
+
+
+def _flatten_fields(make_example: Callable, fields):
+    # fromdict・fromJSONのfieldsはDictionaryなので、Datasetに渡すList[Tuple[str, Field]]に変換する
+    if make_example in (Example.fromdict, Example.fromJSON):
+        fields, field_dict = [], fields
+        for field in field_dict.values():
+            if isinstance(field, list):
+                fields.extend(field)
+            else:
+                fields.append(field)
+    return fields
+
 
 class TabularDataset_From_List(data.Dataset):
     """torchtextでListやDictionaryから直接TabularDatasetを作成するためのクラス
     """
 
     def __init__(self, input_list, format, fields, skip_header=False, **kwargs):
-        make_example = {
-            'json': Example.fromJSON, 'dict': Example.fromdict,
-            'tsv': Example.fromTSV, 'csv': Example.fromCSV}[format.lower()]
+        make_example = MAKE_EXAMPLE_FUNCTIONS[format.lower()]
 
         examples = [make_example(item, fields) for item in input_list]
 
-        if make_example in (Example.fromdict, Example.fromJSON):
-            fields, field_dict = [], fields
-            for field in field_dict.values():
-                if isinstance(field, list):
-                    fields.extend(field)
-                else:
-                    fields.append(field)
+        fields = _flatten_fields(make_example, fields)
 
         super(TabularDataset_From_List, self).__init__(examples, fields, **kwargs)
 
@@ -34,3 +49,229 @@ class TabularDataset_From_List(data.Dataset):
         test_data = None if test is None else cls(
             test, **kwargs)
         return tuple(d for d in (train_data, val_data, test_data) if d is not None)
+
+
+class LazyExamples(Sequence):
+    """元データ（tsvの行やDictionaryなど）だけを保持し、アクセスされたときにExampleを作成するシーケンス
+    - 分かち書きはExampleの作成時に行われるため、作成前のデータは元データの分のメモリしか使わない
+
+    Parameters
+    ----------
+    items : List[Any]
+        Exampleの元データのリスト
+    make_example : Callable
+        Example.fromTSVなどのExampleを作成する関数
+    fields : Any
+        make_exampleに渡すfields
+    cache_examples : bool, optional
+        一度作成したExampleを保持する場合はTrue（2エポック目以降の分かち書きを省略できる）, by default False
+    indices : List[int], optional
+        使用するitemsの位置（filter_predで絞り込んだ結果）。Noneの場合は全て, by default None
+    """
+
+    def __init__(self, items: List[Any], make_example: Callable, fields, cache_examples: bool = False, indices: List[int] = None):
+        self.items = items
+        self.make_example = make_example
+        self.fields = fields
+        self.indices = indices
+        self._cache = [None] * len(self) if cache_examples else None
+
+    def __len__(self) -> int:
+        return len(self.items) if self.indices is None else len(self.indices)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if self._cache is not None and self._cache[i] is not None:
+            return self._cache[i]
+        example = self.make_example(self.items[i if self.indices is None else self.indices[i]], self.fields)
+        if self._cache is not None:
+            self._cache[i] = example
+        return example
+
+
+class LazyTabularDataset_From_List(data.Dataset):
+    """TabularDataset_From_Listと同じ引数で、Exampleをアクセス時に作成するデータセット
+    - 作成直後から最初のバッチを取り出せる（コーパス全体の分かち書きを待たない）
+    - input_listはジェネレータも可（元データだけをリストに保持する）
+    - filter_predを指定した場合は作成時に全てのExampleを一度作成して絞り込む
+
+    Parameters
+    ----------
+    input_list : Iterable[Any]
+        tsv・csvの行の文字列、またはDictionary・JSON文字列のイテラブル
+    format : str
+        "tsv", "csv", "dict", "json"のいずれか
+    fields : Any
+        Example.fromTSVなどに渡すfields
+    skip_header : bool, optional
+        Trueの場合はinput_listの最初の要素を除く, by default False
+    cache_examples : bool, optional
+        一度作成したExampleを保持する場合はTrue, by default False
+    filter_pred : Callable[[Example], bool], optional
+        Trueを返したExampleだけを使う, by default None
+    """
+
+    def __init__(self, input_list: Iterable[Any], format: str, fields, skip_header: bool = False,
+                 cache_examples: bool = False, filter_pred: Callable[[Example], bool] = None, **kwargs):
+        make_example = MAKE_EXAMPLE_FUNCTIONS[format.lower()]
+        items = list(input_list)
+        if skip_header:
+            items = items[1:]
+
+        indices = None
+        if filter_pred is not None:
+            indices = [i for i, item in enumerate(items) if filter_pred(make_example(item, fields))]
+        examples = LazyExamples(items, make_example, fields, cache_examples=cache_examples, indices=indices)
+
+        fields = _flatten_fields(make_example, fields)
+
+        super(LazyTabularDataset_From_List, self).__init__(examples, fields, **kwargs)
+
+    @classmethod
+    def splits(cls, train: Iterable[Any] = None, validation: Iterable[Any] = None, test: Iterable[Any] = None, **kwargs):
+        """train, validation, testのデータセットをまとめて作成（ダウンロードは行わない）
+
+        Parameters
+        ----------
+        train : Iterable[Any], optional
+            トレーニング用の元データ（ジェネレータも可）, by default None
+        validation : Iterable[Any], optional
+            学習評価用の元データ（ジェネレータも可）, by default None
+        test : Iterable[Any], optional
+            テスト用の元データ（ジェネレータも可）, by default None
+
+        Returns
+        -------
+        Tuple[LazyTabularDataset_From_List, ...]
+            Noneでない元データから作成したデータセット
+        """
+        return tuple(cls(items, **kwargs) for items in (train, validation, test) if items is not None)
+
+
+class TokenBudgetBatchSampler(Sampler):
+    """文の長さが近いものをまとめ、パディングを含む単語数がmax_tokens以下になるように文の数を変えてバッチを作成するバッチサンプラー
+    - エポックごとにpool_size件ずつ取り出して長さ順に並べ、先頭からmax_tokensを超えない範囲でバッチにする
+    - バッチの順番はseedとエポック番号（set_epoch）から決まるため、同じseedなら同じバッチの並びを再現できる
+    - エポックごとのパディングの割合はlast_epoch_statsに保存し、ログにも出力する
+    - DataLoaderのbatch_samplerやBucketByTokenIteratorで使用する（DataLoaderで使う場合はエポックごとにset_epochを呼ぶ）
+
+    Parameters
+    ----------
+    lengths : Sequence[int]
+        データセットの各文の単語数（TokenShards.lengths()など）
+    max_tokens : int
+        1バッチのパディングを含む単語数（最大の文の長さ × 文の数）の上限（1文でこれを超える場合はその文だけのバッチにする）
+    shuffle : bool, optional
+        エポックごとにデータとバッチの順番をシャッフルする場合はTrue, by default True
+    seed : int, optional
+        シャッフルの乱数のシード, by default 0
+    pool_size : int, optional
+        長さ順に並べる単位の文の数（大きいほどパディングは減るがバッチの多様性が減る）, by default 10000
+    """
+
+    def __init__(self, lengths: Sequence[int], max_tokens: int, shuffle: bool = True, seed: int = 0, pool_size: int = 10000):
+        super(TokenBudgetBatchSampler, self).__init__(None)
+        if max_tokens < 1:
+            raise Exception(f"max_tokens > 0 (but max_tokens={max_tokens})")
+        self.lengths = np.asarray(lengths, dtype=np.int64)
+        self.max_tokens = max_tokens
+        self.shuffle = shuffle
+        self.seed = seed
+        self.pool_size = pool_size
+        self.epoch = 0
+        self.last_epoch_stats: Dict[str, float] = {}
+        self._batches = None
+        self._batches_epoch = None
+
+    def set_epoch(self, epoch: int):
+        """次に作成するバッチのエポック番号を設定（シャッフルの乱数に使う）"""
+        self.epoch = epoch
+
+    def __len__(self) -> int:
+        """現在のエポックのバッチ数（__iter__で返すバッチ数と同じ）"""
+        return len(self._get_batches())
+
+    def __iter__(self) -> Iterator[List[int]]:
+        batches = self._get_batches()
+        real_tokens = int(self.lengths.sum())
+        padded_tokens = sum(int(self.lengths[batch].max()) * len(batch) for batch in batches if len(batch))
+        self.last_epoch_stats = {
+            "epoch": self.epoch,
+            "n_batches": len(batches),
+            "real_tokens": real_tokens,
+            "padded_tokens": padded_tokens,
+            "padding_efficiency": real_tokens / padded_tokens if padded_tokens else 1.0,
+        }
+        logger.info(
+            "epoch %d: %d batches, padding efficiency %.3f (%d / %d tokens)", self.epoch, len(batches),
+            self.last_epoch_stats["padding_efficiency"], real_tokens, padded_tokens)
+        for batch in batches:
+            yield batch.tolist()
+
+    def _get_batches(self) -> List[np.ndarray]:
+        # バッチはエポックごとに1回だけ作成し、__len__と__iter__で同じものを使う
+        if self._batches is None or self._batches_epoch != self.epoch:
+            self._batches = self._create_batches()
+            self._batches_epoch = self.epoch
+        return self._batches
+
+    def _create_batches(self) -> List[np.ndarray]:
+        random_state = np.random.RandomState(self.seed + self.epoch)
+        indices = random_state.permutation(len(self.lengths)) if self.shuffle else np.arange(len(self.lengths))
+        batches = []
+        for start in range(0, len(indices), self.pool_size):
+            pool = indices[start: start + self.pool_size]
+            pool = pool[np.argsort(self.lengths[pool], kind="stable")]
+            # 長さ順に並んでいるので、バッチの最大の長さは常に最後に追加した文の長さ
+            batch_start = 0
+            for i in range(1, len(pool) + 1):
+                if i == len(pool) or max(int(self.lengths[pool[i]]), 1) * (i + 1 - batch_start) > self.max_tokens:
+                    batches.append(pool[batch_start:i])
+                    batch_start = i
+        if self.shuffle:
+            batches = [batches[i] for i in random_state.permutation(len(batches))]
+        return batches
+
+
+def _text_length(example: Example) -> int:
+    return len(example.Text)
+
+
+class BucketByTokenIterator(data.Iterator):
+    """TokenBudgetBatchSamplerでバッチを作成するtorchtextのIterator
+    - data.BucketIteratorのbatch_sizeの代わりにmax_tokensでバッチの大きさを決める
+
+    Parameters
+    ----------
+    dataset : data.Dataset
+        TabularDataset_From_Listなどのデータセット
+    max_tokens : int
+        1バッチのパディングを含む単語数の上限
+    sort_key : Callable[[Example], int], optional
+        文の単語数を返す関数（作成時に全てのExampleに対して1回だけ呼び出す）, by default None
+        Noneの場合はdataset.sort_key、それも無い場合はlen(example.Text)
+    seed : int, optional
+        シャッフルの乱数のシード, by default 0
+    pool_size : int, optional
+        長さ順に並べる単位の文の数, by default 10000
+    kwargs : dict
+        device, train, repeat, shuffle, sort_within_batchなどdata.Iteratorの引数
+    """
+
+    def __init__(self, dataset: data.Dataset, max_tokens: int, sort_key: Callable[[Example], int] = None,
+                 seed: int = 0, pool_size: int = 10000, **kwargs):
+        kwargs.setdefault("sort", False)
+        super(BucketByTokenIterator, self).__init__(dataset, batch_size=1, sort_key=sort_key, **kwargs)
+        self.sort_key = self.sort_key or _text_length
+        lengths = [self.sort_key(example) for example in dataset]
+        self.batch_sampler = TokenBudgetBatchSampler(lengths, max_tokens, shuffle=self.shuffle, seed=seed, pool_size=pool_size)
+        self._n_epochs = 0
+
+    def create_batches(self):
+        self.batch_sampler.set_epoch(self._n_epochs)
+        self._n_epochs += 1
+        self.batches = ([self.dataset[i] for i in batch] for batch in self.batch_sampler)
+
+    def __len__(self) -> int:
+        return len(self.batch_sampler)
@@ -0,0 +1,162 @@
+import copy
+import math
+from logging import getLogger
+from typing import Dict, Union
+
+import torch
+import torch.nn as nn
+
+from src.torch_model.transformer_model import TransformerModel
+from src.utils import log_decorator
+
+logger = getLogger(__name__)
+
+
+class _ClassifierForExport(nn.Module):
+    """TransformerModel（分類モデル）と同じ計算をTorchScriptに変換できる形で行うモジュール
+    - 入力は単語ID [系列長, バッチサイズ] と各文の単語数 [バッチサイズ]（パディングは末尾）
+    - 因果マスクはmax_lengthの大きさで1回だけ作成し、系列長に合わせて切り出す
+    """
+
+    def __init__(self, model: TransformerModel, max_length: int):
+        super(_ClassifierForExport, self).__init__()
+        self.encoder = model.encoder
+        self.pos_encoder = model.pos_encoder
+        self.transformer_encoder = model.transformer_encoder
+        self.decoder = model.decoder
+        self.scale = math.sqrt(model.embed_size)
+        self.mean_pooling = model.pooling == "mean"
+        self.use_causal_mask = model.use_causal_mask
+        self.register_buffer("causal_mask", model._generate_square_subsequent_mask(max_length))
+        # 量子化後のdecoderからはバイアスを取り出せないため、先にコピーしておく
+        self.register_buffer("decoder_bias", model.decoder.bias.detach().clone())
+
+    def forward(self, src: torch.Tensor, lengths: torch.Tensor) -> torch.Tensor:
+        seq_len = src.size(0)
+        positions = torch.arange(seq_len, device=src.device)
+        padding_mask = positions.unsqueeze(0) >= lengths.unsqueeze(1)
+        x = self.pos_encoder(self.encoder(src) * self.scale)
+        if self.use_causal_mask:
+            output = self.transformer_encoder(x, self.causal_mask[:seq_len, :seq_len], padding_mask)
+        else:
+            output = self.transformer_encoder(x, None, padding_mask)
+        keep = (~padding_mask).transpose(0, 1).unsqueeze(2).to(output.dtype)
+        summed = (output * keep).sum(dim=0)
+        n_tokens = keep.sum(dim=0)
+        if self.mean_pooling:
+            return self.decoder(summed / n_tokens.clamp(min=1))
+        # decoder(合計) = W・合計 + b なので、単語数 × bにするには (単語数 - 1) × b を足す
+        return self.decoder(summed) + (n_tokens - 1) * self.decoder_bias
+
+
+def _example_inputs(ntoken: int, max_length: int, batch_size: int = 4, seed: int = 0):
+    generator = torch.Generator().manual_seed(seed)
+    lengths = torch.randint(1, max_length + 1, (batch_size,), generator=generator)
+    lengths[0] = max_length
+    src = torch.randint(2, max(ntoken, 3), (max_length, batch_size), generator=generator)
+    src[torch.arange(max_length).unsqueeze(1) >= lengths.unsqueeze(0)] = 1
+    return src, lengths
+
+
+@log_decorator
+def export_torchscript(model: TransformerModel, file_path: str, quantize: bool = False, max_length: int = 512) -> str:
+    """分類モデルをTorchScriptに変換して保存（読み込みにTransformerModelのソースコードが不要になる）
+    - torch.jit.scriptで変換できない場合はtorch.jit.traceで変換する
+    - quantize=Trueの場合はnn.Linear（フィードフォワード層・decoder）をint8に動的量子化する
+
+    Parameters
+    ----------
+    model : TransformerModel
+        学習済みの分類モデル（is_classifier=True）
+    file_path : str
+        保存先のファイルパス
+    quantize : bool, optional
+        nn.Linearをint8に動的量子化する場合はTrue（CPU向け）, by default False
+    max_length : int, optional
+        入力できる最大の系列長, by default 512
+
+    Returns
+    -------
+    str
+        変換に使った方法（"script"または"trace"）
+    """
+    if not model.is_classifier:
+        raise Exception("export_torchscript supports only classifier models (is_classifier=True)")
+    module = _ClassifierForExport(copy.deepcopy(model).cpu().eval(), max_length).eval()
+    if quantize:
+        module = torch.quantization.quantize_dynamic(module, {nn.Linear}, dtype=torch.qint8)
+
+    try:
+        exported, method = torch.jit.script(module), "script"
+    except Exception as e:
+        logger.info(f"torch.jit.script failed, fallback to torch.jit.trace: {e}")
+        example = _example_inputs(model.encoder.num_embeddings, min(max_length, 32))
+        with torch.no_grad():
+            exported, method = torch.jit.trace(module, example, check_trace=False), "trace"
+    torch.jit.save(exported, file_path)
+    return method
+
+
+@log_decorator
+def load_torchscript(file_path: str, num_threads: int = None) -> torch.jit.ScriptModule:
+    """export_torchscriptで保存したモデルをCPUに読み込み
+
+    Parameters
+    ----------
+    file_path : str
+        export_torchscriptで保存したファイルパス
+    num_threads : int, optional
+        torch.set_num_threadsに設定するスレッド数（Noneの場合は変更しない）, by default None
+
+    Returns
+    -------
+    torch.jit.ScriptModule
+        model(単語ID [系列長, バッチサイズ], 各文の単語数 [バッチサイズ]) で [バッチサイズ, n_class] を返すモデル
+    """
+    if num_threads is not None:
+        torch.set_num_threads(num_threads)
+    return torch.jit.load(file_path, map_location="cpu").eval()
+
+
+@log_decorator
+def check_parity(model: TransformerModel, exported: nn.Module, max_length: int = 64, batch_size: int = 16,
+                 atol: float = 1e-4, min_label_agreement: float = 1.0, seed: int = 0) -> Dict[str, Union[float, bool]]:
+    """変換前のモデルと変換後のモデルの出力を同じ入力で比較
+    - 一致しない場合も例外にせず、"passed"がFalseの結果を返す（呼び出し元で扱いを決める）
+
+    Parameters
+    ----------
+    model : TransformerModel
+        変換前の分類モデル
+    exported : nn.Module
+        export_torchscript・load_torchscriptで作成したモデル
+    max_length : int, optional
+        比較に使う入力の最大の系列長, by default 64
+    batch_size : int, optional
+        比較に使う入力の文章数, by default 16
+    atol : float, optional
+        出力の差の絶対値の許容値（量子化したモデルでは大きくする）, by default 1e-4
+    min_label_agreement : float, optional
+        確率最大のクラスが一致する割合の下限, by default 1.0
+    seed : int, optional
+        入力を作成する乱数のシード, by default 0
+
+    Returns
+    -------
+    Dict[str, Union[float, bool]]
+        {"max_abs_diff": 出力の差の絶対値の最大値, "label_agreement": 確率最大のクラスが一致した割合,
+         "passed": max_abs_diff <= atol かつ label_agreement >= min_label_agreement の場合はTrue}
+    """
+    src, lengths = _example_inputs(model.encoder.num_embeddings, max_length, batch_size, seed)
+    model = copy.deepcopy(model).cpu().eval()
+    with torch.no_grad():
+        expected = model(src, lengths=lengths)
+        actual = exported(src, lengths)
+    result = {
+        "max_abs_diff": float((expected - actual).abs().max()),
+        "label_agreement": float((expected.argmax(dim=1) == actual.argmax(dim=1)).float().mean()),
+    }
+    result["passed"] = result["max_abs_diff"] <= atol and result["label_agreement"] >= min_label_agreement
+    if not result["passed"]:
+        logger.warning(f"exported model does not match the eager model: {result} (atol={atol}, min_label_agreement={min_label_agreement})")
+    return result
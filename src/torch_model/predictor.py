@@ -0,0 +1,404 @@
+import json
+import pickle
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Tuple
+
+import torch
+import torch.nn as nn
+
+from src import instrumentation
+from src.torch_model.transformer_model import TransformerModel
+from src.utils import log_decorator
+
+
+class Prediction(NamedTuple):
+    """1つの文章の分類結果
+
+    Attributes
+    ----------
+    label : int
+        確率が最も高いクラス
+    probability : float
+        labelの確率
+    top_k : List[Tuple[int, float]]
+        確率が高い順のtop_k個の(クラス, 確率)
+    """
+    label: int
+    probability: float
+    top_k: List[Tuple[int, float]]
+
+
+def _inference_mode():
+    # torch.inference_modeが無いバージョンではno_gradを使う
+    return torch.inference_mode() if hasattr(torch, "inference_mode") else torch.no_grad()
+
+
+def _janome_surface_tokenize(sentence: str) -> List[str]:
+    # 学習時のtext_fieldのtokenize（janome_tokenizer.tokenize(sentence, wakati=True)）と同じ表層形の分かち書き
+    # 推論スレッドでエラーがsys.exitにならないように、log_decoratorの付いていない形態素解析器を直接使う
+    from src.nlp.tokenizer import model_registry
+    return list(model_registry.get("janome").tokenize(sentence, wakati=True))
+
+
+class FieldTokenizer:
+    """torchtextのtext_field.preprocessと同じ順番で文章を単語のリストにする関数オブジェクト
+    - tokenize → 小文字化（lower=Trueのみ） → ストップワードの除去 → preprocessingの実行
+
+    Parameters
+    ----------
+    tokenize : Callable[[str], List[str]], optional
+        文章を分かち書きする関数。Noneの場合はJanomeの表層形（学習時のtext_fieldと同じ）, by default None
+    lower : bool, optional
+        小文字にする場合はTrue, by default True
+    stop_words : Iterable[str], optional
+        除去するストップワード（小文字化の後に比較する）, by default None
+    preprocessing : Callable[[str], str], optional
+        ストップワードの除去後の各単語に行う処理（ステミングなど）, by default None
+    """
+
+    def __init__(self, tokenize: Callable[[str], List[str]] = None, lower: bool = True, stop_words: Iterable[str] = None,
+                 preprocessing: Callable[[str], str] = None):
+        self.tokenize = tokenize or _janome_surface_tokenize
+        self.lower = lower
+        self.stop_words = None if stop_words is None else set(stop_words)
+        self.preprocessing = preprocessing
+
+    @classmethod
+    def from_field(cls, field: Any) -> "FieldTokenizer":
+        """torchtextのdata.Fieldと同じ設定で作成（fieldのtokenize, lower, stop_words, preprocessingを使う）"""
+        return cls(field.tokenize, lower=field.lower, stop_words=field.stop_words, preprocessing=field.preprocessing)
+
+    def __call__(self, sentence: str) -> List[str]:
+        tokens = self.tokenize(sentence.rstrip("\n"))
+        if self.lower:
+            tokens = [token.lower() for token in tokens]
+        if self.stop_words is not None:
+            tokens = [token for token in tokens if token not in self.stop_words]
+        if self.preprocessing is not None:
+            tokens = [self.preprocessing(token) for token in tokens]
+        return tokens
+
+
+class BatchPredictor:
+    """学習済みの分類モデルと語彙を1回だけ読み込み、複数のスレッドからの推論リクエストをまとめて推論する
+    - submit/predictで受け付けたリクエストは、max_batch_size件たまるか最初のリクエストからmax_wait_ms経過するとまとめて推論する
+    - リクエストごとのレイテンシはインスタンスごとのヒストグラム（stats()で確認）とinstrumentationのヒストグラム（/metricsで確認）に記録する
+    - 分かち書き・推論に失敗した場合は、失敗したリクエストのFutureだけにエラーを設定し、同じバッチの他のリクエストは推論する
+
+    Parameters
+    ----------
+    model : nn.Module
+        学習済みの分類モデル（TransformerModelなど、[系列長, バッチサイズ]の単語IDを入力とするモデル）
+    vocab : Any
+        学習時のtext_field.vocab（stoiを持つオブジェクト）
+    tokenize : Callable[[str], List[str]], optional
+        文章を学習時と同じ単語のリストにする関数, by default None
+        Noneの場合はJanomeの表層形を小文字にしたもの（学習時のtext_fieldのstop_words・preprocessingは再現しない）
+        学習時のtext_fieldがある場合はFieldTokenizer.from_field(text_field)を渡す
+    max_batch_size : int, optional
+        1回に推論する最大の文章数, by default 32
+    max_wait_ms : float, optional
+        最初のリクエストから推論を始めるまでの最大の待ち時間[ms], by default 5.0
+    top_k : int, optional
+        Prediction.top_kに含めるクラス数, by default 3
+    num_threads : int, optional
+        torch.set_num_threadsに設定するスレッド数（Noneの場合は変更しない）, by default None
+    device : str, optional
+        推論するデバイス, by default "cpu"
+    """
+
+    def __init__(self, model: nn.Module, vocab: Any, tokenize: Callable[[str], List[str]] = None, max_batch_size: int = 32,
+                 max_wait_ms: float = 5.0, top_k: int = 3, num_threads: int = None, device: str = "cpu"):
+        if max_batch_size < 1:
+            raise Exception(f"max_batch_size > 0 (but max_batch_size={max_batch_size})")
+        if num_threads is not None:
+            torch.set_num_threads(num_threads)
+        self.device = torch.device(device)
+        self.model = model.to(self.device).eval()
+        self.stoi = vocab.stoi
+        self.unk_index = self.stoi.get("<unk>", 0)
+        self.pad_index = self.stoi.get("<pad>", 1)
+        self.tokenize = tokenize or FieldTokenizer()
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_ms / 1000
+        self.top_k = top_k
+        self._queue: "queue.Queue[Tuple[str, Future, float]]" = queue.Queue()
+        self._worker = None
+        self._stopped = threading.Event()
+        # stats()は他の推論器と混ざらないようにインスタンスごとに数え、/metricsには全ての推論器の合計を記録する
+        self._latency = instrumentation.CallStats(f"{__name__}.{type(self).__name__}.request")
+        self._global_latency = instrumentation.get_call_stats(self._latency.name)
+        self._n_batches = 0
+        self._n_requests = 0
+        self._started_at = None
+
+    @classmethod
+    @log_decorator
+    def load(cls, model_path: str, vocab_path: str, **kwargs) -> "BatchPredictor":
+        """torch.saveで保存したモデルとpickleで保存した語彙から作成
+
+        Parameters
+        ----------
+        model_path : str
+            torch.save(best_model, ...)で保存したモデルのファイルパス
+        vocab_path : str
+            pickle.dump(text_field.vocab, ...)で保存した語彙のファイルパス
+        kwargs : dict
+            BatchPredictorの引数
+
+        Returns
+        -------
+        BatchPredictor
+            作成した推論器（start()で推論スレッドを開始する）
+        """
+        model = torch.load(model_path, map_location=kwargs.get("device", "cpu"))
+        with open(vocab_path, mode="rb") as f:
+            vocab = pickle.load(f)
+        return cls(model, vocab, **kwargs)
+
+    def start(self) -> "BatchPredictor":
+        """推論スレッドを開始"""
+        if self._worker is None:
+            self._stopped.clear()
+            self._started_at = time.perf_counter()
+            self._worker = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+            self._worker.start()
+        return self
+
+    def stop(self):
+        """受け付け済みのリクエストを推論してから推論スレッドを停止"""
+        if self._worker is not None:
+            self._stopped.set()
+            self._worker.join()
+            self._worker = None
+
+    def __enter__(self) -> "BatchPredictor":
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def submit(self, sentence: str) -> Future:
+        """推論リクエストを受け付け、結果（Prediction）を受け取るFutureを返す"""
+        if self._worker is None:
+            raise Exception("BatchPredictor is not started (call start())")
+        future = Future()
+        self._queue.put((sentence, future, time.perf_counter()))
+        return future
+
+    def predict(self, sentence: str, timeout: float = None) -> Prediction:
+        """1つの文章を推論（他のスレッドのリクエストとまとめて推論される）
+
+        Parameters
+        ----------
+        sentence : str
+            分類したい文章
+        timeout : float, optional
+            結果を待つ最大の秒数, by default None
+
+        Returns
+        -------
+        Prediction
+            分類結果
+        """
+        return self.submit(sentence).result(timeout)
+
+    def predict_batch(self, sentences: List[str]) -> List[Prediction]:
+        """複数の文章を呼び出したスレッドでmax_batch_size件ずつ推論（推論スレッドは使わない）"""
+        predictions = []
+        for start in range(0, len(sentences), self.max_batch_size):
+            predictions.extend(self._predict(sentences[start: start + self.max_batch_size]))
+        return predictions
+
+    def stats(self) -> Dict[str, float]:
+        """推論スレッドで処理したリクエストのレイテンシのパーセンタイルとスループット"""
+        histogram = self._latency.histogram
+        elapsed = time.perf_counter() - self._started_at if self._started_at else 0.0
+        return {
+            "requests": self._n_requests,
+            "batches": self._n_batches,
+            "mean_batch_size": self._n_requests / self._n_batches if self._n_batches else 0.0,
+            "p50_seconds": histogram.percentile(0.50),
+            "p99_seconds": histogram.percentile(0.99),
+            "throughput": self._n_requests / elapsed if elapsed > 0 else 0.0,
+        }
+
+    def _run(self):
+        while not (self._stopped.is_set() and self._queue.empty()):
+            try:
+                requests = [self._queue.get(timeout=0.05)]
+            except queue.Empty:
+                continue
+            deadline = requests[0][2] + self.max_wait_seconds
+            while len(requests) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    requests.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            # 分かち書きは1件ずつ行い、失敗したリクエストだけを除く
+            encoded = []
+            for sentence, future, submitted_at in requests:
+                try:
+                    encoded.append((self._token_ids(sentence), future, submitted_at))
+                except BaseException as e:
+                    # log_decoratorの付いた関数のエラーはSystemExitになるため、BaseExceptionを受け取って推論スレッドを止めない
+                    self._fail(future, e)
+            if not encoded:
+                continue
+
+            try:
+                predictions = self._predict_ids([token_ids for token_ids, _, _ in encoded])
+            except BaseException:
+                # バッチでの推論に失敗した場合は1件ずつ推論し直し、失敗したリクエストだけにエラーを設定する
+                predictions = []
+                for token_ids, future, _ in encoded:
+                    try:
+                        predictions.append(self._predict_ids([token_ids])[0])
+                    except BaseException as e:
+                        self._fail(future, e)
+                        predictions.append(None)
+            finished_at = time.perf_counter()
+            n_requests = 0
+            for (_, future, submitted_at), prediction in zip(encoded, predictions):
+                if prediction is None:
+                    continue
+                self._record_call(finished_at - submitted_at)
+                future.set_result(prediction)
+                n_requests += 1
+            self._n_batches += 1
+            self._n_requests += n_requests
+
+    def _fail(self, future: Future, error: BaseException):
+        self._record_call(error=True)
+        future.set_exception(error)
+
+    def _record_call(self, seconds: float = None, error: bool = False):
+        self._latency.record_call(seconds, error=error)
+        self._global_latency.record_call(seconds, error=error)
+
+    def encode(self, sentences: List[str]) -> Tuple[torch.Tensor, torch.Tensor]:
+        """文章を学習時のtext_field.processと同じ単語IDのテンソルに変換
+
+        Parameters
+        ----------
+        sentences : List[str]
+            変換したい文章のリスト
+
+        Returns
+        -------
+        Tuple[torch.Tensor, torch.Tensor]
+            (単語ID [系列長, バッチサイズ]（末尾をパディング）, 各文の単語数 [バッチサイズ])
+            単語が1つも無い文は<unk>の1単語として扱う
+        """
+        return self._pad([self._token_ids(sentence) for sentence in sentences])
+
+    def _token_ids(self, sentence: str) -> List[int]:
+        # 単語が1つも無い文は<unk>の1単語として扱う
+        return [self.stoi.get(token, self.unk_index) for token in self.tokenize(sentence)] or [self.unk_index]
+
+    def _pad(self, token_ids: List[List[int]]) -> Tuple[torch.Tensor, torch.Tensor]:
+        lengths = torch.tensor([len(ids) for ids in token_ids], dtype=torch.long)
+        src = torch.full((int(lengths.max()), len(token_ids)), self.pad_index, dtype=torch.long)
+        for j, ids in enumerate(token_ids):
+            src[: len(ids), j] = torch.tensor(ids, dtype=torch.long)
+        return src, lengths
+
+    def _predict(self, sentences: List[str]) -> List[Prediction]:
+        return self._predict_ids([self._token_ids(sentence) for sentence in sentences])
+
+    def _predict_ids(self, token_ids: List[List[int]]) -> List[Prediction]:
+        src, lengths = self._pad(token_ids)
+        with _inference_mode():
+            src = src.to(self.device)
+            if isinstance(self.model, TransformerModel):
+                # パディングを除いて計算するため、バッチでも1件ずつ推論した場合と同じ結果になる
+                output = self.model(src, lengths=lengths)
+            else:
+                output = self.model(src)
+            probabilities = torch.softmax(output.float(), dim=1).cpu()
+        values, indices = torch.topk(probabilities, k=min(self.top_k, probabilities.size(1)), dim=1)
+        return [
+            Prediction(int(idx[0]), float(val[0]), [(int(i), float(v)) for i, v in zip(idx, val)])
+            for val, idx in zip(values, indices)
+        ]
+
+
+class _PredictorHandler(BaseHTTPRequestHandler):
+    def __init__(self, predictor: BatchPredictor, *args, **kwargs):
+        self.predictor = predictor
+        super(_PredictorHandler, self).__init__(*args, **kwargs)
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            self._send(200, instrumentation.format_prometheus().encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8")
+        elif self.path == "/stats":
+            self._send_json(200, self.predictor.stats())
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        if self.path != "/predict":
+            self.send_error(404)
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8"))
+            sentences = body["texts"] if "texts" in body else [body["text"]]
+        except (ValueError, KeyError, TypeError):
+            sentences = None
+        if not isinstance(sentences, list) or not all(isinstance(sentence, str) for sentence in sentences):
+            self._send_json(400, {"error": 'request body must be {"text": str} or {"texts": [str, ...]}'})
+            return
+        try:
+            futures = [self.predictor.submit(sentence) for sentence in sentences]
+            predictions = [future.result()._asdict() for future in futures]
+        except (Exception, SystemExit) as e:
+            # log_decoratorの付いた分かち書きのエラーはSystemExitとしてFutureに設定されるため、応答を返してからスレッドを続ける
+            self._send_json(500, {"error": str(e) or type(e).__name__})
+            return
+        self._send_json(200, {"predictions": predictions} if "texts" in body else predictions[0])
+
+    def _send_json(self, status: int, body: Any):
+        self._send(status, json.dumps(body, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8")
+
+    def _send(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_predictor_server(predictor: BatchPredictor, port: int = 8080, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """推論器をHTTPで公開するサーバーをバックグラウンドで起動
+    - POST /predict: {"text": 文章} または {"texts": [文章, ...]} を分類
+    - GET /stats: BatchPredictor.stats()
+    - GET /metrics: instrumentationの計測結果（Prometheusのテキスト形式）
+
+    Parameters
+    ----------
+    predictor : BatchPredictor
+        推論器（起動していない場合は起動する）
+    port : int, optional
+        待ち受けるポート番号, by default 8080
+    host : str, optional
+        待ち受けるホスト, by default "127.0.0.1"
+
+    Returns
+    -------
+    ThreadingHTTPServer
+        起動したサーバー（停止する場合はshutdown()を呼ぶ）
+    """
+    predictor.start()
+    server = ThreadingHTTPServer((host, port), partial(_PredictorHandler, predictor))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
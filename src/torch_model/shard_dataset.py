@@ -0,0 +1,54 @@
+from typing import List, Tuple
+
+import torch
+from torch.utils.data import Dataset
+
+from src.nlp.token_shards import TokenShards
+
+
+class ShardDataset(Dataset):
+    """build_token_shardsで保存したシャードをメモリマップで読み込むDataset
+    - 分かち書き・単語IDへの変換は行わないため、学習の再開時に前処理を待たない
+    - 単語IDはシャードの配列をコピーせずにtorch.from_numpyでテンソルにする
+
+    Parameters
+    ----------
+    output_dir : str
+        build_token_shardsの保存先のディレクトリ
+    """
+
+    def __init__(self, output_dir: str):
+        # mmap_mode="c"はtorch.from_numpyに渡せる書き込み可能な配列になる（書き込むまではページキャッシュを共有する）
+        self.shards = TokenShards(output_dir, mmap_mode="c")
+        self.pad_index = self.shards.pad_index
+
+    def __len__(self) -> int:
+        return len(self.shards)
+
+    def __getitem__(self, i: int) -> Tuple[torch.Tensor, int]:
+        token_ids, label = self.shards[i]
+        return torch.from_numpy(token_ids), label
+
+
+def collate_token_batch(batch: List[Tuple[torch.Tensor, int]], pad_index: int = 1) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    """ShardDatasetの要素をTransformerModelの入力の形（[系列長, バッチサイズ]）にまとめるDataLoaderのcollate_fn
+
+    Parameters
+    ----------
+    batch : List[Tuple[torch.Tensor, int]]
+        (単語IDのテンソル, ラベル)のリスト
+    pad_index : int, optional
+        パディングの単語ID（ShardDataset.pad_index）, by default 1
+
+    Returns
+    -------
+    Tuple[torch.Tensor, torch.Tensor, torch.Tensor]
+        (単語ID [系列長, バッチサイズ], ラベル [バッチサイズ], 各文の単語数 [バッチサイズ])
+    """
+    lengths = torch.tensor([len(token_ids) for token_ids, _ in batch], dtype=torch.long)
+    max_length = max(int(lengths.max()), 1) if batch else 1
+    text = torch.full((max_length, len(batch)), pad_index, dtype=torch.long)
+    for j, (token_ids, _) in enumerate(batch):
+        text[: len(token_ids), j] = token_ids
+    labels = torch.tensor([label for _, label in batch], dtype=torch.long)
+    return text, labels, lengths
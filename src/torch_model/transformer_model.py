@@ -2,16 +2,28 @@ import math
 
 import torch
 import torch.nn as nn
+import torch.nn.functional as F
 from torch.nn import TransformerEncoder, TransformerEncoderLayer
 
 from src.torch_model.encoder import PositionalEncoding
 
 
 class TransformerModel(nn.Module):
-    def __init__(self, ntoken, embed_size, nhead, nhid, nlayers, dropout=0.5, is_classifier=False, n_class=2):
+    """TransformerEncoderによる言語モデル・文書分類モデル
+
+    - 分類モデル（is_classifier=True）では、エンコーダーの出力を系列方向にプーリングしてからdecoderに入力する
+    - pooling="sum"は従来の「全ての位置でdecoderを通してから合計」と同じ出力（バイアスは単語数倍）
+    - forwardにsrc_key_padding_maskかlengthsを渡すと、パディングを注意機構とプーリングから除く
+    """
+
+    def __init__(self, ntoken, embed_size, nhead, nhid, nlayers, dropout=0.5, is_classifier=False, n_class=2,
+                 pooling="sum", use_causal_mask=True):
         super(TransformerModel, self).__init__()
+        if pooling not in ("sum", "mean"):
+            raise Exception(f"pooling must be 'sum' or 'mean' (but pooling={pooling})")
         self.model_type = 'Transformer'
         self.src_mask = None
+        self._mask_cache = {}
         self.pos_encoder = PositionalEncoding(embed_size, dropout)
         encoder_layers = TransformerEncoderLayer(embed_size, nhead, nhid, dropout)
         self.transformer_encoder = TransformerEncoder(encoder_layers, nlayers)
@@ -19,33 +31,81 @@ class TransformerModel(nn.Module):
         self.embed_size = embed_size
         self.decoder = nn.Linear(embed_size, ntoken)
         self.is_classifier = is_classifier
+        self.pooling = pooling
+        self.use_causal_mask = use_causal_mask
         if is_classifier:
             self.decoder = nn.Linear(embed_size, n_class)
 
         self.init_weights()
 
+    def __getstate__(self):
+        # マスクのキャッシュは保存しない
+        state = self.__dict__.copy()
+        state["_mask_cache"] = {}
+        return state
+
+    def __setstate__(self, state):
+        # 以前のバージョンで保存したモデル（torch.save）にない属性を補う
+        super(TransformerModel, self).__setstate__(state)
+        self.__dict__.setdefault("_mask_cache", {})
+        self.__dict__.setdefault("pooling", "sum")
+        self.__dict__.setdefault("use_causal_mask", True)
+
     def _generate_square_subsequent_mask(self, sz):
         mask = (torch.triu(torch.ones(sz, sz)) == 1).transpose(0, 1)
         mask = mask.float().masked_fill(mask == 0, float('-inf')).masked_fill(mask == 1, float(0.0))
         return mask
 
+    def _get_square_subsequent_mask(self, sz, device):
+        # 系列長・デバイスごとにマスクを1回だけ作成する
+        key = (sz, str(device))
+        mask = self._mask_cache.get(key)
+        if mask is None:
+            mask = self._mask_cache[key] = self._generate_square_subsequent_mask(sz).to(device)
+        self.src_mask = mask
+        return mask
+
     def init_weights(self):
         initrange = 0.1
         self.encoder.weight.data.uniform_(-initrange, initrange)
         self.decoder.bias.data.zero_()
         self.decoder.weight.data.uniform_(-initrange, initrange)
 
-    def forward(self, src):
-        if self.src_mask is None or self.src_mask.size(0) != len(src):
-            device = src.device
-            mask = self._generate_square_subsequent_mask(len(src)).to(device)
-            self.src_mask = mask
+    def forward(self, src, src_key_padding_mask=None, lengths=None):
+        """
+        Parameters
+        ----------
+        src : torch.Tensor
+            単語ID [系列長, バッチサイズ]
+        src_key_padding_mask : torch.Tensor, optional
+            パディングの位置がTrueのマスク [バッチサイズ, 系列長], by default None
+        lengths : torch.Tensor, optional
+            各文の単語数 [バッチサイズ]（末尾がパディングの場合にsrc_key_padding_maskの代わりに指定）, by default None
+
+        Returns
+        -------
+        torch.Tensor
+            分類モデルは [バッチサイズ, n_class]、言語モデルは [系列長, バッチサイズ, ntoken]
+        """
+        if src_key_padding_mask is None and lengths is not None:
+            positions = torch.arange(src.size(0), device=src.device)
+            src_key_padding_mask = positions.unsqueeze(0) >= lengths.to(src.device).unsqueeze(1)
+        mask = self._get_square_subsequent_mask(len(src), src.device) if self.use_causal_mask else None
 
         src = self.encoder(src) * math.sqrt(self.embed_size)
         src = self.pos_encoder(src)
-        output = self.transformer_encoder(src, self.src_mask)
-        output = self.decoder(output)
-        if self.is_classifier:
-            return torch.sum(output, dim=0)
+        output = self.transformer_encoder(src, mask, src_key_padding_mask)
+        if not self.is_classifier:
+            return self.decoder(output)
+
+        if src_key_padding_mask is None:
+            summed = output.sum(dim=0)
+            n_tokens = torch.full((output.size(1), 1), output.size(0), dtype=output.dtype, device=output.device)
         else:
-            return output
+            keep = (~src_key_padding_mask).transpose(0, 1).unsqueeze(2).to(output.dtype)
+            summed = (output * keep).sum(dim=0)
+            n_tokens = keep.sum(dim=0)
+        if self.pooling == "mean":
+            return self.decoder(summed / n_tokens.clamp(min=1))
+        # decoder(各位置)の合計 = W・(出力の合計) + 単語数 × b
+        return F.linear(summed, self.decoder.weight) + n_tokens * self.decoder.bias
@@ -1,13 +1,22 @@
 import logging.config
 import os
 import sys
-from inspect import getframeinfo, stack
-from logging import getLogger
-from typing import Callable
+import time
+from functools import wraps
+from itertools import islice
+from logging import DEBUG, getLogger
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from src import instrumentation
 
 logging.config.fileConfig(os.getenv("LOG_CONF_PATH"))
 logger = getLogger(__name__)
 
+# zipファイル内のファイルを指定する区切り文字（example: data.zip::data/chABSA_dataset/e00008_ann.json）
+ARCHIVE_MEMBER_SEPARATOR = "::"
+# 読み込み時に自動で展開する圧縮ファイルの拡張子
+COMPRESSION_EXTENSIONS = (".gz", ".bz2", ".xz")
+
 
 def paramdeco(func: Callable) -> Callable:
     """引数ありのデコレータを書きやすくするためのデコレータ
@@ -32,18 +41,132 @@ def paramdeco(func: Callable) -> Callable:
     return param
 
 
+def iter_chunks(iterable: Iterable, chunk_size: int) -> Iterator[List]:
+    """iterableをchunk_size件ずつのリストに分割して順に返す
+
+    Parameters
+    ----------
+    iterable : Iterable
+        分割したい任意のイテラブル（ジェネレータも可）
+    chunk_size : int > 0
+        1チャンクあたりの最大要素数
+
+    Yields
+    -------
+    Iterator[List]
+        chunk_size件ずつのリスト（最後のチャンクのみchunk_size未満の場合あり）
+    """
+    if chunk_size < 1:
+        raise Exception(f"chunk_size > 0 (but chunk_size={chunk_size})")
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def split_archive_path(file_path: str) -> Tuple[str, Optional[str]]:
+    """ファイルパスをzipファイルのパスとzipファイル内のファイル名に分割
+
+    Parameters
+    ----------
+    file_path : str
+        ファイルパス、または"zipファイルのパス::zipファイル内のファイル名"
+
+    Returns
+    -------
+    Tuple[str, Optional[str]]
+        (zipファイルのパス, zipファイル内のファイル名)。zipファイル内のファイルでない場合は(file_path, None)
+    """
+    if ARCHIVE_MEMBER_SEPARATOR not in file_path:
+        return file_path, None
+    archive_path, member = file_path.split(ARCHIVE_MEMBER_SEPARATOR, 1)
+    return archive_path, member
+
+
+def strip_compression_extension(file_path: str) -> Tuple[str, str]:
+    """圧縮ファイルの拡張子（.gz, .bz2, .xz）を取り除く
+
+    Parameters
+    ----------
+    file_path : str
+        ファイルパス（example: data.json.gz）
+
+    Returns
+    -------
+    Tuple[str, str]
+        (圧縮ファイルの拡張子を除いたファイルパス, 圧縮ファイルの拡張子)。圧縮ファイルでない場合は(file_path, "")
+    """
+    root, ext = os.path.splitext(file_path)
+    if ext.lower() in COMPRESSION_EXTENSIONS:
+        return root, ext.lower()
+    return file_path, ""
+
+
+def get_rss_bytes() -> int:
+    """現在のプロセスの常駐メモリ量（RSS）を取得
+    - /proc/self/statmが読めない環境ではピーク時のRSSで代用
+
+    Returns
+    -------
+    int
+        RSS（Byte単位）
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
 def log_decorator(func: Callable) -> Callable:
-    caller = getframeinfo(stack()[1][0])
+    """関数の開始・終了のDEBUGログ出力、呼び出し回数・処理時間の計測、エラー時のログ出力と停止を行うデコレータ
+    - DEBUGログも計測も無効な場合は、ログ文字列の作成や時間計測は一切行わない
+    - 計測はsrc.instrumentation.enable_instrumentation()で有効にする
+
+    Parameters
+    ----------
+    func : Callable
+        任意の関数
+
+    Returns
+    -------
+    wrapper : Callable
+        ラッパー関数
+    """
+    code = getattr(func, "__code__", None)
+    location = f"{code.co_filename}:L{code.co_firstlineno}" if code else getattr(func, "__module__", "")
+    name = func.__name__
+    stats = instrumentation.get_call_stats(f"{func.__module__}.{func.__qualname__}")
+    state = instrumentation.STATE
 
+    @wraps(func)
     def wrapper(*args, **kwargs):
+        if not state.enabled and not logger.isEnabledFor(DEBUG):
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                logger.error("%s | %s | %s | %s | %s", location, name, args, kwargs, e)
+                sys.exit(1)
+
+        logger.debug("%s | %s | %s | %s | start", location, name, args, kwargs)
+        sampled = state.enabled and stats.should_sample()
+        start = time.perf_counter() if sampled else 0.0
         try:
-            logger.debug(f"{caller.filename}:L{caller.lineno} | {func.__name__} | {args} | {kwargs} | start")
             result = func(*args, **kwargs)
-            logger.debug(f"{caller.filename}:L{caller.lineno} | {func.__name__} | {args} | {kwargs} | completed")
-            return result
         except Exception as e:
-            logger.error(f"{caller.filename}:L{caller.lineno} | {func.__name__} | {args} | {kwargs} | {e}")
+            if state.enabled:
+                stats.record_error()
+            logger.error("%s | %s | %s | %s | %s", location, name, args, kwargs, e)
             sys.exit(1)
+        if sampled:
+            stats.record(time.perf_counter() - start)
+        logger.debug("%s | %s | %s | %s | completed", location, name, args, kwargs)
+        return result
 
     return wrapper
 
@@ -65,10 +188,12 @@ def check_read_file_decorator(func: Callable, extension: str = None) -> Callable
         ラッパー関数
     """
 
+    @wraps(func)
     def wrapper(*args, **kwargs):
-        is_exist_file_path(*args, **kwargs)
+        file_path = kwargs["file_path"] if "file_path" in kwargs else args[0]
+        is_exist_file_path(file_path)
         if extension:
-            is_match_extension(extension=extension, *args, **kwargs)
+            is_match_extension(file_path=file_path, extension=extension)
         return func(*args, **kwargs)
 
     return wrapper
@@ -77,11 +202,12 @@ def check_read_file_decorator(func: Callable, extension: str = None) -> Callable
 @log_decorator
 def is_match_extension(file_path: str, extension: str) -> None:
     """file_path内の拡張子がextensionと一致するかを確認
+    - 圧縮ファイル（example: data.json.gz）は圧縮ファイルの拡張子を除いて確認する
 
     Parameters
     ----------
     file_path : str
-        ファイルパス
+        ファイルパス、またはzipファイル内のファイルのパス
     extension : str
         拡張子（'.'無し）
 
@@ -91,7 +217,7 @@ def is_match_extension(file_path: str, extension: str) -> None:
         file_path内の拡張子がextensionと一致しない場合エラーをraiseし、プログラムを停止する
     """
 
-    _, ext = os.path.splitext(file_path)
+    _, ext = os.path.splitext(strip_compression_extension(file_path)[0])
     if ext != f".{extension}":
         raise Exception(f"file_path: {file_path} の拡張子が{extension}ではありません")
 
@@ -99,16 +225,17 @@ def is_match_extension(file_path: str, extension: str) -> None:
 @log_decorator
 def is_exist_file_path(file_path: str, *args, **kwargs) -> None:
     """ファイルパスが存在するかどうかを確認
+    - zipファイル内のファイルのパスの場合はzipファイルの存在だけを確認する（zipファイル内のファイルは読み込み時に確認する）
 
     Parameters
     ----------
     file_path : str
-        ファイルパス
+        ファイルパス、またはzipファイル内のファイルのパス
 
     Raises
     ------
     Exception
         ファイルパスが存在しない場合エラーをraiseし、プログラムを停止する
     """
-    if not os.path.exists(file_path):
+    if not os.path.exists(split_archive_path(file_path)[0]):
         raise Exception(f"file_path: {file_path} は存在しません")
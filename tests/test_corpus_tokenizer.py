@@ -0,0 +1,18 @@
+import pytest
+
+from src.nlp import corpus_tokenizer, tokenizer
+
+SENTENCES = ["走れ、メロス", "他者と比べるのではなく、過去の自分と比べなさい", "メロスは激怒した。"] * 10
+
+
+@pytest.mark.parametrize("n_workers, chunk_size", [(1, 4), (2, 4), (2, 100)])
+def test_wakachi_corpus(n_workers, chunk_size):
+    # 並列処理の結果が入力と同じ順番で、1文ずつ処理した結果と一致することを確認するテスト
+    results = corpus_tokenizer.wakachi_corpus(
+        (s for s in SENTENCES), backend="janome", chunk_size=chunk_size, n_workers=n_workers, max_pending_chunks=2)
+    assert list(results) == [tokenizer.wakachi_by_janome(sentence=s) for s in SENTENCES]
+
+
+def test_unknown_backend():
+    with pytest.raises(Exception):
+        list(corpus_tokenizer.wakachi_corpus(SENTENCES, backend="unknown"))
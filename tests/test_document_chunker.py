@@ -0,0 +1,47 @@
+import pytest
+
+from src.nlp import document_chunker
+
+ARTICLE = "第{}条 甲は乙に対し、本契約に基づき発生した一切の債務を、別途定める期日までに支払うものとする。\n"
+CONTRACT = "業務委託契約書\n" + "".join(ARTICLE.format(i) for i in range(1, 51))
+
+
+@pytest.mark.parametrize("max_chars", [1, 7, 60, 200, 100000])
+def test_split_document(max_chars):
+    # チャンクを連結すると元の文章に戻り、開始位置が正しく、max_chars以下であることを確認するテスト
+    chunks = list(document_chunker.split_document(CONTRACT, max_chars=max_chars))
+    assert "".join(chunk.text for chunk in chunks) == CONTRACT
+    assert all(CONTRACT[chunk.start: chunk.start + len(chunk.text)] == chunk.text for chunk in chunks)
+    assert all(0 < len(chunk.text) <= max_chars for chunk in chunks)
+
+    # 文字列のイテラブルで渡しても同じ位置で区切られる
+    pieces = (CONTRACT[i: i + 13] for i in range(0, len(CONTRACT), 13))
+    assert list(document_chunker.split_document(pieces, max_chars=max_chars)) == chunks
+
+
+def test_split_document_boundaries():
+    # 条文の見出し、改行、文末、読点の順に優先して区切ることを確認するテスト
+    chunks = list(document_chunker.split_document(CONTRACT, max_chars=200))
+    assert all(chunk.text.startswith("第") for chunk in chunks[1:])
+
+    text = "一行目です\n二行目の文です。三文目の、長い文です。"
+    assert [chunk.text for chunk in document_chunker.split_document(text, max_chars=20)] == ["一行目です\n二行目の文です。", "三文目の、長い文です。"]
+    assert [chunk.text for chunk in document_chunker.split_document("あいうえお、かきくけこさしすせそ", max_chars=8)] == \
+        ["あいうえお、", "かきくけこさしす", "せそ"]
+    assert list(document_chunker.split_document(["", ""])) == []
+
+
+def test_split_document_validation():
+    # 引数の誤りはイテレータを取り出す前の呼び出し時点でエラーになることを確認するテスト
+    with pytest.raises(SystemExit):
+        document_chunker.split_document(CONTRACT, max_chars=0)
+
+
+@pytest.mark.parametrize("max_chars", [50, 100, 150, 200, 250])
+def test_split_document_heading_at_chunk_end(max_chars):
+    # 条文の見出しがチャンクの末尾をまたぐ位置にあっても、最も後ろの見出しの直前で区切ることを確認するテスト
+    chunks = list(document_chunker.split_document(CONTRACT, max_chars=max_chars))
+    for chunk in chunks[:-1]:
+        heading = CONTRACT.rfind("\n第", chunk.start + max(max_chars // 2, 1) - 1, chunk.start + max_chars + 1)
+        if heading >= 0:
+            assert chunk.start + len(chunk.text) == heading + 1
@@ -0,0 +1,35 @@
+import os
+
+import pytest
+import torch
+
+from src.torch_model import export
+from src.torch_model.transformer_model import TransformerModel
+
+NTOKEN = 50
+
+
+def _build_model(seed: int = 0, **kwargs) -> TransformerModel:
+    torch.manual_seed(seed)
+    return TransformerModel(NTOKEN, 16, 2, 32, 2, dropout=0.0, is_classifier=True, n_class=5, **kwargs).eval()
+
+
+@pytest.mark.parametrize("quantize, atol, min_label_agreement", [(False, 1e-4, 1.0), (True, 1.0, 0.5)])
+@pytest.mark.parametrize("pooling", ["sum", "mean"])
+def test_export_torchscript(tmp_path, quantize, atol, min_label_agreement, pooling):
+    # TorchScriptに変換・保存して読み込んだモデルの出力が変換前のモデルと一致することを確認するテスト
+    model = _build_model(pooling=pooling)
+    file_path = os.path.join(str(tmp_path), "model.pt")
+    assert export.export_torchscript(model, file_path, quantize=quantize, max_length=32) in ("script", "trace")
+    exported = export.load_torchscript(file_path)
+    result = export.check_parity(model, exported, max_length=32, batch_size=8, atol=atol, min_label_agreement=min_label_agreement)
+    assert result["passed"], result
+
+
+def test_check_parity_mismatch(tmp_path):
+    # 一致しない場合は例外にせず、passed=Falseの結果を返すことを確認するテスト
+    file_path = os.path.join(str(tmp_path), "model.pt")
+    export.export_torchscript(_build_model(seed=1), file_path, max_length=32)
+    result = export.check_parity(_build_model(seed=0), export.load_torchscript(file_path), max_length=32, batch_size=8)
+    assert not result["passed"]
+    assert result["max_abs_diff"] > 1e-4
@@ -1,3 +1,12 @@
+import bz2
+import codecs
+import gzip
+import json
+import lzma
+import os
+import zipfile
+
+import pytest
 from tests.conftest import TEST_CSV_PATH, TEST_DOCX_PATH, TEST_JSON_PATH, TEST_PDF_PATH, TEST_TSV_PATH
 
 from src import file_reader
@@ -45,3 +54,163 @@ def test_read_docx():
     results = file_reader.read_docx_text(TEST_DOCX_PATH)
     assert (isinstance(results, list) and all(isinstance(x, str) for x in results)) is True
     assert len(results) > 0
+
+
+def test_iter_csv():
+    assert list(file_reader.iter_csv(TEST_CSV_PATH)) == file_reader.read_csv(TEST_CSV_PATH)
+    assert list(file_reader.iter_csv(TEST_CSV_PATH, columns=[1], skip_rows=4)) == [["e"], ["f"]]
+
+    batches = list(file_reader.iter_csv(TEST_CSV_PATH, batch_size=4))
+    assert [len(batch) for batch in batches] == [4, 2]
+    assert sum(batches, []) == file_reader.read_csv(TEST_CSV_PATH)
+
+
+def test_iter_tsv():
+    assert list(file_reader.iter_tsv(TEST_TSV_PATH)) == file_reader.read_tsv(TEST_TSV_PATH)
+    assert list(file_reader.iter_tsv(file_path=TEST_TSV_PATH, batch_size=3, columns=[1, 0])) == [
+        [["a", "0"], ["b", "1"], ["c", "2"]], [["d", "3"], ["e", "4"], ["f", "5"]]]
+
+
+def test_iter_tsv_columns_blank_and_short_rows(tmp_path):
+    # columnsを指定した場合、空行は読み飛ばし、列が足りない行は行番号を含むエラーになることを確認するテスト
+    path = tmp_path / "rows.tsv"
+    path.write_text("文章1\t0\n\n文章2\t1\n\n", encoding="utf-8")
+    assert list(file_reader.iter_tsv(str(path), columns=[1, 0])) == [["0", "文章1"], ["1", "文章2"]]
+
+    path.write_text("文章1\t0\n文章2\n", encoding="utf-8")
+    with pytest.raises(Exception, match=r"rows.tsv:2"):
+        list(file_reader.iter_tsv(str(path), columns=[0, 1]))
+
+
+@pytest.mark.parametrize("data, encoding", [
+    (codecs.BOM_UTF8 + "契約書".encode("utf-8"), "UTF-8-SIG"),
+    ("契約書".encode("utf-16"), "UTF-16"),
+    ("契約書".encode("utf-8"), "utf-8"),
+    (b"contract", "ascii"),
+])
+def test_detect_encoding(tmp_path, data, encoding):
+    path = tmp_path / "test.txt"
+    path.write_bytes(data)
+    assert file_reader.detect_encoding(str(path))["encoding"] == encoding
+    assert file_reader.read_txt(str(path)) == data.decode(encoding)
+
+
+def test_detect_encoding_shift_jis(tmp_path):
+    text = "本契約は、甲と乙の間の売買に関する基本的事項を定めるものである。\n" * 50
+    path = tmp_path / "test.txt"
+    path.write_bytes(text.encode("shift_jis"))
+    assert file_reader.detect_encoding(str(path))["encoding"].lower() in ("shift_jis", "cp932")
+    assert file_reader.read_txt(str(path)) == text
+
+
+def test_iter_pdf_pages():
+    # ページごとの抽出結果を結合すると全体の抽出結果と一致することを確認するテスト
+    pages = list(file_reader.iter_pdf_pages(TEST_PDF_PATH))
+    assert [page.page_number for page in pages] == list(range(len(pages)))
+    assert all(page.seconds >= 0 for page in pages)
+    assert "".join(page.text for page in pages) == file_reader.read_pdf_text(TEST_PDF_PATH)
+
+    selected = list(file_reader.iter_pdf_pages(TEST_PDF_PATH, page_numbers=[0]))
+    assert selected == [pages[0]._replace(seconds=selected[0].seconds)]
+
+
+def test_read_pdf_parallel():
+    assert file_reader.read_pdf_text(TEST_PDF_PATH, n_workers=2) == file_reader.read_pdf_text(TEST_PDF_PATH)
+
+
+def test_read_docx_fast_path():
+    # XMLを直接読み込んだ結果がpython-docxの結果と一致することを確認するテスト
+    expected = file_reader.read_docx_text(TEST_DOCX_PATH, use_python_docx=True)
+    assert file_reader.read_docx_text(TEST_DOCX_PATH) == expected
+    assert [text for text in file_reader.iter_docx_paragraphs(TEST_DOCX_PATH) if text] == expected
+
+
+@pytest.mark.parametrize("use_processes", [False, True])
+def test_read_files(tmp_path, use_processes):
+    # 読み込みに失敗するファイルがあっても停止せず、失敗したファイルの例外を返すことを確認するテスト
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "ok.json").write_text('{"id": 0}', encoding="utf-8")
+    (tmp_path / "broken.json").write_text('{"id": ', encoding="utf-8")
+    (tmp_path / "ok.txt").write_text("テキスト", encoding="utf-8")
+    (tmp_path / "ignored.md").write_text("対象外", encoding="utf-8")
+
+    results, errors = file_reader.read_files(str(tmp_path), n_workers=2, use_processes=use_processes)
+    assert results == {str(tmp_path / "sub" / "ok.json"): {"id": 0}, str(tmp_path / "ok.txt"): "テキスト"}
+    assert list(errors) == [str(tmp_path / "broken.json")]
+    assert isinstance(errors[str(tmp_path / "broken.json")], ValueError)
+
+    paths = [result.file_path for result in file_reader.iter_read_files([TEST_CSV_PATH, str(tmp_path / "*.md")])]
+    assert sorted(paths) == sorted([TEST_CSV_PATH, str(tmp_path / "ignored.md")])
+
+
+def test_read_files_errors(tmp_path, caplog):
+    # 読み込みの失敗はlog_decoratorのエラーログ・sys.exitを通さず、元の例外をファイルごとに返すことを確認するテスト
+    (tmp_path / "short.tsv").write_text("a\tb\n", encoding="utf-8")
+    with caplog.at_level("ERROR"):
+        results, errors = file_reader.read_files([str(tmp_path / "missing.json"), str(tmp_path / "short.tsv")], n_workers=2)
+    assert results == {str(tmp_path / "short.tsv"): [["a", "b"]]}
+    assert isinstance(errors[str(tmp_path / "missing.json")], FileNotFoundError)
+    assert not caplog.records
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 65536])
+def test_iter_json_array(tmp_path, chunk_size):
+    assert list(file_reader.iter_json_array(TEST_JSON_PATH, chunk_size=chunk_size)) == file_reader.read_json(TEST_JSON_PATH)
+
+    # chABSAと同じ構造（読み飛ばすheaderに文字列中の括弧やエスケープを含む）
+    data = {
+        "header": {"title": "括弧 ] } \\\" を含む", "values": [1, [2, {"a": 3}]]},
+        "meta": {"sentences": ["ネストした同名のキーは対象外"]},
+        "sentences": [{"sentence": f"文章{i}", "opinions": [{"polarity": "positive"}]} for i in range(5)] + [12345, -1.5e3, None],
+    }
+    path = tmp_path / "test.json"
+    path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    results = list(file_reader.iter_json_array(str(path), key_path="sentences", chunk_size=chunk_size))
+    assert results == data["sentences"]
+    results = list(file_reader.iter_json_array(str(path), key_path="header.values", chunk_size=chunk_size))
+    assert results == data["header"]["values"]
+    with pytest.raises(KeyError):
+        list(file_reader.iter_json_array(str(path), key_path="unknown", chunk_size=chunk_size))
+
+
+def test_iter_json_lines(tmp_path):
+    records = [{"id": i, "text": f"テキスト{i}"} for i in range(3)]
+    path = tmp_path / "test.jsonl"
+    path.write_text("\n".join(json.dumps(r, ensure_ascii=False) for r in records) + "\n\n", encoding="utf-8")
+    assert list(file_reader.iter_json_lines(str(path))) == records
+
+
+def test_read_archive_members(tmp_path):
+    # zipファイル内のファイル・圧縮ファイルを展開せずに、通常のファイルと同じ結果で読み込めることを確認するテスト
+    archive_path = str(tmp_path / "data.zip")
+    with zipfile.ZipFile(archive_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for path in [TEST_JSON_PATH, TEST_CSV_PATH, TEST_TSV_PATH, TEST_PDF_PATH, TEST_DOCX_PATH]:
+            archive.write(path, f"data/{os.path.basename(path)}")
+        archive.writestr("data/日本語.txt", "テキスト\r\n2行目".encode("cp932"))
+        archive.writestr("data/test_read.json.gz", gzip.compress(open(TEST_JSON_PATH, "rb").read()))
+    member = f"{archive_path}::data/"
+
+    assert file_reader.read_json(member + "test_read.json") == file_reader.read_json(TEST_JSON_PATH)
+    assert file_reader.read_json(member + "test_read.json.gz") == file_reader.read_json(TEST_JSON_PATH)
+    assert file_reader.read_csv(member + "test_read.csv") == file_reader.read_csv(TEST_CSV_PATH)
+    assert list(file_reader.iter_tsv(member + "test_read.tsv", batch_size=4)) == list(file_reader.iter_tsv(TEST_TSV_PATH, batch_size=4))
+    assert file_reader.read_pdf_text(member + "test_read.pdf") == file_reader.read_pdf_text(TEST_PDF_PATH)
+    assert file_reader.read_docx_text(member + "test_read.docx") == file_reader.read_docx_text(TEST_DOCX_PATH)
+    assert file_reader.read_txt(member + "日本語.txt") == "テキスト\n2行目"
+    assert file_reader.detect_encoding(member + "日本語.txt")["encoding"].lower() in ("shift_jis", "cp932")
+    with pytest.raises(SystemExit):
+        file_reader.read_txt(member + "missing.txt")
+
+    for compress, extension in [(gzip.compress, "gz"), (bz2.compress, "bz2"), (lzma.compress, "xz")]:
+        compressed_path = tmp_path / f"test_read.csv.{extension}"
+        compressed_path.write_bytes(compress(open(TEST_CSV_PATH, "rb").read()))
+        assert file_reader.read_csv(str(compressed_path)) == file_reader.read_csv(TEST_CSV_PATH)
+
+    assert list(file_reader.iter_archive_members(archive_path, "data/*.json*")) == [member + "test_read.json", member + "test_read.json.gz"]
+    results, errors = file_reader.read_files(archive_path, n_workers=4)
+    assert not errors
+    assert sorted(results) == sorted(file_reader.iter_archive_members(archive_path))
+    assert results[member + "test_read.json.gz"] == file_reader.read_json(TEST_JSON_PATH)
+    results, errors = file_reader.read_files(member + "*.json", n_workers=2, use_processes=True)
+    assert not errors
+    assert list(results) == [member + "test_read.json"]
@@ -13,3 +13,66 @@ def test_write_in_separated_value_file(path, delimiter):
         os.remove(path)
     file_writer.write_in_separated_value_file(path, csv_rows, delimiter)
     assert os.path.exists(path) is True
+
+
+def test_write_rows(tmp_path):
+    # ジェネレータの行を書き込めること、gzipで圧縮できること、失敗時に書き込み先が変更されないことを確認するテスト
+    rows = [[str(i), f"値{i}", "カンマ,を含む"] for i in range(1000)]
+    for name in ["rows.csv", "rows.csv.gz"]:
+        path = str(tmp_path / name)
+        assert file_writer.write_rows(path, (row for row in rows), buffer_size=64) == len(rows)
+        assert file_reader.read_csv(path) == rows
+    assert sorted(os.listdir(tmp_path)) == ["rows.csv", "rows.csv.gz"]
+
+    path = str(tmp_path / "rows.csv")
+    with pytest.raises(RuntimeError):
+        with file_writer.SeparatedValueWriter(path) as writer:
+            writer.writerow(["途中まで"])
+            raise RuntimeError
+    assert file_reader.read_csv(path) == rows
+    assert sorted(os.listdir(tmp_path)) == ["rows.csv", "rows.csv.gz"]
+
+
+def test_write_sharded_rows(tmp_path):
+    def produce(shard):
+        for i in range(100 * shard):
+            yield [str(shard), str(i)]
+
+    producers = [produce(shard) for shard in range(4)]
+    paths = file_writer.write_sharded_rows(str(tmp_path / "rows.tsv.gz"), producers, delimiter="\t")
+    assert paths == [str(tmp_path / f"rows-{i:05d}-of-00004.tsv.gz") for i in range(4)]
+    for shard, path in enumerate(paths):
+        assert file_reader.read_tsv(path) == [[str(shard), str(i)] for i in range(100 * shard)]
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(path) for path in paths)
+
+
+def test_sharded_writer_rollback(tmp_path, monkeypatch):
+    # 置き換えの途中で失敗した場合は、全てのシャードが書き込み前の内容に戻ることを確認するテスト
+    path = str(tmp_path / "rows.tsv")
+    old_paths = file_writer.write_sharded_rows(path, [[["old", str(i)]] for i in range(3)], delimiter="\t")
+
+    commit = file_writer.SeparatedValueWriter._commit
+
+    def failing_commit(self):
+        if self.file_path == old_paths[2]:
+            raise OSError("disk full")
+        commit(self)
+
+    monkeypatch.setattr(file_writer.SeparatedValueWriter, "_commit", failing_commit)
+    writer = file_writer.ShardedSeparatedValueWriter(path, 3, delimiter="\t")
+    for i, shard in enumerate(writer.shards):
+        shard.writerow(["new", str(i)])
+    with pytest.raises(OSError):
+        writer.close()
+    for i, shard_path in enumerate(old_paths):
+        assert file_reader.read_tsv(shard_path) == [["old", str(i)]]
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(p) for p in old_paths)
+
+
+def test_default_file_mode(tmp_path):
+    # 書き込んだファイルの権限がopen()で作成した場合と同じになることを確認するテスト
+    path = str(tmp_path / "rows.csv")
+    file_writer.write_rows(path, [["a"]])
+    with open(str(tmp_path / "plain.csv"), "w"):
+        pass
+    assert os.stat(path).st_mode & 0o777 == os.stat(str(tmp_path / "plain.csv")).st_mode & 0o777 == file_writer.DEFAULT_FILE_MODE
@@ -0,0 +1,86 @@
+import pytest
+
+from src import instrumentation
+from src.utils import log_decorator
+
+
+@log_decorator
+def _add(a, b):
+    return a + b
+
+
+@log_decorator
+def _fail():
+    raise ValueError("error")
+
+
+@pytest.fixture
+def enabled_instrumentation():
+    instrumentation.reset_metrics()
+    yield instrumentation
+    instrumentation.disable_instrumentation()
+    instrumentation.reset_metrics()
+
+
+def test_disabled(enabled_instrumentation):
+    # 計測が無効な場合は呼び出し回数も数えないことを確認するテスト
+    assert _add(1, 2) == 3
+    assert f"{__name__}._add" not in instrumentation.get_metrics()
+
+
+@pytest.mark.parametrize("sample_rate, sampled", [(1.0, 10), (0.5, 5), (0.1, 1)])
+def test_sampling(enabled_instrumentation, sample_rate, sampled):
+    instrumentation.enable_instrumentation(sample_rate=sample_rate)
+    for i in range(10):
+        assert _add(i, 1) == i + 1
+    metrics = instrumentation.get_metrics()[f"{__name__}._add"]
+    assert metrics["calls"] == 10
+    assert metrics["sampled"] == sampled
+    assert 0 < metrics["p50_seconds"] <= metrics["p95_seconds"] <= metrics["p99_seconds"]
+    assert f'function_calls_total{{function="{__name__}._add"}} 10' in instrumentation.format_prometheus()
+
+
+def test_error(enabled_instrumentation):
+    # エラー時は従来通りプログラムを停止し、エラー回数を数えることを確認するテスト
+    instrumentation.enable_instrumentation()
+    with pytest.raises(SystemExit) as e:
+        _fail()
+    assert isinstance(e.value.__context__, ValueError)
+    assert instrumentation.get_metrics()[f"{__name__}._fail"]["errors"] == 1
+
+
+def test_histogram_percentile():
+    histogram = instrumentation.LatencyHistogram()
+    for _ in range(99):
+        histogram.record(0.001)
+    histogram.record(1.0)
+    assert 0.001 <= histogram.percentile(0.5) < 0.0013
+    assert 0.001 <= histogram.percentile(0.95) < 0.0013
+    assert 1.0 <= histogram.percentile(0.995) < 1.2
+
+
+def test_record_call(enabled_instrumentation):
+    # log_decoratorを通さない処理の呼び出し回数・エラー回数・処理時間を記録できることを確認するテスト
+    stats = instrumentation.get_call_stats(f"{__name__}.request")
+    stats.record_call(0.001)
+    stats.record_call(0.002)
+    stats.record_call(error=True)
+    metrics = instrumentation.get_metrics()[f"{__name__}.request"]
+    assert (metrics["calls"], metrics["errors"], metrics["sampled"]) == (3, 1, 2)
+    assert f'function_calls_total{{function="{__name__}.request"}} 3' in instrumentation.format_prometheus()
+
+
+def test_sampling_threads(enabled_instrumentation):
+    # 複数のスレッドから呼び出しても呼び出し回数と計測回数がずれないことを確認するテスト
+    from concurrent.futures import ThreadPoolExecutor
+
+    instrumentation.enable_instrumentation(sample_rate=0.5)
+
+    def run(_):
+        for i in range(2000):
+            _add(i, 1)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(run, range(8)))
+    metrics = instrumentation.get_metrics()[f"{__name__}._add"]
+    assert (metrics["calls"], metrics["sampled"]) == (16000, 8000)
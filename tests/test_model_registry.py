@@ -0,0 +1,39 @@
+import threading
+
+import pytest
+
+from src.nlp.model_registry import ModelRegistry
+
+
+def test_lazy_load():
+    # get()が呼ばれるまで読み込まれず、読み込みは1回だけであることを確認するテスト
+    calls = []
+    registry = ModelRegistry()
+    registry.register("dummy", lambda: calls.append(1) or "model")
+    assert registry.is_loaded("dummy") is False
+    assert calls == []
+
+    threads = [threading.Thread(target=registry.get, args=("dummy",)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert registry.get("dummy") == "model"
+    assert calls == [1]
+    assert registry.stats()["dummy"].load_seconds >= 0
+
+
+def test_warmup():
+    registry = ModelRegistry()
+    registry.register("a", lambda: "A")
+    registry.register("b", lambda: "B")
+    stats = registry.warmup(["a"])
+    assert list(stats) == ["a"]
+    assert registry.is_loaded("a") is True
+    assert registry.is_loaded("b") is False
+
+
+def test_unregistered():
+    registry = ModelRegistry()
+    with pytest.raises(Exception):
+        registry.get("unknown")
@@ -0,0 +1,46 @@
+import numpy as np
+
+from src.nlp import near_duplicate
+
+TEMPLATE = "第{}条 甲は乙に対し、本契約に基づき発生した一切の債務を、別途定める期日までに支払うものとする。"
+OTHER = "本契約の有効期間は締結日から一年間とし、期間満了の三か月前までに書面による申し出がない場合は自動更新する。"
+
+
+def test_minhasher_signature():
+    # 同じ文章は同じシグネチャになり、推定Jaccard係数が文字N-gramのJaccard係数に近いテスト
+    hasher = near_duplicate.MinHasher(num_perm=256, n=3)
+    a, b = TEMPLATE.format(1), TEMPLATE.format(2)
+    assert np.array_equal(hasher.signature(a), hasher.signature(a))
+    shingles_a, shingles_b = set(hasher.shingles(a)), set(hasher.shingles(b))
+    jaccard = len(shingles_a & shingles_b) / len(shingles_a | shingles_b)
+    assert abs(near_duplicate.estimate_jaccard(hasher.signature(a), hasher.signature(b)) - jaccard) < 0.1
+    assert hasher.signatures([a, "", "ab"]).shape == (3, 256)
+
+
+def test_minhasher_signature_blocks(monkeypatch):
+    # シングルをブロックごとに処理しても、全てのシングルをまとめて計算したシグネチャと一致するテスト
+    hasher = near_duplicate.MinHasher(num_perm=64, n=3)
+    text = "".join(TEMPLATE.format(i) for i in range(20))
+    hashes = hasher.shingles(text)
+    expected = ((hasher._a * hashes + hasher._b) % near_duplicate._PRIME).min(axis=1)
+    monkeypatch.setattr(near_duplicate, "SIGNATURE_BLOCK_SIZE", 7)
+    assert len(hashes) > 7
+    assert np.array_equal(hasher.signature(text), expected)
+
+
+def test_minhash_lsh():
+    # 追加した文書の近似重複だけが検索されるテスト
+    lsh = near_duplicate.MinHashLSH(threshold=0.7)
+    lsh.insert("template", TEMPLATE.format(1))
+    lsh.insert("other", OTHER)
+    assert len(lsh) == 2 and "template" in lsh
+    assert lsh.query(TEMPLATE.format(2)) == ["template"]
+    assert lsh.query("全く関係のない文章です。") == []
+
+
+def test_deduplicate():
+    # 近似重複のうち最初の文章だけが残るテスト
+    texts = [TEMPLATE.format(1), OTHER, TEMPLATE.format(2), OTHER + "。", TEMPLATE.format(3)]
+    assert near_duplicate.deduplicate(iter(texts), threshold=0.7, batch_size=2) == [0, 1]
+    pairs = {(i, j) for i, j, _ in near_duplicate.find_near_duplicates(texts, threshold=0.7)}
+    assert pairs == {(2, 0), (3, 1), (4, 0), (4, 2)}
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from src.nlp import ngram_features, tokenizer
+
+DOCUMENTS = ["第1条 甲は乙に対し", "abab", "", "乙は甲に対し"]
+WAKACHIES = [["甲", "は", "乙", "に"], ["乙", "は", "甲", "に"], ["甲"]]
+
+
+@pytest.mark.parametrize("max_n", [1, 2, 3])
+@pytest.mark.parametrize("items", [DOCUMENTS, WAKACHIES])
+def test_extract_ngram_ids(items, max_n):
+    # to_ngramsと同じ順番・個数で、同じN-gramには同じIDが振られるテスト
+    ids, offsets = ngram_features.extract_ngram_ids(iter(items), max_n=max_n, n_features=2 ** 20)
+    assert len(offsets) == len(items) + 1
+    assert ids.dtype == np.int32
+
+    id_by_ngram = {}
+    for i, item in enumerate(items):
+        ngrams = [str(ngram) for ngrams in tokenizer.to_ngrams(item, max_n) for ngram in ngrams]
+        doc_ids = ids[offsets[i]: offsets[i + 1]]
+        assert len(doc_ids) == len(ngrams)
+        for ngram, feature_id in zip(ngrams, doc_ids):
+            assert id_by_ngram.setdefault(ngram, feature_id) == feature_id
+    assert len(set(id_by_ngram.values())) == len(id_by_ngram)
+
+
+def test_iter_ngram_id_batches():
+    # バッチごとの結果を連結すると一括変換の結果と一致するテスト
+    expected_ids, _ = ngram_features.extract_ngram_ids(DOCUMENTS, max_n=2)
+    batches = list(ngram_features.iter_ngram_id_batches(iter(DOCUMENTS), max_n=2, batch_size=3))
+    assert [len(offsets) - 1 for _, offsets in batches] == [3, 1]
+    assert np.array_equal(np.concatenate([ids for ids, _ in batches]), expected_ids)
+
+
+def test_build_ngram_vocabulary():
+    # 語彙を指定すると語彙内の位置がIDになり、min_freq未満のN-gramは除かれるテスト
+    vocabulary = ngram_features.build_ngram_vocabulary(DOCUMENTS, max_n=2, min_freq=2, batch_size=2)
+    assert np.all(np.diff(vocabulary.astype(np.float64)) > 0)
+    ids, offsets = ngram_features.extract_ngram_ids(["甲は", "xyz"], max_n=2, vocabulary=vocabulary)
+    assert offsets.tolist() == [0, 2, 2]
+    assert np.all((0 <= ids) & (ids < len(vocabulary)))
@@ -16,3 +16,29 @@ def test_normalize_numbers(sentence, replacement):
 def test_normalize_spaces(sentence, replacement, do_strip):
     result = normalizer.normalize_spaces(sentence=sentence, replacement=replacement, do_strip=do_strip)
     assert result == "スペース"
+
+
+@pytest.mark.parametrize("numbers_replacement, spaces_replacement, do_strip", [
+    ("0", "", True), ("", "", True), ("_", "_", False), (" ", "", True)])
+def test_normalizer_pipeline(numbers_replacement, spaces_replacement, do_strip):
+    # パイプラインの結果が各関数を順番に適用した結果と一致することを確認するテスト
+    sentences = ["  ７００,０００円 と 3,000円\t", "ス  ペー   ス", "1 ,2　，3", ""]
+    pipeline = normalizer.NormalizerPipeline().add_numbers(replacement=numbers_replacement).add_spaces(
+        replacement=spaces_replacement, do_strip=do_strip)
+    expected = [
+        normalizer.normalize_spaces(
+            sentence=normalizer.normalize_numbers(sentence=s, replacement=numbers_replacement),
+            replacement=spaces_replacement, do_strip=do_strip)
+        for s in sentences
+    ]
+    assert [pipeline.normalize(s) for s in sentences] == expected
+    assert list(pipeline.normalize_batch(s for s in sentences)) == expected
+
+    reversed_pipeline = normalizer.NormalizerPipeline().add_spaces(
+        replacement=spaces_replacement, do_strip=do_strip).add_numbers(replacement=numbers_replacement)
+    assert list(reversed_pipeline.normalize_batch(sentences)) == [
+        normalizer.normalize_numbers(
+            sentence=normalizer.normalize_spaces(sentence=s, replacement=spaces_replacement, do_strip=do_strip),
+            replacement=numbers_replacement)
+        for s in sentences
+    ]
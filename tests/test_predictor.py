@@ -0,0 +1,109 @@
+from collections import Counter
+
+import pytest
+import torch
+from torchtext import data
+from torchtext.vocab import Vocab
+
+from src.nlp.tokenizer import model_registry
+from src.torch_model.predictor import BatchPredictor, FieldTokenizer
+from src.torch_model.transformer_model import TransformerModel
+
+SENTENCES = ["当社グループの売上高は前年同期に比べ増加しました。", "The Company's operating income decreased."]
+
+
+def _tokenize_by_janome(sentence):
+    # 学習時のノートブックのtext_fieldと同じ分かち書き
+    return list(model_registry.get("janome").tokenize(sentence, wakati=True))
+
+
+def _build_text_field(**kwargs) -> data.Field:
+    text_field = data.Field(sequential=True, use_vocab=True, tokenize=_tokenize_by_janome, lower=True, **kwargs)
+    counter = Counter(token for sentence in SENTENCES[:1] for token in text_field.preprocess(sentence))
+    text_field.vocab = Vocab(counter, specials=["<unk>", "<pad>"])
+    return text_field
+
+
+@pytest.mark.parametrize("field_kwargs", [{}, {"stop_words": {"the", "'s"}, "preprocessing": data.Pipeline(lambda s: s[:4])}])
+def test_predictor_token_ids(field_kwargs):
+    # 推論時の単語IDが学習時のtext_field.processと一致することを確認するテスト
+    text_field = _build_text_field(**field_kwargs)
+    model = TransformerModel(len(text_field.vocab), 8, 1, 8, 1, 0.0, is_classifier=True, n_class=3)
+    tokenize = FieldTokenizer.from_field(text_field) if field_kwargs else None
+    predictor = BatchPredictor(model, text_field.vocab, tokenize=tokenize)
+    for sentence in SENTENCES:
+        src, lengths = predictor.encode([sentence])
+        expected = text_field.process([text_field.preprocess(sentence)])
+        assert torch.equal(src, expected)
+        assert lengths.tolist() == [expected.size(0)]
+
+
+def test_predictor_tokenize_error():
+    # 分かち書きでエラーになった場合も推論スレッドは止まらず、そのリクエストだけが失敗することを確認するテスト
+    text_field = _build_text_field()
+
+    def tokenize(sentence):
+        if not sentence:
+            raise SystemExit(1)
+        return _tokenize_by_janome(sentence)
+
+    model = TransformerModel(len(text_field.vocab), 8, 1, 8, 1, 0.0, is_classifier=True, n_class=3)
+    with BatchPredictor(model, text_field.vocab, tokenize=tokenize, max_wait_ms=0) as predictor:
+        with pytest.raises(SystemExit):
+            predictor.predict("", timeout=10)
+        assert predictor.predict(SENTENCES[0], timeout=10).label in range(3)
+
+
+def _bad_tokenize(sentence):
+    if sentence == "bad":
+        raise SystemExit(1)
+    return _tokenize_by_janome(sentence)
+
+
+def test_predictor_batch_error_isolation():
+    # 同じバッチにまとめられたリクエストのうち、分かち書きに失敗したリクエストだけが失敗することを確認するテスト
+    text_field = _build_text_field()
+    model = TransformerModel(len(text_field.vocab), 8, 1, 8, 1, 0.0, is_classifier=True, n_class=3)
+    other = BatchPredictor(model, text_field.vocab)
+    with BatchPredictor(model, text_field.vocab, tokenize=_bad_tokenize, max_batch_size=3, max_wait_ms=1000) as predictor:
+        futures = [predictor.submit(sentence) for sentence in [SENTENCES[0], "bad", SENTENCES[1]]]
+        assert futures[0].result(timeout=10).label in range(3)
+        assert isinstance(futures[1].exception(timeout=10), SystemExit)
+        assert futures[2].result(timeout=10).label in range(3)
+        stats = predictor.stats()
+        assert stats["requests"] == 2 and stats["batches"] == 1
+    # stats()は推論器ごとに数える
+    assert other.stats()["requests"] == 0 and other.stats()["p50_seconds"] == 0.0
+
+
+def test_predictor_server():
+    # 不正なリクエストは400、分かち書きのエラーは500を返し、サーバーは処理を続けることを確認するテスト
+    import json
+    import urllib.error
+    import urllib.request
+
+    from src.torch_model.predictor import start_predictor_server
+
+    text_field = _build_text_field()
+    model = TransformerModel(len(text_field.vocab), 8, 1, 8, 1, 0.0, is_classifier=True, n_class=3)
+    predictor = BatchPredictor(model, text_field.vocab, tokenize=_bad_tokenize, max_wait_ms=0)
+    server = start_predictor_server(predictor, port=0)
+    url = f"http://127.0.0.1:{server.server_address[1]}/predict"
+
+    def post(body):
+        request = urllib.request.Request(url, data=json.dumps(body).encode("utf-8"), method="POST")
+        try:
+            with urllib.request.urlopen(request, timeout=10) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    try:
+        for body in [{"texts": "abc"}, {"texts": ["abc", 1]}, {"text": ["abc"]}, {"other": "abc"}, ["abc"]]:
+            assert post(body)[0] == 400
+        assert post({"text": "bad"})[0] == 500
+        status, result = post({"texts": SENTENCES})
+        assert status == 200 and len(result["predictions"]) == len(SENTENCES)
+    finally:
+        server.shutdown()
+        predictor.stop()
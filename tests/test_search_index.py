@@ -0,0 +1,79 @@
+import math
+
+import pytest
+
+from src.nlp import search_index
+
+DOCUMENTS = [
+    ["甲", "は", "乙", "に", "対し", "契約", "を", "解除", "する"],
+    ["乙", "は", "甲", "に", "対し", "損害", "を", "賠償", "する"],
+    ["本", "契約", "の", "有効", "期間", "は", "一", "年", "と", "する"],
+    [],
+    ["契約", "解除", "の", "通知", "は", "書面", "で", "行う", "契約"],
+]
+
+
+def bm25(documents, query, k1=1.2, b=0.75):
+    # 全文書を走査するBM25の参照実装
+    average_length = sum(len(d) for d in documents) / len(documents)
+    scores = {}
+    for term in set(query):
+        df = sum(1 for d in documents if term in d)
+        if df == 0:
+            continue
+        idf = math.log(1 + (len(documents) - df + 0.5) / (df + 0.5))
+        for doc_id, document in enumerate(documents):
+            tf = document.count(term)
+            if tf:
+                norm = k1 * (1 - b + b * len(document) / average_length)
+                scores[doc_id] = scores.get(doc_id, 0) + idf * tf * (k1 + 1) / (tf + norm)
+    return sorted(scores.items(), key=lambda ds: -ds[1])
+
+
+def assert_same_results(results, expected):
+    assert [doc_id for doc_id, _ in results] == [doc_id for doc_id, _ in expected]
+    for (_, score), (_, expected_score) in zip(results, expected):
+        assert score == pytest.approx(expected_score, rel=1e-5)
+
+
+@pytest.mark.parametrize("query", [["契約", "解除"], ["損害"], ["は", "する"], ["存在しない"]])
+def test_search(query):
+    # BM25のスコア・順位が参照実装と一致するテスト
+    index = search_index.BM25Index()
+    assert index.add_documents(iter(DOCUMENTS)) == range(5)
+    assert_same_results(index.search(query, k=3), bm25(DOCUMENTS, query)[:3])
+
+
+def test_search_with_tokenizer():
+    # 文字列の文書・クエリはtokenizerで分かち書きされるテスト
+    index = search_index.BM25Index(tokenizer=str.split)
+    index.add_documents(" ".join(d) for d in DOCUMENTS)
+    assert_same_results(index.search("契約 解除"), bm25(DOCUMENTS, ["契約", "解除"]))
+    with pytest.raises(Exception):
+        search_index.BM25Index().search("契約")
+
+
+def test_save_and_load(tmp_path):
+    # 保存・読み込み後に追加した文書も含めて検索できるテスト
+    file_path = str(tmp_path / "index.bm25")
+    index = search_index.BM25Index()
+    index.add_documents(DOCUMENTS[:3])
+    index.save(file_path)
+
+    loaded = search_index.BM25Index.load(file_path)
+    assert len(loaded) == 3
+    assert loaded.add_documents(DOCUMENTS[3:]) == range(3, 5)
+    assert_same_results(loaded.search(["契約", "解除"]), bm25(DOCUMENTS, ["契約", "解除"]))
+
+    loaded.save(file_path)
+    assert_same_results(search_index.BM25Index.load(file_path).search(["契約"]), bm25(DOCUMENTS, ["契約"]))
+
+
+def test_search_early_termination():
+    # 長いポスティングリストを読み飛ばしてもtop-kが参照実装と一致するテスト
+    documents = [["共通"] * (1 + i % 3) + ([f"稀{i % 50}"] if i % 7 == 0 else []) for i in range(3000)]
+    index = search_index.BM25Index()
+    index.add_documents(documents)
+    index.optimize()
+    query = ["稀0", "稀1", "共通"]
+    assert_same_results(index.search(query, k=5), bm25(documents, query)[:5])
@@ -0,0 +1,70 @@
+import os
+
+from src.nlp.token_cache import TokenCache
+
+
+def test_lru_eviction():
+    cache = TokenCache(maxsize=2)
+    cache.put("a", ["a"])
+    cache.put("b", ["b"])
+    assert cache.get("a") == ["a"]  # "a"を最近使ったものにする
+    cache.put("c", ["c"])
+    assert cache.get("b") is None
+    assert cache.get_many(["a", "c"]) == [["a"], ["c"]]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["size"]) == (3, 1, 1, 2)
+
+
+def test_persistent_cache(tmp_path):
+    path = os.path.join(str(tmp_path), "token_cache.sqlite3")
+    key = TokenCache.make_key("janome", "Janome==0.4.0", "走れ、メロス", is_midashi=True)
+    assert key != TokenCache.make_key("janome", "Janome==0.4.0", "走れ、メロス", is_midashi=False)
+
+    cache = TokenCache(path=path)
+    cache.put(key, ["走れ", "、", "メロス"])
+    cache.close()
+
+    # 再起動後を想定して新しいインスタンスから読み込む
+    reopened = TokenCache(path=path)
+    assert reopened.get(key) == ["走れ", "、", "メロス"]
+    assert reopened.stats()["disk_hits"] == 1
+    assert reopened.get(key) == ["走れ", "、", "メロス"]
+    assert reopened.stats()["hits"] == 1
+    reopened.close()
+
+
+def test_results_are_copies(tmp_path):
+    # 取得した分かち書き結果を変更してもキャッシュの内容が変わらないことを確認するテスト
+    path = os.path.join(str(tmp_path), "token_cache.sqlite3")
+    tokens = ["走れ", "、", "メロス"]
+    cache = TokenCache(path=path)
+    cache.put("key", tokens)
+    tokens.append("保存後に変更")
+    first = cache.get("key")
+    first.append("!")
+    assert cache.get("key") == ["走れ", "、", "メロス"]
+    cache.close()
+
+    reopened = TokenCache(path=path)
+    first, second = reopened.get_many(["key", "key"])
+    first.remove("、")
+    assert second == ["走れ", "、", "メロス"]
+    assert reopened.get("key") == ["走れ", "、", "メロス"]
+    reopened.close()
+
+
+def test_tokenizer_results_are_copies():
+    # wakachi_by_*と同じくキャッシュ経由の結果も呼び出しごとに新しいリストになることを確認するテスト
+    from src.nlp import tokenizer
+
+    tokenizer.enable_token_cache()
+    try:
+        def compute(sentences):
+            return (sentence.split() for sentence in sentences)
+
+        result = tokenizer._with_token_cache("janome", ["走れ 、 メロス"], compute)[0]
+        result.clear()
+        assert tokenizer._with_token_cache("janome", ["走れ 、 メロス"], compute)[0] == ["走れ", "、", "メロス"]
+        assert tokenizer.get_token_cache_stats()["hits"] == 1
+    finally:
+        tokenizer.disable_token_cache()
@@ -0,0 +1,108 @@
+import functools
+import os
+import pickle
+
+import numpy as np
+import pytest
+
+from src.nlp import token_shards
+
+EXAMPLES = [(["甲", "は", "乙"], 1), ([], 0), (["乙", "は", "丙"], 2), (["甲"], 1), (["丁", "丁"], 0)]
+
+
+@pytest.mark.parametrize("shard_size", [1, 2, 100])
+def test_build_and_read_token_shards(tmp_path, shard_size):
+    # 保存したシャードから元の単語IDの並びとラベルが復元できるテスト
+    meta = token_shards.build_token_shards(iter(EXAMPLES), str(tmp_path), shard_size=shard_size, fingerprint="abc")
+    assert meta["n_examples"] == len(EXAMPLES)
+    assert meta["itos"][:2] == ["<unk>", "<pad>"]
+
+    shards = token_shards.TokenShards(str(tmp_path))
+    assert len(shards) == len(EXAMPLES)
+    for i, (tokens, label) in enumerate(EXAMPLES):
+        token_ids, shard_label = shards[i]
+        assert token_ids.dtype == np.int32
+        assert [shards.itos[t] for t in token_ids] == tokens
+        assert shard_label == label
+    assert shards.lengths().tolist() == [len(tokens) for tokens, _ in EXAMPLES]
+    assert shards.labels().tolist() == [label for _, label in EXAMPLES]
+    assert pickle.loads(pickle.dumps(shards))[-1][1] == EXAMPLES[-1][1]
+    with pytest.raises(IndexError):
+        shards[len(EXAMPLES)]
+
+
+def test_build_token_shards_with_itos(tmp_path):
+    # 語彙を指定した場合は語彙に無い単語が<unk>になるテスト
+    token_shards.build_token_shards(EXAMPLES, str(tmp_path), itos=["<pad>", "<unk>", "甲", "乙"])
+    token_ids, _ = token_shards.TokenShards(str(tmp_path))[0]
+    assert token_ids.tolist() == [2, 1, 3]
+
+
+def test_rebuild_token_shards(tmp_path):
+    # 開いているTokenShardsがある状態で作り直しても以前の内容を読み続け、失敗した作り直しは以前のシャードを壊さないテスト
+    token_shards.build_token_shards(EXAMPLES, str(tmp_path), shard_size=2)
+    old = token_shards.TokenShards(str(tmp_path))
+    old_first = old[0][0].tolist()
+
+    new_examples = [(["戊", "己"], 3)] * 3
+    token_shards.build_token_shards(new_examples, str(tmp_path), shard_size=2)
+    assert old[0][0].tolist() == old_first and len(old) == len(EXAMPLES)
+    new = token_shards.TokenShards(str(tmp_path))
+    assert len(new) == 3 and [new.itos[t] for t in new[2][0]] == ["戊", "己"]
+    # 以前のシャードは削除され、新しいシャードだけが残る
+    assert len([name for name in os.listdir(str(tmp_path)) if name.endswith(".npy")]) == 3 * len(new.meta["shards"])
+
+    def broken():
+        yield ["甲"], 1
+        yield ["乙"], 2
+        raise ValueError("broken")
+    with pytest.raises(SystemExit):
+        token_shards.build_token_shards(broken(), str(tmp_path), shard_size=1)
+    reread = token_shards.TokenShards(str(tmp_path))
+    assert reread.meta == new.meta and reread[2][1] == 3
+    assert len([name for name in os.listdir(str(tmp_path)) if name.endswith(".npy")]) == 3 * len(new.meta["shards"])
+
+
+def test_build_token_shards_from_tsv(tmp_path):
+    # 元ファイルが変わらない場合は分かち書きを省略するテスト
+    tsv_path = str(tmp_path / "train.tsv")
+    with open(tsv_path, mode="w", encoding="utf-8") as f:
+        f.write("甲 は 乙\t1\n丙\t0\n")
+    calls = []
+
+    def tokenize_batch(sentences):
+        for sentence in sentences:
+            calls.append(sentence)
+            yield sentence.split()
+
+    output_dir = str(tmp_path / "shards")
+    meta = token_shards.build_token_shards_from_tsv(tsv_path, output_dir, tokenize_batch=tokenize_batch)
+    assert meta == token_shards.build_token_shards_from_tsv(tsv_path, output_dir, tokenize_batch=tokenize_batch)
+    assert len(calls) == 2
+    assert os.path.exists(os.path.join(output_dir, token_shards.META_FILE_NAME))
+    assert token_shards.TokenShards(output_dir)[1][1] == 0
+
+
+def test_build_token_shards_from_tsv_tokenizer_id(tmp_path, monkeypatch):
+    # functools.partialやlambdaの分かち書きでも作成でき、分かち書きが変わった場合はシャードを作り直すテスト
+    tsv_path = str(tmp_path / "train.tsv")
+    with open(tsv_path, mode="w", encoding="utf-8") as f:
+        f.write("".join(f"甲 は 乙 {i}\t{i % 3}\n" for i in range(25)))
+    monkeypatch.setattr(token_shards, "TOKENIZE_BATCH_SIZE", 4)
+    output_dir = str(tmp_path / "shards")
+
+    def tokenize_batch(sentences, upper=False):
+        return ([token.upper() if upper else token for token in sentence.split()] for sentence in sentences)
+
+    meta = token_shards.build_token_shards_from_tsv(tsv_path, output_dir, tokenize_batch=functools.partial(tokenize_batch, upper=True))
+    shards = token_shards.TokenShards(output_dir)
+    assert len(shards) == 25
+    assert [shards.itos[i] for i in shards[24][0]] == ["甲", "は", "乙", "24"]
+    assert shards[24][1] == 0
+    assert meta != token_shards.build_token_shards_from_tsv(tsv_path, output_dir, tokenize_batch=functools.partial(tokenize_batch))
+    assert token_shards.build_token_shards_from_tsv(tsv_path, output_dir, tokenize_batch=lambda s: (x.split() for x in s))["fingerprint"] != \
+        token_shards.build_token_shards_from_tsv(tsv_path, output_dir, tokenize_batch=lambda s: (x.split()[:1] for x in s))["fingerprint"]
+    assert token_shards.build_token_shards_from_tsv(tsv_path, output_dir, tokenize_batch=tokenize_batch, tokenizer_id="v1")["fingerprint"] != \
+        token_shards.build_token_shards_from_tsv(tsv_path, output_dir, tokenize_batch=tokenize_batch, tokenizer_id="v2")["fingerprint"]
+    # 同じ中身の関数は実行ごとに同じ識別子になる
+    assert token_shards._callable_id(lambda s: (x.split() for x in s)) == token_shards._callable_id(lambda s: (x.split() for x in s))
@@ -1,6 +1,7 @@
 import pytest
 
 from src.nlp import tokenizer
+from src.nlp.model_registry import ModelRegistry
 
 SENTENCES = "a" * 5
 WAKACHIES = ["a" for i in range(5)]
@@ -49,3 +50,71 @@ def test_wakachi(sentence):
 
     sentence_piece_wakachi_result = tokenizer.wakachi_by_sentencepiece(sentence=sentence)
     assert sentence_piece_wakachi_result == ["▁", "走", "れ", "、", "メ", "ロス"]
+
+
+@pytest.mark.parametrize("batch_size", [1, 2, 1000])
+def test_wakachi_batch(batch_size):
+    # バッチ版の分かち書きが1文ずつの結果と一致することを確認するテスト
+    sentences = ["走れ、メロス", "他者と比べるのではなく、過去の自分と比べなさい", "メロスは激怒した。"]
+    for is_midashi in [True, False]:
+        janome_results = tokenizer.wakachi_by_janome_batch((s for s in sentences), batch_size=batch_size, is_midashi=is_midashi)
+        assert list(janome_results) == [tokenizer.wakachi_by_janome(sentence=s, is_midashi=is_midashi) for s in sentences]
+
+        ginza_results = tokenizer.wakachi_by_ginza_batch((s for s in sentences), batch_size=batch_size, is_midashi=is_midashi)
+        assert list(ginza_results) == [tokenizer.wakachi_by_ginza(sentence=s, is_midashi=is_midashi) for s in sentences]
+
+    sentence_piece_results = tokenizer.wakachi_by_sentencepiece_batch((s for s in sentences), batch_size=batch_size)
+    assert list(sentence_piece_results) == [tokenizer.wakachi_by_sentencepiece(sentence=s) for s in sentences]
+
+
+def test_token_cache(tmp_path):
+    # キャッシュ有効時も結果が変わらず、2回目以降はキャッシュから返ることを確認するテスト
+    sentences = ["走れ、メロス", "メロスは激怒した。", "走れ、メロス"]
+    expected = [tokenizer.wakachi_by_janome(sentence=s) for s in sentences]
+    tokenizer.enable_token_cache(path=str(tmp_path / "token_cache.sqlite3"))
+    try:
+        assert list(tokenizer.wakachi_by_janome_batch(sentences)) == expected
+        assert tokenizer.get_token_cache_stats()["misses"] == 3
+        assert [tokenizer.wakachi_by_janome(sentence=s) for s in sentences] == expected
+        assert tokenizer.get_token_cache_stats()["hits"] == 3
+    finally:
+        tokenizer.disable_token_cache()
+    assert tokenizer.get_token_cache_stats() == {}
+
+
+def test_tokenize_document():
+    # チャンクに分割して解析しても、文章全体の中での位置が表層形と一致することを確認するテスト
+    document = "".join(f"第{i}条 走れ、メロス。\n" for i in range(1, 30))
+    for tokenize in [tokenizer.tokenize_document_by_janome, tokenizer.tokenize_document_by_ginza]:
+        tokens = list(tokenize(document, max_chars=40))
+        assert tokens
+        assert all(document[token.start: token.end] == token.surface for token in tokens)
+        assert [token.start for token in tokens] == sorted(token.start for token in tokens)
+
+
+class _FakeToken:
+    def __init__(self, surface):
+        self.surface = surface
+        self.base_form = surface
+
+
+class _FakeJanome:
+    # 文章に含まれない表層形を返す形態素解析器
+    def tokenize(self, text):
+        return [_FakeToken(text[:1]), _FakeToken("存在しない")]
+
+
+def test_tokenize_document_errors(monkeypatch):
+    # 引数の誤りは呼び出し時点でエラーになり、表層形が見つからない場合は位置を推測せずにエラーになることを確認するテスト
+    with pytest.raises(SystemExit):
+        tokenizer.tokenize_document_by_ginza("走れ、メロス", batch_size=0)
+    with pytest.raises(SystemExit):
+        tokenizer.tokenize_document_by_janome("走れ、メロス", max_chars=0)
+
+    registry = ModelRegistry()
+    registry.register("janome", _FakeJanome)
+    monkeypatch.setattr(tokenizer, "model_registry", registry)
+    tokens = tokenizer.tokenize_document_by_janome("走れ、メロス")
+    assert next(tokens) == tokenizer.DocumentToken("走", "走", 0, 1)
+    with pytest.raises(Exception, match="not found"):
+        next(tokens)
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+from torchtext import data
+
+from src.nlp import torchtext_utils
+
+LENGTHS = np.random.RandomState(0).randint(1, 60, size=1000).tolist()
+
+
+@pytest.mark.parametrize("shuffle, pool_size", [(True, 10000), (True, 64), (False, 100)])
+def test_token_budget_batch_sampler(shuffle, pool_size):
+    # パディングを含む単語数がmax_tokens以下で、エポックごとに全ての文がちょうど1回ずつ含まれ、len()が返すバッチ数と一致することを確認するテスト
+    max_tokens = 200
+    sampler = torchtext_utils.TokenBudgetBatchSampler(LENGTHS, max_tokens, shuffle=shuffle, pool_size=pool_size)
+    for epoch in range(3):
+        sampler.set_epoch(epoch)
+        n_batches = len(sampler)
+        batches = list(sampler)
+        assert len(batches) == n_batches == sampler.last_epoch_stats["n_batches"]
+        assert sorted(i for batch in batches for i in batch) == list(range(len(LENGTHS)))
+        assert all(max(LENGTHS[i] for i in batch) * len(batch) <= max_tokens for batch in batches)
+        assert 0 < sampler.last_epoch_stats["padding_efficiency"] <= 1
+
+
+def test_token_budget_batch_sampler_epochs():
+    # 同じseedとエポックなら同じバッチになり、エポックが変わるとバッチの順番が変わることを確認するテスト
+    sampler = torchtext_utils.TokenBudgetBatchSampler(LENGTHS, 300, seed=1)
+    first = list(sampler)
+    assert list(torchtext_utils.TokenBudgetBatchSampler(LENGTHS, 300, seed=1)) == first
+    sampler.set_epoch(1)
+    assert list(sampler) != first
+
+    # 1文でmax_tokensを超える場合はその文だけのバッチにする
+    assert list(torchtext_utils.TokenBudgetBatchSampler([5, 50, 6], 10, shuffle=False)) == [[0], [2], [1]]
+
+
+class CountingTokenizer:
+    # 分かち書きの回数を数えるtokenize
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, text):
+        self.count += 1
+        return text.split()
+
+
+TSV_ROWS = ["a b c\t1", "d e\t0", "f\t1", "g h i j\t0"]
+
+
+def _tsv_fields(tokenize):
+    return [("text", data.Field(tokenize=tokenize)), ("label", data.Field(sequential=False))]
+
+
+def _example_values(example):
+    return (example.text, example.label)
+
+
+def test_lazy_tabular_dataset_from_list():
+    # アクセスされるまで分かち書きせず、TabularDataset_From_Listと同じExampleを返すことを確認するテスト
+    tokenize = CountingTokenizer()
+    dataset = torchtext_utils.LazyTabularDataset_From_List(iter(TSV_ROWS), "tsv", _tsv_fields(tokenize))
+    assert tokenize.count == 0
+    eager = torchtext_utils.TabularDataset_From_List(TSV_ROWS, "tsv", _tsv_fields(str.split))
+    assert len(dataset) == len(eager) == len(TSV_ROWS)
+    assert sorted(dataset.fields) == sorted(eager.fields) == ["label", "text"]
+    assert _example_values(dataset[1]) == _example_values(eager[1]) == (["d", "e"], "0")
+    assert tokenize.count == 1
+    assert [_example_values(ex) for ex in dataset] == [_example_values(ex) for ex in eager]
+    assert [_example_values(ex) for ex in dataset.examples[1:3]] == [_example_values(ex) for ex in eager.examples[1:3]]
+    assert _example_values(dataset[-1]) == _example_values(eager[-1])
+
+
+def test_lazy_tabular_dataset_from_list_options():
+    # cache_examples、filter_pred、skip_headerの動作を確認するテスト
+    tokenize = CountingTokenizer()
+    dataset = torchtext_utils.LazyTabularDataset_From_List(TSV_ROWS, "tsv", _tsv_fields(tokenize), cache_examples=True)
+    assert dataset[0] is dataset[0] and tokenize.count == 1
+
+    dataset = torchtext_utils.LazyTabularDataset_From_List(["text\tlabel"] + TSV_ROWS, "tsv", _tsv_fields(str.split), skip_header=True,
+                                                           filter_pred=lambda ex: ex.label == "1")
+    assert [_example_values(ex) for ex in dataset] == [(["a", "b", "c"], "1"), (["f"], "1")]
+
+    fields = {"text": ("text", data.Field()), "label": ("label", data.Field(sequential=False))}
+    dataset = torchtext_utils.LazyTabularDataset_From_List([{"text": "x y", "label": "1"}], "dict", fields)
+    assert len(dataset) == 1 and _example_values(dataset[0]) == (["x", "y"], "1")
@@ -0,0 +1,103 @@
+import inspect
+import io
+import math
+import pickle
+
+import pytest
+import torch
+
+from src.torch_model.transformer_model import TransformerModel
+
+NTOKEN = 50
+
+
+def _build_model(**kwargs) -> TransformerModel:
+    torch.manual_seed(0)
+    return TransformerModel(NTOKEN, 16, 2, 32, 2, dropout=0.0, is_classifier=True, n_class=5, **kwargs).eval()
+
+
+def _reference_forward(model: TransformerModel, src: torch.Tensor) -> torch.Tensor:
+    # プーリングをdecoderの前に移す前の計算（全ての位置でdecoderを通してから系列方向に合計）
+    mask = model._generate_square_subsequent_mask(len(src)).to(src.device)
+    x = model.pos_encoder(model.encoder(src) * math.sqrt(model.embed_size))
+    output = model.transformer_encoder(x, mask)
+    return torch.sum(model.decoder(output), dim=0)
+
+
+def _padded_batch(lengths, seed: int = 0):
+    generator = torch.Generator().manual_seed(seed)
+    src = torch.randint(2, NTOKEN, (max(lengths), len(lengths)), generator=generator)
+    for j, length in enumerate(lengths):
+        src[length:, j] = 1
+    return src, torch.tensor(lengths)
+
+
+def test_sum_pooling_matches_previous_forward():
+    # パディングの無いバッチでは以前の計算と同じ出力になることを確認するテスト
+    model = _build_model()
+    src, _ = _padded_batch([7, 7, 7])
+    with torch.no_grad():
+        assert torch.allclose(model(src), _reference_forward(model, src), atol=1e-5)
+
+
+def test_padded_batch_matches_unpadded_sentences():
+    # lengthsを指定したパディングありのバッチの出力が、1文ずつパディング無しで計算した以前の出力と一致することを確認するテスト
+    model = _build_model()
+    src, lengths = _padded_batch([9, 4, 1, 6])
+    with torch.no_grad():
+        output = model(src, lengths=lengths)
+        expected = torch.cat([_reference_forward(model, src[:length, j: j + 1]) for j, length in enumerate(lengths.tolist())])
+        assert torch.allclose(output, expected, atol=1e-5)
+        padding_mask = torch.arange(src.size(0)).unsqueeze(0) >= lengths.unsqueeze(1)
+        assert torch.allclose(model(src, src_key_padding_mask=padding_mask), output, atol=1e-5)
+
+
+@pytest.mark.parametrize("pooling", ["sum", "mean"])
+def test_full_lengths_match_no_mask(pooling):
+    # 全ての文が最大の長さの場合は、マスクを指定しない場合と同じ出力になることを確認するテスト
+    model = _build_model(pooling=pooling)
+    src, lengths = _padded_batch([5, 5, 5])
+    with torch.no_grad():
+        assert torch.allclose(model(src, lengths=lengths), model(src), atol=1e-5)
+    if pooling == "mean":
+        with torch.no_grad():
+            assert torch.allclose(model(src), _reference_forward(model, src) / 5, atol=1e-5)
+
+
+def test_mask_cache():
+    # 系列長ごとにマスクを1回だけ作成し、同じオブジェクトを使い回すことを確認するテスト
+    model = _build_model()
+    first = model._get_square_subsequent_mask(6, torch.device("cpu"))
+    assert model._get_square_subsequent_mask(6, torch.device("cpu")) is first
+    assert torch.equal(first, model._generate_square_subsequent_mask(6))
+    assert model._get_square_subsequent_mask(3, torch.device("cpu")).shape == (3, 3)
+
+
+def test_pickle_round_trip():
+    # pickle・torch.saveで保存して読み込んだモデルが同じ出力になり、以前のバージョンで保存した属性の無いモデルも読み込めることを確認するテスト
+    model = _build_model(pooling="mean")
+    src, lengths = _padded_batch([6, 3])
+    with torch.no_grad():
+        expected = model(src, lengths=lengths)
+
+    restored = pickle.loads(pickle.dumps(model))
+    assert restored._mask_cache == {}
+    assert restored.pooling == "mean"
+    buffer = io.BytesIO()
+    torch.save(model, buffer)
+    buffer.seek(0)
+    # torch.loadのweights_onlyの既定値がTrueのバージョンでもモデル全体を読み込む
+    load_kwargs = {"weights_only": False} if "weights_only" in inspect.signature(torch.load).parameters else {}
+    for loaded in [restored, torch.load(buffer, **load_kwargs)]:
+        with torch.no_grad():
+            assert torch.allclose(loaded(src, lengths=lengths), expected, atol=1e-6)
+
+    legacy_state = _build_model().__dict__.copy()
+    for name in ["_mask_cache", "pooling", "use_causal_mask"]:
+        del legacy_state[name]
+    legacy = TransformerModel.__new__(TransformerModel)
+    legacy.__setstate__(legacy_state)
+    assert (legacy._mask_cache, legacy.pooling, legacy.use_causal_mask) == ({}, "sum", True)
+    src, _ = _padded_batch([4, 4])
+    with torch.no_grad():
+        assert torch.allclose(legacy(src), _reference_forward(legacy, src), atol=1e-5)